@@ -2,7 +2,8 @@ import logging
 import json
 
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 
 from core.custom_filters import CustomFilterRegistryPoint
 from core.data_masking import MaskingClassRegistryPoint
@@ -66,6 +67,38 @@ DEFAULT_CONFIG = {
     "social_protection_masking_enabled": True,
     "enable_python_workflows": True,
     "default_beneficiary_status": "POTENTIAL",
+
+    # Keep json_ext expression indexes on beneficiaries in sync with benefit plan schemas on every plan save
+    "enable_json_ext_index_sync": False,
+
+    # totalCount of beneficiary, group beneficiary and upload history connections, EXACT or APPROXIMATE
+    "gql_total_count_mode": "EXACT",
+    # APPROXIMATE mode returns the planner estimate only when it is above this number of rows
+    "gql_total_count_estimate_threshold": 100000,
+    # Seconds exact counts are cached for, 0 disables the cache
+    "gql_total_count_cache_ttl": 0,
+
+    # Run exports and imports in the shared thread pool instead of the request
+    "enable_background_jobs": True,
+    "background_jobs_max_workers": 2,
+    # Number of rows fetched and written at once by background exports
+    "export_chunk_size": 5000,
+    # Number of rows read and saved at once when importing chunked formats (parquet)
+    "import_chunk_size": 10000,
+    # Number of beneficiaries sent in one bulk request by deferred OpenSearch synchronization
+    "opensearch_sync_chunk_size": 1000,
+    # Check unique schema fields of uploads against existing beneficiaries of the plan, index kept on every save
+    "enable_unique_value_index": True,
+    # Flag uploaded rows with similar names, the same date of birth and location as another row or beneficiary
+    "enable_fuzzy_duplicate_check": False,
+    # Minimal similarity (0 - 1) of full names of likely duplicates
+    "fuzzy_duplicate_threshold": 0.85,
+    # Maximal number of records a row is compared with in a block of the fuzzy duplicate check
+    "fuzzy_duplicate_max_block_size": 100,
+    # Distinct (rule, field, value) validation results kept per upload, 0 validates every row
+    "validation_memo_size": 10000,
+    # Validation calculations depending on other fields of the row, never memoized
+    "validation_memo_excluded_rules": [],
 }
 
 
@@ -121,6 +154,24 @@ class SocialProtectionConfig(AppConfig):
 
     default_beneficiary_status = None
 
+    enable_json_ext_index_sync = None
+
+    gql_total_count_mode = None
+    gql_total_count_estimate_threshold = None
+    gql_total_count_cache_ttl = None
+
+    enable_background_jobs = None
+    background_jobs_max_workers = None
+    export_chunk_size = None
+    import_chunk_size = None
+    opensearch_sync_chunk_size = None
+    enable_unique_value_index = None
+    enable_fuzzy_duplicate_check = None
+    fuzzy_duplicate_threshold = None
+    fuzzy_duplicate_max_block_size = None
+    validation_memo_size = None
+    validation_memo_excluded_rules = None
+
     def ready(self):
         from core.models import ModuleConfiguration
 
@@ -132,11 +183,39 @@ class SocialProtectionConfig(AppConfig):
 
     def __connect_signals(self):
         from core.models import ModuleConfiguration
+        from social_protection.models import BenefitPlan, Beneficiary, GroupBeneficiary, \
+            BenefitPlanDataUploadRecords
         post_save.connect(
             self._reload_module_config,
             sender=ModuleConfiguration,
             weak=False
         )
+        post_save.connect(
+            self._sync_json_ext_indexes,
+            sender=BenefitPlan,
+            weak=False
+        )
+        for model in (Beneficiary, GroupBeneficiary, BenefitPlanDataUploadRecords):
+            post_save.connect(self._invalidate_cached_counts, sender=model, weak=False)
+            post_delete.connect(self._invalidate_cached_counts, sender=model, weak=False)
+        self.__connect_statistics_signals(Beneficiary, GroupBeneficiary)
+        self.__connect_unique_value_signals(Beneficiary, GroupBeneficiary)
+
+    def __connect_statistics_signals(self, *models):
+        from social_protection.statistics import on_beneficiary_pre_save, on_beneficiary_post_save, \
+            on_beneficiary_post_delete
+        for model in models:
+            pre_save.connect(on_beneficiary_pre_save, sender=model, weak=False)
+            pre_delete.connect(on_beneficiary_pre_save, sender=model, weak=False)
+            post_save.connect(on_beneficiary_post_save, sender=model, weak=False)
+            post_delete.connect(on_beneficiary_post_delete, sender=model, weak=False)
+
+    def __connect_unique_value_signals(self, *models):
+        from social_protection.unique_values import on_beneficiary_unique_value_save, \
+            on_beneficiary_unique_value_delete
+        for model in models:
+            post_save.connect(on_beneficiary_unique_value_save, sender=model, weak=False)
+            post_delete.connect(on_beneficiary_unique_value_delete, sender=model, weak=False)
 
     def _reload_module_config(self, sender, instance, **kwargs):
         if instance.module == self.name and instance.layer == 'be':
@@ -150,6 +229,24 @@ class SocialProtectionConfig(AppConfig):
             # TODO: handle reloading of masking configs
             logger.info(f"Reloaded app configs (except masking configs) for {self.name} module")
 
+    def _sync_json_ext_indexes(self, sender, instance, **kwargs):
+        if not self.enable_json_ext_index_sync:
+            return
+
+        def sync():
+            from social_protection.json_ext_indexes import sync_json_ext_indexes
+            try:
+                sync_json_ext_indexes()
+            except Exception as exc:
+                logger.error("Failed to synchronize beneficiary json_ext indexes", exc_info=exc)
+
+        # Concurrent index builds can't run inside the transaction that saved the plan
+        transaction.on_commit(sync)
+
+    def _invalidate_cached_counts(self, sender, **kwargs):
+        from social_protection.counting import invalidate_cached_counts
+        invalidate_cached_counts(sender)
+
     def _set_up_workflows(self):
         from workflow.systems.python import PythonWorkflowAdaptor
         from social_protection.workflows import process_import_beneficiaries_workflow, \
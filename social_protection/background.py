@@ -0,0 +1,51 @@
+"""
+Shared thread pool for long running social protection jobs (exports, imports).
+
+Jobs are submitted after the current transaction commits, so rows created for tracking the job are visible to the
+worker thread. Every job closes its database connection when done, as worker threads are not managed by Django
+request handling. With `enable_background_jobs` disabled jobs run synchronously in the calling thread.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+from social_protection.apps import SocialProtectionConfig
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SocialProtectionConfig.background_jobs_max_workers,
+                thread_name_prefix='social_protection_job',
+            )
+    return _executor
+
+
+def _run_job(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception as exc:
+        logger.error("Background job %s failed", getattr(fn, '__name__', fn), exc_info=exc)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def run_in_background(fn, *args, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` in the shared thread pool once the current transaction is committed.
+    Errors are logged, jobs are expected to record their own failures.
+    """
+    if not SocialProtectionConfig.enable_background_jobs:
+        transaction.on_commit(lambda: _run_job(fn, *args, **kwargs))
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run_job, fn, *args, **kwargs))
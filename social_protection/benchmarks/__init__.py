@@ -0,0 +1,9 @@
+"""
+Benchmarks of the module on synthetic data.
+
+`data_generator` builds beneficiary files of a configurable size, schema width, error rate and group size.
+`runner` imports such a file through the same services and workflows as a regular upload and measures wall time,
+throughput, peak Python memory and number of queries of every step (`benchmark_beneficiary_import` command).
+`graphql_queries` seeds beneficiaries and groups and runs a catalogue of GraphQL queries with query-count budgets
+and latency percentiles (`benchmark_graphql_queries` command). Both commands require a PostgreSQL database.
+"""
@@ -0,0 +1,107 @@
+"""
+Synthetic beneficiary files for benchmarks.
+
+Values are generated column by column with numpy, so files of a million rows are built in seconds. Generation is
+deterministic for a given seed.
+
+Invalid rows share the value of the unique `national_id` field with the preceding row, they pass the JSON schema
+check of the SQL procedures and are rejected by the uniqueness validation of the import. Both rows of such a pair
+are reported as invalid by the validation.
+"""
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+FIRST_NAMES = (
+    'Alice', 'Amina', 'Bruno', 'Chantal', 'David', 'Esther', 'Fatima', 'Grace', 'Hassan', 'Irene',
+    'Jean', 'Kevin', 'Lea', 'Moses', 'Nadia', 'Olivier', 'Pascal', 'Rose', 'Samuel', 'Yvette',
+)
+LAST_NAMES = (
+    'Bizimana', 'Hakizimana', 'Irakoze', 'Kamariza', 'Kwizera', 'Mugisha', 'Ndayishimiye', 'Niyonzima',
+    'Nshimirimana', 'Uwimana',
+)
+MEMBER_ROLES = ('SON', 'DAUGHTER', 'SPOUSE')
+# Types of generated schema fields, assigned in turn
+FIELD_TYPES = ('string', 'integer', 'number', 'boolean')
+
+DOB_START = np.datetime64('1940-01-01')
+DOB_RANGE_DAYS = 80 * 365
+
+
+def generate_beneficiary_schema(schema_width: int = 5) -> dict:
+    """
+    Benefit plan schema with the unique `national_id` and `schema_width` additional fields.
+    """
+    properties = {'national_id': {'type': 'string', 'uniqueness': True}}
+    for index in range(schema_width):
+        properties[f'field_{index}'] = {'type': FIELD_TYPES[index % len(FIELD_TYPES)]}
+    return {'$schema': 'https://json-schema.org/draft/2019-09/schema', 'type': 'object', 'properties': properties}
+
+
+def _field_values(rng: np.random.Generator, field_type: str, rows: int):
+    if field_type == 'integer':
+        return rng.integers(0, 1000, rows)
+    if field_type == 'number':
+        return np.round(rng.random(rows) * 1000, 2)
+    if field_type == 'boolean':
+        return rng.random(rows) < 0.5
+    return pd.Series(rng.integers(0, 100, rows)).map('value_{}'.format)
+
+
+def generate_beneficiary_dataframe(rows: int,
+                                   schema_width: int = 5,
+                                   error_rate: float = 0.0,
+                                   group_size: Optional[int] = None,
+                                   locations: Optional[Iterable[Tuple[str, str]]] = None,
+                                   seed: int = 0) -> pd.DataFrame:
+    """
+    Rows of an import file matching `generate_beneficiary_schema(schema_width)`.
+
+    `error_rate` is the share of rows duplicating the national id of the preceding row. With `group_size` rows are
+    aggregated by `group_code`, the first member of every group is its head and recipient. `locations` are
+    `(name, code)` pairs of villages assigned at random, locations are left empty otherwise.
+    """
+    rng = np.random.default_rng(seed)
+    dataframe = pd.DataFrame({
+        'first_name': np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), rows)],
+        'last_name': np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), rows)],
+        'dob': (DOB_START + rng.integers(0, DOB_RANGE_DAYS, rows).astype('timedelta64[D]')).astype(str),
+    })
+
+    locations = list(locations or [])
+    if locations:
+        picked = rng.integers(0, len(locations), rows)
+        dataframe['location_name'] = [locations[index][0] for index in picked]
+        dataframe['location_code'] = [locations[index][1] for index in picked]
+    else:
+        dataframe['location_name'] = None
+        dataframe['location_code'] = None
+
+    national_ids = np.arange(rows)
+    if error_rate and rows > 1:
+        duplicated = np.flatnonzero(rng.random(rows - 1) < error_rate) + 1
+        national_ids[duplicated] = national_ids[duplicated - 1]
+    dataframe['national_id'] = pd.Series(national_ids).map('NID{:09d}'.format)
+
+    for index in range(schema_width):
+        dataframe[f'field_{index}'] = _field_values(rng, FIELD_TYPES[index % len(FIELD_TYPES)], rows)
+
+    if group_size:
+        positions = np.arange(rows)
+        is_head = positions % group_size == 0
+        dataframe['group_code'] = pd.Series(positions // group_size).map('BG{:08d}'.format)
+        dataframe['individual_role'] = np.where(
+            is_head, 'HEAD', np.array(MEMBER_ROLES)[rng.integers(0, len(MEMBER_ROLES), rows)]
+        )
+        dataframe['recipient_info'] = np.where(is_head, 1, None)
+    return dataframe
+
+
+def count_invalid_rows(dataframe: pd.DataFrame) -> int:
+    return int(dataframe['national_id'].duplicated(keep=False).sum())
+
+
+def to_upload_file(dataframe: pd.DataFrame, name: str = 'benchmark_beneficiaries.csv') -> SimpleUploadedFile:
+    return SimpleUploadedFile(name, dataframe.to_csv(index=False).encode('utf-8'), content_type='text/csv')
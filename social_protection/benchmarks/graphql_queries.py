@@ -0,0 +1,325 @@
+"""
+Catalogue of representative GraphQL queries of the module with their query-count budgets.
+
+Every query of `QUERY_CATALOGUE` is a template filled with ids of a dataset seeded by `seed_graphql_dataset`
+(`$benefit_plan_id`, `$village_or_child_of`, `$first`, ...). The budget is the maximum number of database queries
+a page may take. It must not depend on the page size, a query count growing with `$first` is an N+1 and is reported
+by the regression tests. `run_graphql_benchmark` executes the catalogue in process and records latency percentiles.
+"""
+import datetime
+import logging
+import random
+import time
+import uuid
+from string import Template
+from typing import Dict, Iterable, List
+
+import graphene
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import offset_to_cursor
+
+from individual.models import Group, GroupIndividual, Individual
+from social_protection.benchmarks.data_generator import FIRST_NAMES, LAST_NAMES
+from social_protection.models import (
+    Activity,
+    Beneficiary,
+    BeneficiaryStatus,
+    BenefitPlan,
+    GroupBeneficiary,
+    Project,
+)
+from social_protection.statistics import deferred_statistics_refresh
+
+logger = logging.getLogger(__name__)
+
+BENEFICIARY_DATA_SCHEMA = {
+    '$schema': 'https://json-schema.org/draft/2019-09/schema',
+    'type': 'object',
+    'properties': {
+        'number_of_children': {'type': 'integer'},
+        'able_bodied': {'type': 'boolean'},
+        'email': {'type': 'string'},
+    },
+}
+ADVANCED_CRITERIA = {
+    BeneficiaryStatus.POTENTIAL: [
+        {'type': 'integer', 'field': 'number_of_children', 'value': '1', 'filter': 'gt'},
+    ],
+    BeneficiaryStatus.ACTIVE: [
+        {'type': 'boolean', 'field': 'able_bodied', 'value': 'False', 'filter': 'exact'},
+    ],
+}
+
+_BENEFICIARY_NODE = """
+    totalCount
+    pageInfo { hasNextPage endCursor }
+    edges {
+      node {
+        id
+        uuid
+        status
+        jsonExt
+        isEligible
+        benefitPlan { id code name }
+        individual { id firstName lastName dob }
+      }
+    }
+"""
+_GROUP_BENEFICIARY_NODE = """
+    totalCount
+    edges {
+      node {
+        id
+        status
+        jsonExt
+        isEligible
+        benefitPlan { id code }
+        group { id code }
+      }
+    }
+"""
+
+
+class BenchmarkQuery:
+
+    def __init__(self, name: str, query: str, max_queries: int):
+        self.name = name
+        self.query = Template(query)
+        self.max_queries = max_queries
+
+    def render(self, variables: Dict) -> str:
+        return self.query.substitute(variables)
+
+
+QUERY_CATALOGUE = [
+    BenchmarkQuery('beneficiary_page', """
+        query { beneficiary(benefitPlan_Id: "$benefit_plan_id", isDeleted: false, first: $first) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=8),
+    BenchmarkQuery('beneficiary_search', """
+        query { beneficiary(benefitPlan_Id: "$benefit_plan_id", search: "$search", isDeleted: false, first: $first) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=10),
+    BenchmarkQuery('beneficiary_village_or_child_of', """
+        query { beneficiary(
+            benefitPlan_Id: "$benefit_plan_id", villageOrChildOf: $village_or_child_of, isDeleted: false, first: $first
+        ) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=12),
+    BenchmarkQuery('beneficiary_parent_location', """
+        query { beneficiary(
+            benefitPlan_Id: "$benefit_plan_id", parentLocation: "$parent_location",
+            parentLocationLevel: $parent_location_level, isDeleted: false, first: $first
+        ) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=8),
+    BenchmarkQuery('beneficiary_custom_filter', """
+        query { beneficiary(
+            benefitPlan_Id: "$benefit_plan_id", customFilters: ["number_of_children__gt__integer=1"],
+            isDeleted: false, first: $first
+        ) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=8),
+    BenchmarkQuery('beneficiary_eligibility', """
+        query { beneficiary(
+            benefitPlan_Id: "$benefit_plan_id", status: POTENTIAL, isDeleted: false, first: $first
+        ) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=10),
+    BenchmarkQuery('beneficiary_deep_page', """
+        query { beneficiary(
+            benefitPlan_Id: "$benefit_plan_id", isDeleted: false, first: $first, after: "$deep_page_cursor"
+        ) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=8),
+    BenchmarkQuery('beneficiary_keyset_page', """
+        query { beneficiary(
+            benefitPlan_Id: "$benefit_plan_id", isDeleted: false, first: $first, keyset: true,
+            orderBy: ["-dateCreated"]
+        ) {
+        """ + _BENEFICIARY_NODE + """ } }
+    """, max_queries=8),
+    BenchmarkQuery('group_beneficiary_page', """
+        query { groupBeneficiary(benefitPlan_Id: "$group_benefit_plan_id", isDeleted: false, first: $first) {
+        """ + _GROUP_BENEFICIARY_NODE + """ } }
+    """, max_queries=8),
+    BenchmarkQuery('group_beneficiary_village_or_child_of', """
+        query { groupBeneficiary(
+            benefitPlan_Id: "$group_benefit_plan_id", villageOrChildOf: $village_or_child_of,
+            isDeleted: false, first: $first
+        ) {
+        """ + _GROUP_BENEFICIARY_NODE + """ } }
+    """, max_queries=12),
+    BenchmarkQuery('benefit_plan_page', """
+        query { benefitPlan(isDeleted: false, first: $first) {
+            totalCount
+            edges { node { id code name type maxBeneficiaries beneficiaryDataSchema jsonExt hasPaymentPlans } }
+        } }
+    """, max_queries=6),
+    BenchmarkQuery('project_page', """
+        query { project(benefitPlan_Id: "$benefit_plan_id", isDeleted: false, first: $first) {
+            totalCount
+            edges { node { id name status benefitPlan { name } activity { name } location { name } } }
+        } }
+    """, max_queries=6),
+]
+
+
+def seed_graphql_dataset(user, villages: List, individuals: int = 500, group_size: int = 4, projects: int = 5,
+                         page_size: int = 50, seed: int = 0) -> Dict:
+    """
+    Create individual and group benefit plans with enrolled beneficiaries spread over `villages`, projects and
+    groups of `group_size` members. Return the variables of the catalogue templates.
+    """
+    rng = random.Random(seed)
+    suffix = uuid.uuid4().hex[:6].upper()
+    audit = {'user_created': user, 'user_updated': user}
+
+    def create_plan(code, plan_type):
+        benefit_plan = BenefitPlan(
+            code=code, name=f'GraphQL benchmark {code}', type=plan_type,
+            beneficiary_data_schema=BENEFICIARY_DATA_SCHEMA, json_ext={'advanced_criteria': ADVANCED_CRITERIA},
+        )
+        benefit_plan.save(username=user.username)
+        return benefit_plan
+
+    benefit_plan = create_plan(f'GQ{suffix}', BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE)
+    group_benefit_plan = create_plan(f'GG{suffix}', BenefitPlan.BenefitPlanType.GROUP_TYPE)
+    activity = Activity(name=f'GraphQL benchmark {suffix}')
+    activity.save(username=user.username)
+    benefit_plan_projects = []
+    for index in range(projects):
+        project = Project(
+            name=f'GraphQL benchmark {suffix} {index}', benefit_plan=benefit_plan, activity=activity,
+            location=villages[index % len(villages)], target_beneficiaries=individuals, working_days=30,
+        )
+        project.save(username=user.username)
+        benefit_plan_projects.append(project)
+
+    statuses = [BeneficiaryStatus.POTENTIAL, BeneficiaryStatus.ACTIVE]
+    with deferred_statistics_refresh(benefit_plan.id, group_benefit_plan.id):
+        created_individuals = Individual.objects.bulk_create([
+            Individual(
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                dob=datetime.date(1950, 1, 1) + datetime.timedelta(days=rng.randrange(25000)),
+                location=villages[index % len(villages)],
+                json_ext={
+                    'number_of_children': rng.randrange(6),
+                    'able_bodied': rng.random() < 0.5,
+                    'email': f'benchmark{index}@example.com',
+                },
+                uuid=uuid.uuid4(),
+                **audit,
+            )
+            for index in range(individuals)
+        ], batch_size=1000)
+        Beneficiary.objects.bulk_create([
+            Beneficiary(
+                individual=individual,
+                benefit_plan=benefit_plan,
+                status=statuses[index % len(statuses)],
+                project=benefit_plan_projects[index % projects] if projects and index % 3 == 0 else None,
+                json_ext=individual.json_ext,
+                uuid=uuid.uuid4(),
+                **audit,
+            )
+            for index, individual in enumerate(created_individuals)
+        ], batch_size=1000)
+
+        members = [created_individuals[start:start + group_size]
+                   for start in range(0, len(created_individuals), group_size)]
+        groups = Group.objects.bulk_create([
+            Group(
+                code=f'GQ{suffix}{index:06d}', location=group_members[0].location, json_ext={}, uuid=uuid.uuid4(),
+                **audit,
+            )
+            for index, group_members in enumerate(members)
+        ], batch_size=1000)
+        GroupIndividual.objects.bulk_create([
+            GroupIndividual(
+                group=group, individual=individual, **({'role': GroupIndividual.Role.HEAD} if position == 0 else {}),
+                uuid=uuid.uuid4(), **audit,
+            )
+            for group, group_members in zip(groups, members)
+            for position, individual in enumerate(group_members)
+        ], batch_size=1000)
+        GroupBeneficiary.objects.bulk_create([
+            GroupBeneficiary(
+                group=group, benefit_plan=group_benefit_plan, status=statuses[index % len(statuses)],
+                json_ext={}, uuid=uuid.uuid4(), **audit,
+            )
+            for index, group in enumerate(groups)
+        ], batch_size=1000)
+
+    village = villages[0]
+    return {
+        'benefit_plan_id': str(benefit_plan.id),
+        'group_benefit_plan_id': str(group_benefit_plan.id),
+        'village_or_child_of': village.parent.id,
+        'parent_location': str(village.parent.parent.uuid),
+        'parent_location_level': 1,
+        'search': FIRST_NAMES[0][:3].lower(),
+        'deep_page_cursor': offset_to_cursor(max(individuals // 2 - 1, 0)),
+        'first': page_size,
+    }
+
+
+def get_schema():
+    from social_protection.schema import Query
+    return graphene.Schema(query=Query)
+
+
+def execute_catalogue_query(schema, user, benchmark_query: BenchmarkQuery, variables: Dict):
+    request = RequestFactory().post('/api/graphql')
+    request.user = user
+    return schema.execute(benchmark_query.render(variables), context_value=request)
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Nearest-rank percentile of the values.
+    """
+    ordered = sorted(values)
+    index = max(int(round(share * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def run_graphql_benchmark(user, variables: Dict, iterations: int = 20,
+                          catalogue: Iterable[BenchmarkQuery] = QUERY_CATALOGUE) -> List[Dict]:
+    """
+    Execute every query `iterations` times after a warm-up run and report its query count and latencies in ms.
+    Queries are counted on a warm run, caches filled by the first execution (e.g. user rights) are not included.
+    """
+    schema = get_schema()
+    results = []
+    for benchmark_query in catalogue:
+        execute_catalogue_query(schema, user, benchmark_query, variables)
+        with CaptureQueriesContext(connection) as captured:
+            response = execute_catalogue_query(schema, user, benchmark_query, variables)
+        errors = [str(error) for error in response.errors or []]
+        latencies = []
+        if not errors:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                execute_catalogue_query(schema, user, benchmark_query, variables)
+                latencies.append((time.perf_counter() - started) * 1000)
+        result = {
+            'name': benchmark_query.name,
+            'queries': len(captured),
+            'max_queries': benchmark_query.max_queries,
+            'within_budget': len(captured) <= benchmark_query.max_queries,
+            'errors': errors,
+        }
+        if latencies:
+            result.update({
+                'p50_ms': round(percentile(latencies, 0.5), 2),
+                'p90_ms': round(percentile(latencies, 0.9), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'max_ms': round(max(latencies), 2),
+            })
+        logger.info("GraphQL benchmark %s: %s", benchmark_query.name, result)
+        results.append(result)
+    return results
@@ -0,0 +1,178 @@
+"""
+Timed run of the beneficiary import pipeline on a synthetic file.
+
+Steps are executed in the order of a regular upload:
+- import_beneficiaries: parsing of the file and saving of the data sources (the workflow itself is not started),
+- validation: validation of the data sources against the benefit plan schema,
+- sql_procedure: `process_import_valid_beneficiaries_workflow`, including synchronization for reporting,
+- group_aggregation: aggregation of imported individuals into groups, for group benefit plans only.
+
+Every run is executed in a transaction rolled back at the end unless `keep_data` is set. Peak memory is the peak of
+Python allocations traced by `tracemalloc`, memory of the database server is not included.
+"""
+import logging
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+from individual.models import GroupDataSource, IndividualDataSource, IndividualDataSourceUpload
+from social_protection.benchmarks.data_generator import (
+    count_invalid_rows,
+    generate_beneficiary_dataframe,
+    generate_beneficiary_schema,
+    to_upload_file,
+)
+from social_protection.import_progress import QueryCounter
+from social_protection.models import BenefitPlan, BenefitPlanDataUploadRecords
+from social_protection.services import BeneficiaryImportService
+from social_protection.signals.on_validation_import_valid_items import IndividualItemsImportTaskCompletionEvent
+from social_protection.workflows.beneficiary_upload_valid import process_import_valid_beneficiaries_workflow
+
+logger = logging.getLogger(__name__)
+
+GROUP_AGGREGATION_COLUMN = 'group_code'
+
+
+class PersistOnlyWorkflow:
+    """
+    Workflow stand-in, `import_beneficiaries` stops after the file is saved and later steps are timed separately.
+    """
+    name = 'Benchmark Beneficiaries Upload'
+
+    def run(self, payload):
+        return {'success': True}
+
+
+class _GroupAggregationEvent(IndividualItemsImportTaskCompletionEvent):
+    """
+    Aggregation of individuals already imported by the SQL procedure, the import workflow is not run again.
+    """
+
+    def _get_workflow(self, group, name):
+        return PersistOnlyWorkflow()
+
+
+class StageRecorder:
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextmanager
+    def measure(self, stage: str, rows: int = None):
+        """
+        Measure a step, the yielded dict accepts the number of processed `rows`.
+        """
+        metrics = {'rows': rows}
+        counter = QueryCounter()
+        if self.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                yield metrics
+        finally:
+            seconds = time.perf_counter() - started
+            peak = None
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            rows = metrics.get('rows')
+            self.stages[stage] = {
+                'seconds': round(seconds, 3),
+                'rows': rows,
+                'rows_per_second': round(rows / seconds, 1) if rows and seconds else None,
+                'peak_memory_mb': round(peak / 1024 / 1024, 2) if peak is not None else None,
+                'queries': counter.count,
+            }
+            logger.info("Benchmark stage %s: %s", stage, self.stages[stage])
+
+
+def _create_benefit_plan(user, schema_width, group_size):
+    benefit_plan = BenefitPlan(
+        code=f'BN{uuid.uuid4().hex[:6].upper()}',
+        name=f'Import benchmark {uuid.uuid4().hex[:8]}',
+        beneficiary_data_schema=generate_beneficiary_schema(schema_width),
+        type=BenefitPlan.BenefitPlanType.GROUP_TYPE if group_size else BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE,
+    )
+    benefit_plan.save(username=user.username)
+    return benefit_plan
+
+
+def _run_pipeline(recorder, user, dataframe, schema_width, group_size):
+    benefit_plan = _create_benefit_plan(user, schema_width, group_size)
+    service = BeneficiaryImportService(user)
+    import_file = to_upload_file(dataframe)
+
+    with recorder.measure('import_beneficiaries', rows=len(dataframe)):
+        result = service.import_beneficiaries(
+            import_file, benefit_plan, PersistOnlyWorkflow(), GROUP_AGGREGATION_COLUMN if group_size else None
+        )
+    upload = IndividualDataSourceUpload.objects.get(uuid=result['data']['upload_uuid'])
+    data_sources = IndividualDataSource.objects.filter(upload_id=upload.id, is_deleted=False)
+
+    with recorder.measure('validation', rows=len(dataframe)):
+        service.validate_import_beneficiaries(upload.id, data_sources, benefit_plan)
+
+    with recorder.measure('sql_procedure', rows=len(dataframe)) as stage:
+        process_import_valid_beneficiaries_workflow(str(user.id), str(benefit_plan.id), str(upload.id))
+        stage['rows'] = data_sources.filter(individual__isnull=False).count()
+
+    if group_size:
+        record = BenefitPlanDataUploadRecords.objects.get(data_upload_id=upload.id, is_deleted=False)
+        with recorder.measure('group_aggregation') as stage:
+            _GroupAggregationEvent(
+                'benchmark.group_aggregation', record, upload.id, benefit_plan, user
+            ).run_workflow()
+            stage['rows'] = data_sources.filter(individual__isnull=False).count()
+
+    upload.refresh_from_db()
+    return {
+        'upload_status': upload.status,
+        'imported_individuals': data_sources.filter(individual__isnull=False).count(),
+        'group_data_sources': GroupDataSource.objects.filter(upload_id=upload.id).count() if group_size else None,
+    }
+
+
+def run_import_benchmark(user,
+                         rows: int,
+                         schema_width: int = 5,
+                         error_rate: float = 0.0,
+                         group_size: int = None,
+                         locations=None,
+                         seed: int = 0,
+                         keep_data: bool = False,
+                         trace_memory: bool = True) -> dict:
+    """
+    Import a synthetic file of `rows` rows and return metrics of every step as a JSON serializable dict.
+    """
+    recorder = StageRecorder(trace_memory=trace_memory)
+    with recorder.measure('generate_file', rows=rows):
+        dataframe = generate_beneficiary_dataframe(
+            rows, schema_width=schema_width, error_rate=error_rate, group_size=group_size,
+            locations=locations, seed=seed,
+        )
+
+    with transaction.atomic():
+        outcome = _run_pipeline(recorder, user, dataframe, schema_width, group_size)
+        if not keep_data:
+            transaction.set_rollback(True)
+
+    pipeline_stages = [stage for name, stage in recorder.stages.items() if name != 'generate_file']
+    total_seconds = sum(stage['seconds'] for stage in pipeline_stages)
+    peaks = [stage['peak_memory_mb'] for stage in pipeline_stages if stage['peak_memory_mb'] is not None]
+    return {
+        'rows': rows,
+        'schema_width': schema_width,
+        'error_rate': error_rate,
+        'group_size': group_size,
+        'invalid_rows': count_invalid_rows(dataframe),
+        **outcome,
+        'total_seconds': round(total_seconds, 3),
+        'rows_per_second': round(rows / total_seconds, 1) if total_seconds else None,
+        'peak_memory_mb': max(peaks) if peaks else None,
+        'stages': recorder.stages,
+    }
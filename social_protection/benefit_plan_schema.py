@@ -0,0 +1,128 @@
+"""
+Process-level registry of artifacts compiled from `BenefitPlan.beneficiary_data_schema`.
+
+A schema is parsed once per benefit plan version into a `CompiledSchema`: properties, their names and types,
+unique fields, validation calculations per field and export columns. Import validation, header checks of the
+workflows, custom filter definitions, exports and templates share the compiled schema instead of parsing the schema
+on every call.
+
+Entries are compiled from stored schemas and cached under the `(id, version)` key, so an updated plan is compiled
+again and unsaved changes of a loaded plan don't affect other callers. Custom filter definitions
+and the list of schema fields are built from schemas of all benefit plans matching the query; after the cache is warm
+only ids and versions of the plans are fetched from the database. Entries of a plan are dropped whenever it is
+created, updated or deleted through `BenefitPlanService`.
+
+The SQL procedures of the import workflows validate rows against the schema in the database, they are not affected.
+"""
+import json
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from django.db.models.query import QuerySet
+
+from social_protection.models import BenefitPlan
+
+logger = logging.getLogger(__name__)
+
+# (field, type) pairs in the order of the schema properties
+SchemaDefinition = Tuple[Tuple[str, str], ...]
+
+
+class CompiledSchema:
+
+    def __init__(self, schema):
+        if isinstance(schema, str):
+            schema = json.loads(schema) if schema else None
+        self.schema = schema or {}
+        self.properties: Dict[str, dict] = dict(self.schema.get('properties') or {})
+        self.definition: SchemaDefinition = tuple(
+            (field, (properties or {}).get('type')) for field, properties in self.properties.items()
+        )
+        self.property_names = frozenset(self.properties)
+        self.unique_fields = tuple(
+            field for field, properties in self.properties.items() if 'uniqueness' in (properties or {})
+        )
+        # field -> name of the validation calculation
+        self.validation_rules: Dict[str, str] = {
+            field: properties['validationCalculation'].get('name')
+            for field, properties in self.properties.items()
+            if isinstance((properties or {}).get('validationCalculation'), dict)
+        }
+        self.export_columns = tuple(self.properties)
+
+
+EMPTY_SCHEMA = CompiledSchema(None)
+
+_cache: Dict[Tuple, CompiledSchema] = {}
+_lock = threading.Lock()
+
+
+def _compile(schema) -> CompiledSchema:
+    try:
+        return CompiledSchema(schema)
+    except (ValueError, AttributeError) as exc:
+        logger.warning("Invalid beneficiary data schema: %s", exc)
+        return EMPTY_SCHEMA
+
+
+def get_compiled_schema(benefit_plan: BenefitPlan) -> CompiledSchema:
+    """
+    Compiled schema of the stored version of the loaded benefit plan. On the first call for the version the schema
+    is read from the database, so unsaved changes of the instance never end up in the cache. Plans without a stored
+    row of their version (not saved yet) are compiled from the instance and not cached.
+    """
+    if benefit_plan is None:
+        return EMPTY_SCHEMA
+    key = (str(benefit_plan.id), benefit_plan.version)
+    compiled = _cache.get(key)
+    if compiled is None:
+        stored = BenefitPlan.objects \
+            .filter(id=benefit_plan.id, version=benefit_plan.version) \
+            .values_list('beneficiary_data_schema') \
+            .first()
+        if stored is None:
+            return _compile(benefit_plan.beneficiary_data_schema)
+        compiled = _compile(stored[0])
+        with _lock:
+            _cache[key] = compiled
+    return compiled
+
+
+def get_schema_definitions(benefit_plan_query: QuerySet) -> List[SchemaDefinition]:
+    """
+    Return `(field, type)` definitions of the benefit plans in the query, preserving the order of the query.
+    Schemas are fetched only for the plans without a compiled schema of the current version.
+    """
+    keys = [(str(plan_id), version) for plan_id, version in benefit_plan_query.values_list('id', 'version')]
+    missing_ids = [plan_id for plan_id, version in keys if (plan_id, version) not in _cache]
+    if missing_ids:
+        fetched = BenefitPlan.objects.filter(id__in=missing_ids).values_list('id', 'version', 'beneficiary_data_schema')
+        with _lock:
+            for plan_id, version, schema in fetched:
+                _cache[(str(plan_id), version)] = _compile(schema)
+    # Plans updated after the keys were fetched are parsed again on the next call
+    return [_cache.get(key, EMPTY_SCHEMA).definition for key in keys]
+
+
+def invalidate_schema_definitions(benefit_plan_id=None):
+    """
+    Drop compiled schemas of the benefit plan, or of all benefit plans if no id is provided.
+    """
+    with _lock:
+        if benefit_plan_id is None:
+            _cache.clear()
+            return
+        for key in [key for key in _cache if key[0] == str(benefit_plan_id)]:
+            del _cache[key]
+
+
+def on_benefit_plan_schema_change(**kwargs):
+    try:
+        result = kwargs.get('result') or {}
+        data = result.get('data') if isinstance(result, dict) else None
+        benefit_plan_id = data.get('id') if isinstance(data, dict) else None
+        invalidate_schema_definitions(benefit_plan_id)
+    except Exception as exc:
+        logger.error("Error while invalidating benefit plan schema definitions", exc_info=exc)
+        invalidate_schema_definitions()
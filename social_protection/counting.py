@@ -0,0 +1,107 @@
+"""
+Counting strategies for `totalCount` of social protection connections.
+
+An exact `COUNT(*)` over the filtered and joined beneficiary queryset is often more expensive than the page
+itself, and it is repeated on every page change. Counts are therefore:
+- cached per normalized query (model, SQL and parameters) for `gql_total_count_cache_ttl` seconds, when enabled.
+  Cached counts of a model are invalidated on every save or delete of its instances, bulk SQL updates and changes
+  of joined models expire with the TTL,
+- estimated from the query planner in approximate mode, when the estimate is above
+  `gql_total_count_estimate_threshold`. Small results are always counted exactly.
+
+The mode is selected by the client with the `totalCountMode` argument, `gql_total_count_mode` is the default.
+"""
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.query import QuerySet
+
+from social_protection.apps import SocialProtectionConfig
+
+logger = logging.getLogger(__name__)
+
+COUNT_MODE_EXACT = 'EXACT'
+COUNT_MODE_APPROXIMATE = 'APPROXIMATE'
+
+CACHE_KEY_PREFIX = 'social_protection_count'
+
+
+def _generation_key(model) -> str:
+    return f'{CACHE_KEY_PREFIX}:generation:{model._meta.label_lower}'
+
+
+def _get_generation(model) -> int:
+    return cache.get_or_set(_generation_key(model), 0, None)
+
+
+def invalidate_cached_counts(model):
+    """
+    Invalidate all cached counts of the model by moving it to a new generation of cache keys.
+    """
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _count_cache_key(queryset: QuerySet) -> Optional[str]:
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except Exception as exc:
+        # EmptyResultSet and similar, such queries are cheap to count
+        logger.debug("Count of queryset not cached: %s", exc)
+        return None
+    digest = hashlib.md5(f'{sql}:{json.dumps(params, default=str)}'.encode('utf-8')).hexdigest()
+    return f'{CACHE_KEY_PREFIX}:{queryset.model._meta.label_lower}:{_get_generation(queryset.model)}:{digest}'
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Number of rows estimated by the Postgres planner for the queryset, None for other vendors.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+    except Exception as exc:
+        logger.debug("Failed to estimate count of queryset: %s", exc)
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def exact_count(queryset: QuerySet) -> int:
+    ttl = SocialProtectionConfig.gql_total_count_cache_ttl
+    key = _count_cache_key(queryset) if ttl else None
+    if key is None:
+        return queryset.count()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, ttl)
+    return count
+
+
+def resolve_count_mode(mode: Optional[str] = None) -> str:
+    """
+    Count mode requested by the client, `gql_total_count_mode` if none was requested.
+    """
+    return (mode or SocialProtectionConfig.gql_total_count_mode or COUNT_MODE_EXACT).upper()
+
+
+def count_queryset(queryset: QuerySet, mode: Optional[str] = None) -> int:
+    mode = resolve_count_mode(mode)
+    if mode == COUNT_MODE_APPROXIMATE:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= SocialProtectionConfig.gql_total_count_estimate_threshold:
+            return estimate
+    return exact_count(queryset)
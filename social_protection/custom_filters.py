@@ -2,10 +2,12 @@ import logging
 import re
 
 from collections import namedtuple
+from django.db.models import Count, Exists, OuterRef, Q
 from django.db.models.query import QuerySet
-from typing import List
+from typing import Any, Callable, List
 
 from core.custom_filters import CustomFilterWizardInterface
+from social_protection.benefit_plan_schema import get_schema_definitions
 from social_protection.models import BenefitPlan
 
 
@@ -66,18 +68,7 @@ class BenefitPlanCustomFilterWizard(CustomFilterWizardInterface):
 
         :return: The updated queryset with additional filters applied for example: Queryset[Beneficiary].
         """
-        for filter_part in custom_filters:
-            if isinstance(filter_part, dict):
-                value_type = filter_part['type']
-                value = filter_part['value']
-                field = filter_part['field'] + '__' + filter_part['filter']
-            else:
-                field, value = filter_part.split('=')
-                field, value_type = field.rsplit('__', 1)
-            value = self.__cast_value(value, value_type)
-            filter_kwargs = {f"{relation}__json_ext__{field}" if relation else f"json_ext__{field}": value}
-            query = query.filter(**filter_kwargs).distinct()
-        return query
+        return CustomFilterQueryCompiler(self.__cast_value).apply(custom_filters, query, relation)
 
     def __process_schema_and_build_tuple(
             self,
@@ -87,24 +78,20 @@ class BenefitPlanCustomFilterWizard(CustomFilterWizardInterface):
         tuples_with_definitions = []
         existing_keys = set()
 
-        for benefit_plan in benefit_plan_query:
-            schema = benefit_plan.beneficiary_data_schema
-            if schema and 'properties' in schema:
-                properties = schema['properties']
-                for key, value in properties.items():
-                    if key not in existing_keys:
-                        tuple_with_definition = tuple_type(
-                            field=key,
-                            filter=self.FILTERS_BASED_ON_FIELD_TYPE[value['type']],
-                            type=value['type']
-                        )
-                        tuples_with_definitions.append(tuple_with_definition)
-                        existing_keys.add(key)
-
-            else:
+        for schema_definition in get_schema_definitions(benefit_plan_query):
+            if not schema_definition:
                 logger.warning('Cannot retrieve definitions of filters based '
                                'on the provided schema due to either empty schema '
                                'or missing properties in schema file')
+            for key, value_type in schema_definition:
+                if key not in existing_keys:
+                    tuple_with_definition = tuple_type(
+                        field=key,
+                        filter=self.FILTERS_BASED_ON_FIELD_TYPE[value_type],
+                        type=value_type
+                    )
+                    tuples_with_definitions.append(tuple_with_definition)
+                    existing_keys.add(key)
 
         return tuples_with_definitions
 
@@ -137,3 +124,93 @@ class BenefitPlanCustomFilterWizard(CustomFilterWizardInterface):
         cleaned_string = re.sub(pattern, '', string)
 
         return cleaned_string
+
+
+CompiledFilterPart = namedtuple('CompiledFilterPart', ['lookup', 'value'])
+
+
+class CustomFilterQueryCompiler:
+    """
+    Compiles custom filters into a single query.
+
+    All filter parts are parsed and cast once. Parts applied through a multi-valued relation (for example
+    `group__groupindividuals__individual`) are combined into one `Exists` subquery per relation instead of one
+    join per filter, so the result doesn't contain duplicates and doesn't require DISTINCT.
+    Each filter part may still be satisfied by a different related object, as with chained `filter()` calls.
+    """
+
+    def __init__(self, cast_value: Callable[[str, str], Any]):
+        self.cast_value = cast_value
+
+    def compile(self, custom_filters: List) -> List[CompiledFilterPart]:
+        compiled_parts = []
+        for filter_part in custom_filters:
+            if isinstance(filter_part, dict):
+                value_type = filter_part['type']
+                value = filter_part['value']
+                field = filter_part['field'] + '__' + filter_part['filter']
+            else:
+                field, value = filter_part.split('=')
+                field, value_type = field.rsplit('__', 1)
+            compiled_parts.append(CompiledFilterPart(f"json_ext__{field}", self.cast_value(value, value_type)))
+        return compiled_parts
+
+    def apply(self, custom_filters: List, query: QuerySet, relation: str = None) -> QuerySet:
+        compiled_parts = self.compile(custom_filters)
+        if not compiled_parts:
+            return query
+        if not relation:
+            return query.filter(*self._conditions(compiled_parts))
+
+        split_relation = self._split_multi_valued_relation(query.model, relation)
+        if split_relation is None:
+            # Only single-valued relations on the path, joins don't multiply rows
+            return query.filter(*self._conditions(compiled_parts, relation))
+        if split_relation is False:
+            for condition in self._conditions(compiled_parts, relation):
+                query = query.filter(condition)
+            return query.distinct()
+        return query.filter(self._build_exists(compiled_parts, *split_relation))
+
+    @staticmethod
+    def _conditions(compiled_parts: List[CompiledFilterPart], prefix: str = None) -> List[Q]:
+        return [
+            Q(**{f"{prefix}__{part.lookup}" if prefix else part.lookup: part.value})
+            for part in compiled_parts
+        ]
+
+    @staticmethod
+    def _split_multi_valued_relation(model, relation: str):
+        """
+        Split relation path on the first multi-valued hop.
+
+        :return: None if there is no multi-valued hop, False if the path goes through a many to many relation,
+        otherwise tuple of
+        (outer reference, related model, field of related model pointing to the outer object, remaining path).
+        """
+        parts = relation.split('__')
+        for index, part in enumerate(parts):
+            field = model._meta.get_field(part)
+            if field.one_to_many:
+                outer_reference = '__'.join(parts[:index]) or 'pk'
+                return outer_reference, field.related_model, field.field.name, '__'.join(parts[index + 1:])
+            if field.many_to_many:
+                return False
+            model = field.related_model
+        return None
+
+    def _build_exists(self, compiled_parts, outer_reference, related_model, link_field, remaining_relation):
+        subquery = related_model.objects.filter(**{link_field: OuterRef(outer_reference)})
+        conditions = self._conditions(compiled_parts, remaining_relation or None)
+        if len(conditions) == 1:
+            return Exists(subquery.filter(conditions[0]))
+
+        # Every filter part has to be matched by at least one related object
+        matches = {
+            f"custom_filter_match_{index}": Count('pk', filter=condition)
+            for index, condition in enumerate(conditions)
+        }
+        subquery = subquery.order_by().values(link_field).annotate(**matches).filter(
+            **{f"{name}__gt": 0 for name in matches}
+        )
+        return Exists(subquery)
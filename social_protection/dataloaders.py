@@ -0,0 +1,80 @@
+"""
+Per-request DataLoaders for relations of the social protection GraphQL types.
+
+`gql_optimizer` joins foreign keys it can see in the query, but not through fragments on interfaces or
+relations exposed by custom resolvers. In such cases every edge of a connection would load its individual,
+group, benefit plan and project separately. Loaders collect the ids requested during one GraphQL execution
+and resolve them with a single query per relation. Loaders are kept on `info.context`, so cached objects
+never outlive the request.
+"""
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from individual.models import Individual, Group
+from social_protection.models import BenefitPlan, Project
+
+LOADERS_CONTEXT_ATTRIBUTE = 'social_protection_dataloaders'
+
+LOCATION_CHAIN = ('location', 'location__parent', 'location__parent__parent', 'location__parent__parent__parent')
+
+
+class ModelByIdLoader(DataLoader):
+    model = None
+    select_related = ()
+
+    def batch_load_fn(self, keys):
+        # Related objects are loaded through the base manager, as Django does for foreign key access
+        objects = self.model._base_manager.filter(id__in=set(keys)).select_related(*self.select_related)
+        objects_by_id = {str(obj.id): obj for obj in objects}
+        return Promise.resolve([objects_by_id.get(str(key)) for key in keys])
+
+
+class IndividualLoader(ModelByIdLoader):
+    model = Individual
+    select_related = LOCATION_CHAIN
+
+
+class GroupLoader(ModelByIdLoader):
+    model = Group
+    select_related = LOCATION_CHAIN
+
+
+class BenefitPlanLoader(ModelByIdLoader):
+    model = BenefitPlan
+
+
+class ProjectLoader(ModelByIdLoader):
+    model = Project
+    select_related = ('activity',) + LOCATION_CHAIN
+
+
+LOADERS = {
+    'individual': IndividualLoader,
+    'group': GroupLoader,
+    'benefit_plan': BenefitPlanLoader,
+    'project': ProjectLoader,
+}
+
+
+def get_loader(info, name: str) -> DataLoader:
+    loaders = getattr(info.context, LOADERS_CONTEXT_ATTRIBUTE, None)
+    if loaders is None:
+        loaders = {}
+        setattr(info.context, LOADERS_CONTEXT_ATTRIBUTE, loaders)
+    if name not in loaders:
+        loaders[name] = LOADERS[name]()
+    return loaders[name]
+
+
+def load_related(instance, field_name: str, info):
+    """
+    Resolve a foreign key of the instance. Objects already joined by the queryset are returned directly,
+    other ones are batched with the remaining rows of the page.
+    """
+    field = instance._meta.get_field(field_name)
+    if field.is_cached(instance):
+        return getattr(instance, field_name)
+    related_id = getattr(instance, field.attname)
+    if related_id is None:
+        return None
+    return get_loader(info, field_name).load(related_id)
@@ -6,16 +6,34 @@ is_unit_test_env = getattr(settings, 'IS_UNIT_TEST_ENV', False)
 # Check if the 'opensearch_reports' app is in INSTALLED_APPS
 if 'opensearch_reports' in apps.app_configs and not is_unit_test_env:
     from opensearch_reports.service import BaseSyncDocument
+    from django.db.models.signals import post_init
     from django_opensearch_dsl import fields as opensearch_fields
     from django_opensearch_dsl.registries import registry
-    from social_protection.models import Beneficiary, BenefitPlan
-    from individual.models import Individual
+    from social_protection.models import Beneficiary, BenefitPlan, GroupBeneficiary, Project
+    from individual.models import Individual, Group
+    from social_protection.opensearch_indexing import (
+        GROUP_BENEFICIARY_INDEX,
+        PROJECT_INDEX,
+        group_head,
+        flatten_json_ext,
+        location_source,
+        project_enrollment,
+    )
+    from social_protection.opensearch_sync import (
+        defer_beneficiaries,
+        is_sync_deferred,
+        remember_indexed_benefit_plan,
+        sync_benefit_plan,
+    )
+
+    post_init.connect(remember_indexed_benefit_plan, sender=BenefitPlan)
 
     @registry.register_document
     class BeneficiaryDocument(BaseSyncDocument):
         DASHBOARD_NAME = 'Beneficiary'
 
         benefit_plan = opensearch_fields.ObjectField(properties={
+            'id': opensearch_fields.KeywordField(),
             'code': opensearch_fields.KeywordField(),
             'name': opensearch_fields.KeywordField(),
         })
@@ -46,24 +64,143 @@ if 'opensearch_reports' in apps.app_configs and not is_unit_test_env:
             ]
             queryset_pagination = 5000
 
+        def update(self, thing, action='index', *args, **kwargs):
+            if action == 'index' and is_sync_deferred():
+                defer_beneficiaries(thing)
+                return None
+            return super().update(thing, action, *args, **kwargs)
+
         def get_instances_from_related(self, related_instance):
             if isinstance(related_instance, BenefitPlan):
-                return Beneficiary.objects.filter(benefit_plan=related_instance)
+                # Only code and name of the plan are indexed, update them in place instead of reindexing
+                sync_benefit_plan(related_instance)
+                return Beneficiary.objects.none()
             elif isinstance(related_instance, Individual):
                 return Beneficiary.objects.filter(individual=related_instance)
 
         def prepare_json_ext(self, instance):
-            json_ext_data = instance.json_ext
-            json_data = self.__flatten_dict(json_ext_data)
-            return json_data
-
-        def __flatten_dict(self, d, parent_key='', sep='__'):
-            items = {}
-            for k, v in d.items():
-                new_key = f"{parent_key}{sep}{k}" if parent_key else k
-                if isinstance(v, dict):
-                    items.update(self.__flatten_dict(v, new_key, sep=sep))
-                else:
-                    items[new_key] = v
-            return items
+            return flatten_json_ext(instance.json_ext)
+
+    LOCATION_PROPERTIES = {
+        'code': opensearch_fields.KeywordField(),
+        'name': opensearch_fields.KeywordField(),
+        'path': opensearch_fields.KeywordField(),
+    }
+
+    @registry.register_document
+    class GroupBeneficiaryDocument(BaseSyncDocument):
+        DASHBOARD_NAME = 'GroupBeneficiary'
+
+        benefit_plan = opensearch_fields.ObjectField(properties={
+            'id': opensearch_fields.KeywordField(),
+            'code': opensearch_fields.KeywordField(),
+            'name': opensearch_fields.KeywordField(),
+        })
+        group = opensearch_fields.ObjectField(properties={
+            'id': opensearch_fields.KeywordField(),
+            'code': opensearch_fields.KeywordField(),
+        })
+        head = opensearch_fields.ObjectField(properties={
+            'first_name': opensearch_fields.KeywordField(),
+            'last_name': opensearch_fields.KeywordField(),
+        })
+        location = opensearch_fields.ObjectField(properties=LOCATION_PROPERTIES)
+        status = opensearch_fields.KeywordField(fields={
+            'status_key': opensearch_fields.KeywordField()}
+        )
+        date_created = opensearch_fields.DateField()
+        json_ext = opensearch_fields.ObjectField()
+
+        class Index:
+            name = GROUP_BENEFICIARY_INDEX
+            settings = {
+                'number_of_shards': 1,
+                'number_of_replicas': 0
+            }
+            auto_refresh = True
+
+        class Django:
+            model = GroupBeneficiary
+            related_models = [BenefitPlan, Group]
+            fields = [
+                'id'
+            ]
+            queryset_pagination = 5000
+
+        def get_instances_from_related(self, related_instance):
+            if isinstance(related_instance, BenefitPlan):
+                # Only code and name of the plan are indexed, update them in place instead of reindexing
+                sync_benefit_plan(related_instance)
+                return GroupBeneficiary.objects.none()
+            elif isinstance(related_instance, Group):
+                return GroupBeneficiary.objects.filter(group=related_instance)
+
+        def prepare_head(self, instance):
+            return group_head(instance.group)
+
+        def prepare_location(self, instance):
+            return location_source(instance.group.location)
+
+        def prepare_json_ext(self, instance):
+            return flatten_json_ext(instance.json_ext)
+
+    @registry.register_document
+    class ProjectDocument(BaseSyncDocument):
+        DASHBOARD_NAME = 'Project'
+
+        name = opensearch_fields.KeywordField()
+        status = opensearch_fields.KeywordField()
+        benefit_plan = opensearch_fields.ObjectField(properties={
+            'id': opensearch_fields.KeywordField(),
+            'code': opensearch_fields.KeywordField(),
+            'name': opensearch_fields.KeywordField(),
+            'type': opensearch_fields.KeywordField(),
+        })
+        activity = opensearch_fields.KeywordField()
+        location = opensearch_fields.ObjectField(properties=LOCATION_PROPERTIES)
+        working_days = opensearch_fields.IntegerField()
+        enrollment = opensearch_fields.ObjectField(properties={
+            'enrolled_beneficiaries': opensearch_fields.IntegerField(),
+            'active_beneficiaries': opensearch_fields.IntegerField(),
+            'enrolled_groups': opensearch_fields.IntegerField(),
+            'active_groups': opensearch_fields.IntegerField(),
+            'enrolled': opensearch_fields.IntegerField(),
+            'active': opensearch_fields.IntegerField(),
+            'target': opensearch_fields.IntegerField(),
+            'target_reached': opensearch_fields.FloatField(),
+        })
+        date_created = opensearch_fields.DateField()
+        json_ext = opensearch_fields.ObjectField()
 
+        class Index:
+            name = PROJECT_INDEX
+            settings = {
+                'number_of_shards': 1,
+                'number_of_replicas': 0
+            }
+            auto_refresh = True
+
+        class Django:
+            model = Project
+            # Enrollment counts are reindexed by the enrollment services with `sync_projects`
+            related_models = [BenefitPlan]
+            fields = [
+                'id'
+            ]
+            queryset_pagination = 5000
+
+        def get_instances_from_related(self, related_instance):
+            if isinstance(related_instance, BenefitPlan):
+                return Project.objects.filter(benefit_plan=related_instance)
+
+        def prepare_activity(self, instance):
+            return instance.activity.name
+
+        def prepare_location(self, instance):
+            return location_source(instance.location)
+
+        def prepare_enrollment(self, instance):
+            return project_enrollment(instance)
+
+        def prepare_json_ext(self, instance):
+            return flatten_json_ext(instance.json_ext)
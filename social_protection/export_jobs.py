@@ -0,0 +1,260 @@
+"""
+Background exports of beneficiaries and group beneficiaries.
+
+The synchronous export loads the whole queryset into a DataFrame and unfolds `json_ext` with `pd.json_normalize`,
+which doesn't fit into a request (nor into memory) for national registries. Background exports:
+- resolve columns of `json_ext` upfront with a single `jsonb_object_keys` query (a streamed pass over `json_ext`
+  on other databases), so all chunks share the same header,
+- stream the queryset with a server side cursor in chunks of `export_chunk_size` rows,
+- unfold `json_ext` of each chunk separately and append it to the export file. Export patches of the query
+  (`export_patches`, e.g. `patch_details`) are applied to every chunk, so the file has the columns of the
+  synchronous export,
+- record progress on the `BeneficiaryExportJob`, which is exposed through GraphQL.
+
+Exports are written as CSV or Parquet (`social_protection.parquet`). Without patches nested objects of `json_ext`
+are exported as JSON strings.
+"""
+import json
+import logging
+import os
+import tempfile
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models.query import QuerySet
+
+from core import datetime
+from social_protection.apps import SocialProtectionConfig
+from social_protection.background import run_in_background
+from social_protection.benefit_plan_schema import get_schema_definitions
+from social_protection.models import BenefitPlan, BeneficiaryExportJob
+
+logger = logging.getLogger(__name__)
+
+JSON_EXT_FIELD = 'json_ext'
+
+
+def get_export_file_path(job: BeneficiaryExportJob) -> str:
+    return f"social_protection_exports/{job.export_type.lower()}_{job.id}.{job.file_format}"
+
+
+def _nested_keys(value: dict, prefix: str = '') -> Iterator[str]:
+    # Paths of leaves, as named by `pd.json_normalize`
+    for key, nested in value.items():
+        if isinstance(nested, dict):
+            yield from _nested_keys(nested, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}'
+
+
+def get_json_ext_keys(queryset: QuerySet, nested: bool = False) -> List[str]:
+    """
+    Sorted top level keys of `json_ext` of all records in the queryset. With `nested` keys of nested objects are
+    resolved to dotted paths of their leaves, the columns of `json_ext` unfolded with `pd.json_normalize`.
+    """
+    json_ext_query = queryset.order_by().values(JSON_EXT_FIELD)
+    if connection.vendor == 'postgresql' and nested:
+        sql, params = json_ext_query.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE json_ext_keys(path, value) AS (
+                    SELECT json_ext_key.key, json_ext_key.value
+                    FROM ({sql}) records,
+                    jsonb_each(
+                        CASE WHEN jsonb_typeof(records."Json_ext") = 'object'
+                        THEN records."Json_ext" ELSE '{{}}'::jsonb END
+                    ) json_ext_key
+                    UNION ALL
+                    SELECT json_ext_keys.path || '.' || nested_key.key, nested_key.value
+                    FROM json_ext_keys, jsonb_each(json_ext_keys.value) nested_key
+                    WHERE jsonb_typeof(json_ext_keys.value) = 'object'
+                )
+                SELECT DISTINCT path FROM json_ext_keys WHERE jsonb_typeof(value) <> 'object'
+                """,
+                params,
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+    if connection.vendor == 'postgresql':
+        sql, params = json_ext_query.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT DISTINCT json_ext_key
+                FROM ({sql}) records,
+                jsonb_object_keys(
+                    CASE WHEN jsonb_typeof(records."Json_ext") = 'object' THEN records."Json_ext" ELSE '{{}}'::jsonb END
+                ) json_ext_key
+                """,
+                params,
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+
+    keys = set()
+    for json_ext in json_ext_query.values_list(JSON_EXT_FIELD, flat=True).iterator():
+        if isinstance(json_ext, dict):
+            keys.update(_nested_keys(json_ext) if nested else json_ext.keys())
+    return sorted(keys)
+
+
+def _json_ext_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def iterate_patched_export_chunks(queryset: QuerySet, fields: List[str], column_names: Dict[str, str],
+                                  chunk_size: int, patches: List[Callable[[pd.DataFrame], pd.DataFrame]],
+                                  json_ext_keys: List[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield DataFrames of at most `chunk_size` rows transformed by export patches, like the synchronous export.
+    Columns of `json_ext` unfolded by patches are resolved upfront, so all chunks share the header.
+    """
+    if JSON_EXT_FIELD in fields and json_ext_keys is None:
+        json_ext_keys = get_json_ext_keys(queryset, nested=True)
+    header = None
+    records = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        chunk = pd.DataFrame.from_records(chunk, columns=fields)
+        for patch in patches:
+            chunk = patch(chunk)
+        if header is None:
+            header = list(chunk.columns)
+            if JSON_EXT_FIELD in fields and JSON_EXT_FIELD not in header:
+                header += [key for key in json_ext_keys if key not in header]
+        else:
+            skipped = [column for column in chunk.columns if column not in header]
+            if skipped:
+                logger.warning("Export columns %s not in the header of the first chunk are skipped", skipped)
+        chunk = chunk.reindex(columns=header)
+        chunk.columns = [column_names.get(column) or column for column in header]
+        yield chunk
+
+
+def iterate_export_chunks(queryset: QuerySet, fields: List[str], column_names: Dict[str, str],
+                          chunk_size: int, json_ext_keys: List[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield DataFrames of at most `chunk_size` rows with `json_ext` unfolded into `json_ext_keys` columns.
+    """
+    unfold_json_ext = JSON_EXT_FIELD in fields
+    base_fields = [field for field in fields if field != JSON_EXT_FIELD]
+    if unfold_json_ext and json_ext_keys is None:
+        json_ext_keys = get_json_ext_keys(queryset)
+    json_ext_keys = json_ext_keys if unfold_json_ext else []
+    columns = [column_names.get(column) or column for column in base_fields + json_ext_keys]
+
+    records = queryset.values(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        rows = []
+        for record in chunk:
+            json_ext = record.get(JSON_EXT_FIELD) if unfold_json_ext else None
+            json_ext = json_ext if isinstance(json_ext, dict) else {}
+            rows.append(
+                [record[field] for field in base_fields]
+                + [_json_ext_value(json_ext.get(key)) for key in json_ext_keys]
+            )
+        yield pd.DataFrame(rows, columns=columns)
+
+
+class CsvExportWriter:
+    def __init__(self, handle, column_types=None):
+        self.handle = handle
+        self.header_written = False
+
+    def write(self, chunk: pd.DataFrame):
+        chunk.to_csv(self.handle, header=not self.header_written, index=False)
+        self.header_written = True
+
+    def close(self):
+        pass
+
+
+def _parquet_writer(handle, column_types=None):
+    from social_protection.parquet import ParquetExportWriter
+    return ParquetExportWriter(handle, column_types)
+
+
+# format -> (writer factory, mode of the temporary file)
+EXPORT_WRITERS = {
+    'csv': (CsvExportWriter, 'w'),
+    'parquet': (_parquet_writer, 'wb'),
+}
+
+
+def get_schema_column_types(queryset: QuerySet, column_names: Dict[str, str]) -> Dict[str, str]:
+    """
+    Types declared in schemas of the benefit plans of exported records, mapped by export column names.
+    """
+    benefit_plans = BenefitPlan.objects.filter(id__in=queryset.order_by().values('benefit_plan_id'))
+    column_types = {}
+    for schema_definition in get_schema_definitions(benefit_plans):
+        for field, field_type in schema_definition:
+            column_types.setdefault(column_names.get(field) or field, field_type)
+    return column_types
+
+
+def run_export_job(job_id, queryset: QuerySet, fields: List[str], column_names: Dict[str, str],
+                   patches: Optional[List[Callable[[pd.DataFrame], pd.DataFrame]]] = None):
+    job = BeneficiaryExportJob.objects.get(id=job_id)
+    BeneficiaryExportJob.objects.filter(id=job_id).update(
+        status=BeneficiaryExportJob.Status.RUNNING,
+        total_rows=queryset.count(),
+    )
+    writer_class, file_mode = EXPORT_WRITERS[job.file_format]
+    tmp_file = tempfile.NamedTemporaryFile(mode=file_mode, suffix=f'.{job.file_format}', delete=False)
+    try:
+        processed_rows = 0
+        column_types = get_schema_column_types(queryset, column_names) if job.file_format != 'csv' else None
+        writer = writer_class(tmp_file, column_types)
+        chunk_size = SocialProtectionConfig.export_chunk_size
+        chunks = iterate_patched_export_chunks(queryset, fields, column_names, chunk_size, patches) if patches \
+            else iterate_export_chunks(queryset, fields, column_names, chunk_size)
+        for chunk in chunks:
+            writer.write(chunk)
+            processed_rows += len(chunk)
+            BeneficiaryExportJob.objects.filter(id=job_id).update(processed_rows=processed_rows)
+        writer.close()
+        tmp_file.close()
+
+        with open(tmp_file.name, 'rb') as export_file:
+            file_name = default_storage.save(get_export_file_path(job), File(export_file))
+        BeneficiaryExportJob.objects.filter(id=job_id).update(
+            status=BeneficiaryExportJob.Status.COMPLETED,
+            file_name=file_name,
+            date_finished=datetime.datetime.now(),
+        )
+    except Exception as exc:
+        logger.error("Beneficiary export %s failed", job_id, exc_info=exc)
+        BeneficiaryExportJob.objects.filter(id=job_id).update(
+            status=BeneficiaryExportJob.Status.FAILED,
+            error=str(exc),
+            date_finished=datetime.datetime.now(),
+        )
+    finally:
+        tmp_file.close()
+        os.remove(tmp_file.name)
+
+
+def start_export_job(user, export_type: str, queryset: QuerySet, fields: List[str],
+                     column_names: Dict[str, str], file_format: str = 'csv',
+                     patches: Optional[List[Callable[[pd.DataFrame], pd.DataFrame]]] = None) -> BeneficiaryExportJob:
+    if file_format not in EXPORT_WRITERS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    if file_format == 'parquet':
+        from social_protection.parquet import import_pyarrow
+        # Fail within the request if the optional dependency is missing
+        import_pyarrow()
+    job = BeneficiaryExportJob(user=user, export_type=export_type, file_format=file_format)
+    job.save()
+    run_in_background(run_export_job, job.id, queryset, fields, column_names, patches)
+    return job
@@ -9,6 +9,7 @@ import graphene
 import pandas as pd
 from django.db import models
 from graphene.types.generic import GenericScalar
+from graphene.utils.str_converters import to_snake_case
 from pandas import DataFrame
 
 from core import fields
@@ -33,16 +34,10 @@ class ExportableSocialProtectionQueryMixin(ExportableQueryMixin):
                 f"CSV export cannot be created")
 
         def exporter(cls, self, info, **kwargs):
-            custom_filters = kwargs.pop("customFilters", None)
             export_fields = [cls._adjust_notation(f) for f in kwargs.pop('fields')]
             fields_mapping = json.loads(kwargs.pop('fields_columns'))
 
-            source_field = getattr(cls, field_name)
-            filter_kwargs = {k: v for k, v in kwargs.items() if k in source_field.filtering_args}
-
-            qs = default_resolve(None, info, **kwargs)
-            qs = qs.filter(**filter_kwargs)
-            qs = cls.__append_custom_filters(custom_filters, qs, fields_mapping)
+            qs = cls._build_export_queryset(field_name, info, fields_mapping, **kwargs)
             export_file = ExportableQueryModel\
                 .create_csv_export(qs, export_fields, info.context.user, column_names=fields_mapping,
                                    patches=cls.get_patches_for_field(field_name))
@@ -51,6 +46,36 @@ class ExportableSocialProtectionQueryMixin(ExportableQueryMixin):
 
         setattr(cls, new_function_name, types.MethodType(exporter, cls))
 
+    @classmethod
+    def _build_export_queryset(cls, field_name, info, fields_mapping, **kwargs):
+        default_resolve = getattr(cls, F"resolve_{field_name}")
+        custom_filters = kwargs.pop("customFilters", None)
+
+        source_field = getattr(cls, field_name)
+        filter_kwargs = {k: v for k, v in kwargs.items() if k in source_field.filtering_args}
+
+        qs = default_resolve(None, info, **kwargs)
+        qs = qs.filter(**filter_kwargs)
+        return cls.__append_custom_filters(custom_filters, qs, fields_mapping)
+
+    @classmethod
+    def start_background_export(cls, field_name, export_type, info, fields, fields_columns, filters=None,
+                                file_format='csv'):
+        """
+        Start a chunked export of the `field_name` query running in the background thread pool.
+        `filters` are the arguments of the exported query, names can be provided in camel case.
+        """
+        from social_protection.export_jobs import start_export_job
+        export_fields = [cls._adjust_notation(f) for f in fields]
+        fields_mapping = json.loads(fields_columns) if isinstance(fields_columns, str) else (fields_columns or {})
+        kwargs = {
+            (key if key == "customFilters" else to_snake_case(key)): value
+            for key, value in (filters or {}).items()
+        }
+        qs = cls._build_export_queryset(field_name, info, fields_mapping, **kwargs)
+        return start_export_job(info.context.user, export_type, qs, export_fields, fields_mapping, file_format,
+                                patches=cls.get_patches_for_field(field_name))
+
     @classmethod
     def __append_custom_filters(cls, custom_filters, queryset, fields_mapping):
         if custom_filters:
@@ -0,0 +1,228 @@
+"""
+Detection of likely duplicates among uploaded rows and existing beneficiaries of a benefit plan.
+
+Rows are grouped into blocks by blocking keys made of the phonetic code (Soundex) of a name, the date of birth and
+the location code. Every row has two keys, one for the first name and one for the last name, so a spelling variant
+of either name still shares a block with the original record. Names are compared only within blocks, which keeps the
+work near-linear in the number of rows. Pairs with a similarity of full names of at least
+`fuzzy_duplicate_threshold` are reported. Blocks larger than `fuzzy_duplicate_max_block_size` are compared only up to
+that size, so a degenerate block (e.g. a common name and date of birth without location) can't make the check
+quadratic. Rows without a date of birth are not checked.
+
+Rows of update uploads are never reported as duplicates of the beneficiary they update (the `ID` column).
+
+Existing beneficiaries are fetched only for the dates of birth present in the upload. Uploads of group benefit plans
+are compared with the members of the groups enrolled in the plan, a matched member is reported as the id of its
+group beneficiary.
+"""
+import datetime
+import logging
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import pandas as pd
+from django.db.models import OuterRef, Subquery
+
+from individual.models import GroupIndividual
+from social_protection.apps import SocialProtectionConfig
+from social_protection.models import Beneficiary, BenefitPlan, GroupBeneficiary
+
+logger = logging.getLogger(__name__)
+
+DOB_BATCH_SIZE = 1000
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+class DuplicateCandidate(NamedTuple):
+    id: str
+    name: str
+    existing: bool
+    # Beneficiary updated by an uploaded row
+    beneficiary_id: Optional[str] = None
+
+
+def normalize_name(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(character for character in value if not unicodedata.combining(character))
+    return ' '.join(''.join(c if c.isalpha() else ' ' for c in value.lower()).split())
+
+
+def soundex(name: str) -> str:
+    """
+    American Soundex code of the normalized name, empty string for names without letters.
+    """
+    letters = [character for character in name if 'a' <= character <= 'z']
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w don't separate letters with the same code
+        if letter not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def _normalize_dob(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return str(value).strip()[:10]
+
+
+def _normalize_location(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    return str(value).strip().lower()
+
+
+def _normalize_id(value) -> Optional[str]:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return str(value).strip().lower() or None
+
+
+def blocking_keys(first_name: str, last_name: str, dob: str, location: str) -> List[tuple]:
+    """
+    Blocking keys of a record with normalized names, records without a date of birth are not blocked.
+    """
+    if not dob:
+        return []
+    return [
+        (name_kind, code, dob, location)
+        for name_kind, code in (('first_name', soundex(first_name)), ('last_name', soundex(last_name)))
+        if code
+    ]
+
+
+def _is_iso_date(value: str) -> bool:
+    try:
+        datetime.date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _existing_beneficiaries(benefit_plan: BenefitPlan, dobs: Iterable[str]):
+    # Dates of birth in other formats can't match stored dates
+    dobs = sorted(dob for dob in dobs if _is_iso_date(dob))
+    for start in range(0, len(dobs), DOB_BATCH_SIZE):
+        if benefit_plan.type == BenefitPlan.BenefitPlanType.GROUP_TYPE:
+            yield from _existing_group_members(benefit_plan, dobs[start:start + DOB_BATCH_SIZE])
+            continue
+        yield from Beneficiary.objects \
+            .filter(benefit_plan_id=benefit_plan.id, is_deleted=False,
+                    individual__dob__in=dobs[start:start + DOB_BATCH_SIZE]) \
+            .order_by() \
+            .values_list('id', 'individual__first_name', 'individual__last_name', 'individual__dob',
+                         'individual__location__code') \
+            .iterator()
+
+
+def _existing_group_members(benefit_plan: BenefitPlan, dobs: List[str]):
+    group_beneficiaries = GroupBeneficiary.objects.filter(benefit_plan_id=benefit_plan.id, is_deleted=False)
+    return GroupIndividual.objects \
+        .filter(is_deleted=False, group_id__in=group_beneficiaries.values('group_id'), individual__dob__in=dobs) \
+        .annotate(beneficiary_id=Subquery(
+            group_beneficiaries.filter(group_id=OuterRef('group_id')).order_by().values('id')[:1]
+        )) \
+        .order_by() \
+        .values_list('beneficiary_id', 'individual__first_name', 'individual__last_name', 'individual__dob',
+                     'individual__location__code') \
+        .iterator()
+
+
+def _column(dataframe: pd.DataFrame, column: str) -> list:
+    return dataframe[column].tolist() if column in dataframe.columns else [None] * len(dataframe)
+
+
+def find_fuzzy_duplicates(dataframe: pd.DataFrame, benefit_plan: BenefitPlan,
+                          threshold: Optional[float] = None, max_block_size: Optional[int] = None) -> Dict[str, dict]:
+    """
+    Likely duplicates of uploaded rows, by row id. Every duplicate is described by the id of the matched record,
+    whether it is an existing beneficiary (or an earlier row of the upload) and the similarity of names.
+    """
+    threshold = threshold if threshold is not None else SocialProtectionConfig.fuzzy_duplicate_threshold
+    max_block_size = max_block_size or SocialProtectionConfig.fuzzy_duplicate_max_block_size
+    if dataframe.empty:
+        return {}
+
+    uploaded = []
+    for row_id, beneficiary_id, first_name, last_name, dob, location in zip(
+            _column(dataframe, 'id'), _column(dataframe, 'ID'), _column(dataframe, 'first_name'),
+            _column(dataframe, 'last_name'), _column(dataframe, 'dob'), _column(dataframe, 'location_code')):
+        first_name, last_name = normalize_name(first_name), normalize_name(last_name)
+        keys = blocking_keys(first_name, last_name, _normalize_dob(dob), _normalize_location(location))
+        if keys:
+            candidate = DuplicateCandidate(
+                str(row_id), f'{first_name} {last_name}', False, _normalize_id(beneficiary_id))
+            uploaded.append((candidate, keys))
+    if not uploaded:
+        return {}
+
+    blocks = defaultdict(list)
+    dobs = {keys[0][2] for _, keys in uploaded}
+    for beneficiary_id, first_name, last_name, dob, location in _existing_beneficiaries(benefit_plan, dobs):
+        first_name, last_name = normalize_name(first_name), normalize_name(last_name)
+        candidate = DuplicateCandidate(str(beneficiary_id), f'{first_name} {last_name}', True)
+        for key in blocking_keys(first_name, last_name, _normalize_dob(dob), _normalize_location(location)):
+            blocks[key].append(candidate)
+
+    duplicates = {}
+    oversized_blocks = set()
+    for candidate, keys in uploaded:
+        for key in keys:
+            block = blocks[key]
+            if candidate.id not in duplicates:
+                if len(block) > max_block_size:
+                    oversized_blocks.add(key)
+                match = _best_match(candidate, block[:max_block_size], threshold)
+                if match:
+                    duplicates[candidate.id] = match
+            block.append(candidate)
+    if oversized_blocks:
+        logger.warning("Fuzzy duplicate check of benefit plan %s compared only %s records of %s blocks",
+                       benefit_plan.id, max_block_size, len(oversized_blocks))
+    return duplicates
+
+
+def _best_match(candidate: DuplicateCandidate, block: List[DuplicateCandidate], threshold: float) -> Optional[dict]:
+    best = None
+    for other in block:
+        if other.id == candidate.id or (other.existing and other.id == candidate.beneficiary_id):
+            continue
+        similarity = SequenceMatcher(None, candidate.name, other.name).ratio()
+        if similarity >= threshold and (best is None or similarity > best['similarity']):
+            best = {'duplicate_of': other.id, 'existing': other.existing, 'similarity': round(similarity, 3)}
+    return best
+
+
+def fuzzy_duplicate_validation(duplicate: dict) -> dict:
+    """
+    Failed validation of an uploaded row, in the format of `validation_errors` of data sources.
+    """
+    source = 'beneficiary' if duplicate['existing'] else 'uploaded row'
+    return {
+        'success': False,
+        'field_name': 'fuzzy_duplicate',
+        'note': f"Possible duplicate of {source} {duplicate['duplicate_of']} "
+                f"(name similarity {duplicate['similarity']})",
+    }
@@ -1,9 +1,11 @@
 import graphene
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef
+from django.db.models.functions import Cast
 from graphene import ObjectType
 from graphene_django import DjangoObjectType
 import django_filters
+import graphene_django_optimizer as gql_optimizer
 from graphene_django.filter import DjangoFilterConnectionField
 
 from contribution_plan.models import PaymentPlan
@@ -13,28 +15,77 @@ from individual.gql_queries import IndividualGQLType, GroupGQLType, \
     IndividualDataSourceUploadGQLType
 from location.models import Location
 from social_protection.apps import SocialProtectionConfig
+from social_protection.benefit_plan_schema import get_schema_definitions
+from social_protection.dataloaders import load_related
+from social_protection.import_progress import get_stage_timings, get_update_summary, get_upload_stage
 from social_protection.models import (
     Beneficiary, BenefitPlan, GroupBeneficiary, BenefitPlanDataUploadRecords,
-    Activity, Project,
+    Activity, Project, BeneficiaryExportJob,
 )
 
 
-def _have_permissions(user, permission):
+PERMISSIONS_CONTEXT_ATTRIBUTE = 'social_protection_permissions'
+
+
+def _have_permissions(user, permission, context=None):
+    """
+    With the GraphQL `context` given, the result is kept on the context, so fields resolved for every row of a
+    page evaluate the permissions of the user once per request.
+    """
     if isinstance(user, AnonymousUser):
         return False
     if not user.id:
         return False
-    return user.has_perms(permission)
+    if context is None:
+        return user.has_perms(permission)
+    checked = getattr(context, PERMISSIONS_CONTEXT_ATTRIBUTE, None)
+    if checked is None:
+        checked = {}
+        setattr(context, PERMISSIONS_CONTEXT_ATTRIBUTE, checked)
+    key = (str(user.id), (permission,) if isinstance(permission, str) else tuple(permission))
+    if key not in checked:
+        checked[key] = user.has_perms(permission)
+    return checked[key]
+
+
+def annotate_has_payment_plans(query):
+    """
+    Annotate benefit plans (or their history records) with the existence of payment plans, so that
+    `hasPaymentPlans` of a whole page is resolved within the page query.
+    """
+    # PaymentPlan references benefit plans through a generic relation, cast the reference to its column type
+    benefit_plan_id_field = PaymentPlan._meta.get_field('benefit_plan_id').clone()
+    return query.annotate(payment_plans_exist=Exists(
+        PaymentPlan.objects.filter(benefit_plan_id=Cast(OuterRef('id'), output_field=benefit_plan_id_field))
+    ))
+
+
+class HasPaymentPlansMixin:
+    def resolve_has_payment_plans(self, info):
+        payment_plans_exist = getattr(self, 'payment_plans_exist', None)
+        if payment_plans_exist is not None:
+            return payment_plans_exist
+        return PaymentPlan.objects.filter(benefit_plan_id=self.id).exists()
+
+
+class BeneficiaryRelationsMixin:
+    @gql_optimizer.resolver_hints(model_field='benefit_plan')
+    def resolve_benefit_plan(self, info):
+        return load_related(self, 'benefit_plan', info)
+
+    @gql_optimizer.resolver_hints(model_field='project')
+    def resolve_project(self, info):
+        return load_related(self, 'project', info)
 
 
 class JsonExtMixin:
     def resolve_json_ext(self, info):
-        if _have_permissions(info.context.user, SocialProtectionConfig.gql_schema_search_perms):
+        if _have_permissions(info.context.user, SocialProtectionConfig.gql_schema_search_perms, info.context):
             return self.json_ext
         return None
 
 
-class BenefitPlanGQLType(DjangoObjectType, JsonExtMixin):
+class BenefitPlanGQLType(DjangoObjectType, JsonExtMixin, HasPaymentPlansMixin):
     uuid = graphene.String(source='uuid')
     has_payment_plans = graphene.Boolean()
 
@@ -60,13 +111,10 @@ class BenefitPlanGQLType(DjangoObjectType, JsonExtMixin):
         connection_class = ExtendedConnection
 
     def resolve_beneficiary_data_schema(self, info):
-        if _have_permissions(info.context.user, SocialProtectionConfig.gql_schema_search_perms):
+        if _have_permissions(info.context.user, SocialProtectionConfig.gql_schema_search_perms, info.context):
             return self.beneficiary_data_schema
         return None
 
-    def resolve_has_payment_plans(self, info):
-        return PaymentPlan.objects.filter(benefit_plan_id=self.id).exists()
-
 
 class BeneficiarySharedFilterMixin:
     location_prefix = None  # must be defined in subclass
@@ -174,7 +222,7 @@ class BeneficiaryFilter(django_filters.FilterSet, BeneficiarySharedFilterMixin):
             Q(individual__location__id__in=village_matches)
         )
 
-class BeneficiaryGQLType(DjangoObjectType, JsonExtMixin):
+class BeneficiaryGQLType(DjangoObjectType, JsonExtMixin, BeneficiaryRelationsMixin):
     uuid = graphene.String(source='uuid')
     is_eligible = graphene.Boolean()
 
@@ -187,6 +235,10 @@ class BeneficiaryGQLType(DjangoObjectType, JsonExtMixin):
     def resolve_is_eligible(self, info):
         return self.is_eligible
 
+    @gql_optimizer.resolver_hints(model_field='individual')
+    def resolve_individual(self, info):
+        return load_related(self, 'individual', info)
+
 
 class GroupBeneficiaryFilter(django_filters.FilterSet, BeneficiarySharedFilterMixin):
     location_prefix = "group__"
@@ -240,7 +292,7 @@ class GroupBeneficiaryFilter(django_filters.FilterSet, BeneficiarySharedFilterMi
             Q(group__location__id__in=village_matches)
         )
 
-class GroupBeneficiaryGQLType(DjangoObjectType, JsonExtMixin):
+class GroupBeneficiaryGQLType(DjangoObjectType, JsonExtMixin, BeneficiaryRelationsMixin):
     uuid = graphene.String(source='uuid')
     is_eligible = graphene.Boolean()
 
@@ -253,9 +305,16 @@ class GroupBeneficiaryGQLType(DjangoObjectType, JsonExtMixin):
     def resolve_is_eligible(self, info):
         return self.is_eligible
 
+    @gql_optimizer.resolver_hints(model_field='group')
+    def resolve_group(self, info):
+        return load_related(self, 'group', info)
+
 
 class BenefitPlanDataUploadQGLType(DjangoObjectType, JsonExtMixin):
     uuid = graphene.String(source='uuid')
+    import_stage = graphene.String()
+    stage_timings = graphene.JSONString(description="Wall time, rows and queries of each step of the import")
+    update_summary = graphene.JSONString(description="Number of changed, unchanged and new rows of an update upload")
 
     class Meta:
         model = BenefitPlanDataUploadRecords
@@ -272,22 +331,67 @@ class BenefitPlanDataUploadQGLType(DjangoObjectType, JsonExtMixin):
         }
         connection_class = ExtendedConnection
 
+    @gql_optimizer.resolver_hints(model_field='data_upload')
+    def resolve_import_stage(self, info):
+        return get_upload_stage(self.data_upload)
+
+    @gql_optimizer.resolver_hints(model_field='data_upload')
+    def resolve_stage_timings(self, info):
+        return get_stage_timings(self.data_upload)
+
+    @gql_optimizer.resolver_hints(model_field='data_upload')
+    def resolve_update_summary(self, info):
+        return get_update_summary(self.data_upload)
+
+
+class BeneficiaryExportJobGQLType(DjangoObjectType):
+    progress = graphene.Float(description="Percentage of exported rows")
+
+    class Meta:
+        model = BeneficiaryExportJob
+        exclude = ("user",)
+
+    def resolve_progress(self, info):
+        if not self.total_rows:
+            return 100.0 if self.status == BeneficiaryExportJob.Status.COMPLETED else 0.0
+        return round(100.0 * self.processed_rows / self.total_rows, 2)
+
+
+class BenefitPlanStatisticsDimensionEnum(graphene.Enum):
+    BENEFIT_PLAN = 'benefit_plan_id'
+    BENEFICIARY_TYPE = 'beneficiary_type'
+    STATUS = 'status'
+    PROJECT = 'project_id'
+    REGION = 'region_id'
+
+
+class BenefitPlanStatisticsGQLType(ObjectType):
+    """
+    Number of beneficiaries for a combination of the requested dimensions, other dimensions are null.
+    """
+    benefit_plan_id = graphene.UUID()
+    beneficiary_type = graphene.String()
+    status = graphene.String()
+    project_id = graphene.UUID()
+    region_id = graphene.Int()
+    region_code = graphene.String()
+    region_name = graphene.String()
+    count = graphene.Int()
+
 
 class BenefitPlanSchemaFieldsGQLType(ObjectType):
     schema_fields = graphene.List(graphene.String)
 
     def resolve_schema_fields(self, info, **kwargs):
-        schemas = self.values_list("beneficiary_data_schema__properties", flat=True)
         field_list = set(
             f'json_ext__{field}'
-            for schema in schemas  # Iterate over each schema
-            if schema  # Ensure the schema is not None or empty
-            for field in schema  # Iterate over fields in the schema
+            for schema_definition in get_schema_definitions(self)
+            for field, _ in schema_definition
         )
         return field_list
 
 
-class BenefitPlanHistoryGQLType(DjangoObjectType, JsonExtMixin):
+class BenefitPlanHistoryGQLType(DjangoObjectType, JsonExtMixin, HasPaymentPlansMixin):
     uuid = graphene.String(source='uuid')
     has_payment_plans = graphene.Boolean()
 
@@ -315,13 +419,10 @@ class BenefitPlanHistoryGQLType(DjangoObjectType, JsonExtMixin):
         connection_class = ExtendedConnection
 
     def resolve_beneficiary_data_schema(self, info):
-        if _have_permissions(info.context.user, SocialProtectionConfig.gql_schema_search_perms):
+        if _have_permissions(info.context.user, SocialProtectionConfig.gql_schema_search_perms, info.context):
             return self.beneficiary_data_schema
         return None
 
-    def resolve_has_payment_plans(self, info):
-        return PaymentPlan.objects.filter(benefit_plan_id=self.id).exists()
-
 
 class ActivityFilter(django_filters.FilterSet):
     class Meta:
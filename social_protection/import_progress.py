@@ -0,0 +1,165 @@
+"""
+Stage and progress of beneficiary imports.
+
+The stage of an import is stored in `IndividualDataSourceUpload.json_ext['import_stage']` next to the upload
+status, so it can be polled while the workflow runs in the background:
+- SAVED: rows of the file are stored as individual data sources,
+- QUEUED: the workflow waits for a worker of the background pool,
+- RUNNING: the workflow is executing,
+- FINISHED / FAILED: the workflow returned, see the upload status for its outcome.
+
+Progress is the share of data sources already linked to an individual, which is how the workflows mark imported
+rows.
+
+Steps of the import (file parsing, saving of data sources, validation, the SQL procedure, task creation,
+synchronization for reporting) are measured with `track_import_stage`. Wall time, number of rows and number of
+database queries of every step are stored in `json_ext['import_stage_timings']` of the upload and logged.
+A step executed several times for the same upload (e.g. chunks) accumulates its metrics.
+
+Update uploads store the number of changed, unchanged and new rows in `json_ext['update_summary']`, written by
+the SQL procedures of the update workflows. Unchanged rows are linked to their individual without rewriting it.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from core import datetime
+from individual.models import IndividualDataSource, IndividualDataSourceUpload
+
+logger = logging.getLogger(__name__)
+
+STAGE_KEY = 'import_stage'
+STAGE_TIMINGS_KEY = 'import_stage_timings'
+UPDATE_SUMMARY_KEY = 'update_summary'
+# `validations.update_status` of update rows matching the stored beneficiary
+UPDATE_STATUS_UNCHANGED = 'UNCHANGED'
+
+STAGE_SAVED = 'SAVED'
+STAGE_QUEUED = 'QUEUED'
+STAGE_RUNNING = 'RUNNING'
+STAGE_FINISHED = 'FINISHED'
+STAGE_FAILED = 'FAILED'
+
+
+def _update_upload_json_ext(upload_id, update) -> Optional[dict]:
+    """
+    Merge values into `json_ext` of the upload without creating a new version of it.
+    """
+    uploads = IndividualDataSourceUpload.objects.filter(id=upload_id)
+    json_ext = uploads.values_list('json_ext', flat=True).first()
+    json_ext = update(dict(json_ext or {}))
+    uploads.update(json_ext=json_ext)
+    return json_ext
+
+
+def set_upload_stage(upload: IndividualDataSourceUpload, stage: str):
+    upload.json_ext = _update_upload_json_ext(upload.id, lambda json_ext: {
+        **json_ext, STAGE_KEY: {'stage': stage, 'date': datetime.datetime.now().isoformat()}
+    })
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the executed queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def record_stage_timing(upload_id, stage: str, metrics: dict):
+    def merge(json_ext):
+        timings = dict(json_ext.get(STAGE_TIMINGS_KEY) or {})
+        previous = timings.get(stage)
+        if previous:
+            rows = [value for value in (previous.get('rows'), metrics['rows']) if value is not None]
+            timings[stage] = {
+                'seconds': round(previous.get('seconds', 0) + metrics['seconds'], 3),
+                'rows': sum(rows) if rows else None,
+                'queries': previous.get('queries', 0) + metrics['queries'],
+                'calls': previous.get('calls', 1) + 1,
+                'failed': previous.get('failed', False) or metrics['failed'],
+            }
+        else:
+            timings[stage] = metrics
+        return {**json_ext, STAGE_TIMINGS_KEY: timings}
+
+    _update_upload_json_ext(upload_id, merge)
+
+
+@contextmanager
+def track_import_stage(upload_id, stage: str, rows: Optional[int] = None):
+    """
+    Measure a step of the import of the upload. The yielded dict accepts the number of processed `rows`.
+    """
+    metrics = {'rows': rows}
+    counter = QueryCounter()
+    started = time.monotonic()
+    failed = False
+    try:
+        with connection.execute_wrapper(counter):
+            yield metrics
+    except Exception:
+        failed = True
+        raise
+    finally:
+        metrics = {
+            'seconds': round(time.monotonic() - started, 3),
+            'rows': metrics.get('rows'),
+            'queries': counter.count,
+            'calls': 1,
+            'failed': failed,
+        }
+        logger.info(
+            "Import stage %s of upload %s took %ss (%s rows, %s queries)",
+            stage, upload_id, metrics['seconds'], metrics['rows'], metrics['queries'],
+            extra={'upload_id': str(upload_id), 'import_stage': stage, **metrics},
+        )
+        if upload_id:
+            try:
+                record_stage_timing(upload_id, stage, metrics)
+            except Exception as exc:
+                # e.g. the transaction of a failed stage is broken, timings must not hide the original error
+                logger.warning("Failed to record import stage %s of upload %s: %s", stage, upload_id, exc)
+
+
+def get_stage_timings(upload: IndividualDataSourceUpload) -> dict:
+    return (upload.json_ext or {}).get(STAGE_TIMINGS_KEY) or {}
+
+
+def get_update_summary(upload: IndividualDataSourceUpload) -> Optional[dict]:
+    return (upload.json_ext or {}).get(UPDATE_SUMMARY_KEY)
+
+
+def get_upload_stage(upload: IndividualDataSourceUpload) -> Optional[str]:
+    return ((upload.json_ext or {}).get(STAGE_KEY) or {}).get('stage')
+
+
+def get_upload_status(upload: IndividualDataSourceUpload) -> dict:
+    rows = IndividualDataSource.objects.filter(upload=upload, is_deleted=False).aggregate(
+        total=Count('id'),
+        imported=Count('id', filter=Q(individual__isnull=False)),
+    )
+    total, imported = rows['total'], rows['imported']
+    stage = get_upload_stage(upload)
+    if stage == STAGE_FINISHED:
+        progress = 100.0
+    else:
+        progress = round(100.0 * imported / total, 2) if total else 0.0
+    return {
+        'upload_uuid': str(upload.uuid),
+        'status': upload.status,
+        'stage': stage,
+        'progress': progress,
+        'total_rows': total,
+        'imported_rows': imported,
+        'error': upload.error,
+    }
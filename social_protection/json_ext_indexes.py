@@ -0,0 +1,148 @@
+"""
+Expression indexes on `social_protection_beneficiary."Json_ext"` derived from benefit plan schemas.
+
+Custom filters and eligibility criteria query `json_ext__<field>__<lookup>`. Without an index matching
+the expression Django emits for those lookups, Postgres falls back to a sequential scan of the beneficiary
+table. The indexes are derived from `beneficiary_data_schema.properties` of all active individual benefit
+plans, which means:
+- every schema field gets a btree index on the jsonb sub-document (`"Json_ext" -> 'field'`), used by the
+  `exact`, `lt`, `lte`, `gt`, `gte` and `in` lookups (jsonb comparison keeps numbers and booleans typed),
+- `string` fields additionally get a case-folded text index (`UPPER(("Json_ext" ->> 'field')::text)`) used by
+  `iexact` and `istartswith`,
+- a single GIN index (jsonb_path_ops) serves containment queries on the whole document.
+
+Indexes managed here share the `sp_bnf_jx_` prefix, indexes for fields no longer present in any schema are dropped.
+"""
+import hashlib
+import json
+import logging
+import re
+from collections import namedtuple
+from typing import Dict, Iterable, List
+
+from django.db import connection
+
+from social_protection.models import BenefitPlan
+
+logger = logging.getLogger(__name__)
+
+BENEFICIARY_TABLE = 'social_protection_beneficiary'
+INDEX_PREFIX = 'sp_bnf_jx_'
+GIN_INDEX_NAME = f'{INDEX_PREFIX}gin'
+
+JsonExtIndex = namedtuple('JsonExtIndex', ['name', 'field', 'kind', 'expression', 'params'])
+
+# kind -> (expression template, schema types the kind applies to)
+INDEX_KINDS = {
+    'jsonb': ('(("Json_ext" -> %s))', None),
+    'text': ('(UPPER(("Json_ext" ->> %s)::text) text_pattern_ops)', {'string'}),
+}
+
+
+def _index_name(field: str, kind: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '_', field.lower()).strip('_')[:32]
+    digest = hashlib.md5(f'{field}:{kind}'.encode('utf-8')).hexdigest()[:8]
+    return f'{INDEX_PREFIX}{slug}_{kind}_{digest}'
+
+
+def _schema_properties(schema) -> dict:
+    if not schema:
+        return {}
+    if isinstance(schema, str):
+        try:
+            schema = json.loads(schema)
+        except ValueError:
+            return {}
+    properties = schema.get('properties', {}) if isinstance(schema, dict) else {}
+    return properties if isinstance(properties, dict) else {}
+
+
+def build_index_definitions(schemas: Iterable) -> List[JsonExtIndex]:
+    """
+    Build definitions of the expression indexes required by the provided benefit plan schemas.
+    Fields declared in multiple schemas produce a single index per kind.
+    """
+    field_types: Dict[str, set] = {}
+    for schema in schemas:
+        for field, properties in _schema_properties(schema).items():
+            declared_type = properties.get('type') if isinstance(properties, dict) else None
+            field_types.setdefault(field, set()).add(declared_type)
+
+    definitions = [JsonExtIndex(GIN_INDEX_NAME, None, 'gin', '("Json_ext" jsonb_path_ops)', [])]
+    for field in sorted(field_types):
+        for kind, (expression, applicable_types) in INDEX_KINDS.items():
+            if applicable_types is not None and not applicable_types & field_types[field]:
+                continue
+            definitions.append(JsonExtIndex(_index_name(field, kind), field, kind, expression, [field]))
+    return definitions
+
+
+def get_required_index_definitions() -> List[JsonExtIndex]:
+    schemas = BenefitPlan.objects.filter(
+        is_deleted=False,
+        beneficiary_data_schema__isnull=False,
+        type=BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE,
+    ).values_list('beneficiary_data_schema', flat=True)
+    return build_index_definitions(schemas)
+
+
+def _fetch_existing_indexes(cursor) -> Dict[str, bool]:
+    """
+    Return managed indexes on the beneficiary table mapped to their validity. A failed concurrent build
+    leaves an invalid index behind, which has to be rebuilt.
+    """
+    cursor.execute(
+        """
+        SELECT cls.relname, idx.indisvalid
+        FROM pg_index idx
+        JOIN pg_class cls ON cls.oid = idx.indexrelid
+        JOIN pg_class tbl ON tbl.oid = idx.indrelid
+        WHERE tbl.relname = %s AND cls.relname LIKE %s
+        """,
+        [BENEFICIARY_TABLE, INDEX_PREFIX.replace('_', r'\_') + '%'],
+    )
+    return {name: is_valid for name, is_valid in cursor.fetchall()}
+
+
+def sync_json_ext_indexes(concurrently=True, dry_run=False) -> dict:
+    """
+    Create missing and drop stale json_ext expression indexes on the beneficiary table.
+
+    Concurrent index operations cannot run inside a transaction block, use `concurrently=False` when called
+    within atomic blocks (e.g. in tests).
+    """
+    result = {'created': [], 'dropped': []}
+    if connection.vendor != 'postgresql':
+        logger.info("Skipping json_ext index synchronization, database vendor %s is not supported",
+                    connection.vendor)
+        return result
+
+    required = {definition.name: definition for definition in get_required_index_definitions()}
+    concurrently_sql = 'CONCURRENTLY ' if concurrently else ''
+
+    with connection.cursor() as cursor:
+        existing = _fetch_existing_indexes(cursor)
+
+        for name, is_valid in existing.items():
+            if name in required and is_valid:
+                continue
+            result['dropped'].append(name)
+            if not dry_run:
+                cursor.execute(f'DROP INDEX {concurrently_sql}IF EXISTS {connection.ops.quote_name(name)}')
+
+        for name, definition in required.items():
+            if existing.get(name):
+                continue
+            result['created'].append(name)
+            if not dry_run:
+                method = 'USING gin ' if definition.kind == 'gin' else ''
+                cursor.execute(
+                    f'CREATE INDEX {concurrently_sql}IF NOT EXISTS {connection.ops.quote_name(name)} '
+                    f'ON {connection.ops.quote_name(BENEFICIARY_TABLE)} {method}{definition.expression}',
+                    definition.params,
+                )
+
+    if result['created'] or result['dropped']:
+        logger.info("Synchronized beneficiary json_ext indexes, created: %s, dropped: %s",
+                    result['created'], result['dropped'])
+    return result
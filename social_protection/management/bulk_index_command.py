@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+from social_protection.opensearch_indexing import BulkIndexer, IndexingCheckpoint
+
+
+def parse_since(value):
+    if not value:
+        return None
+    since = parse_datetime(value) or parse_date(value)
+    if since is None:
+        raise CommandError(f'Invalid --since value: {value}, expected ISO date or datetime')
+    return since
+
+
+class BulkIndexCommand(BaseCommand):
+    """
+    Base of commands indexing social protection records into OpenSearch with `BulkIndexer`.
+    """
+    records_name = None
+    index_name = None
+
+    def get_document(self):
+        raise NotImplementedError()
+
+    def get_queryset(self, since):
+        raise NotImplementedError()
+
+    def get_source_builder(self):
+        raise NotImplementedError()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help=f'Index only {self.records_name} updated since the ISO date or datetime.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Number of documents per bulk request.')
+        parser.add_argument('--workers', type=int, default=4, help='Number of threads sending bulk requests.')
+        parser.add_argument('--checkpoint-file', help='File storing the last indexed id.')
+        parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint file.')
+
+    def handle(self, *args, **options):
+        checkpoint = IndexingCheckpoint(options['checkpoint_file'])
+        since = parse_since(options['since'])
+        if options['resume']:
+            if not options['checkpoint_file']:
+                raise CommandError('--resume requires --checkpoint-file')
+            stored_since = checkpoint.load().get('since')
+            since = since or parse_since(stored_since)
+
+        document = self.get_document()
+        # Initialize the index
+        document.init(index=self.index_name)
+        indexer = BulkIndexer(
+            document._get_connection(),
+            self.index_name,
+            self.get_source_builder(),
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            checkpoint=checkpoint,
+        )
+        stats = indexer.run(self.get_queryset(since), since=since, resume=options['resume'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {stats['indexed']} {self.records_name} ({stats['failed']} failed) "
+            f"in {stats['seconds']}s, {stats['per_second']} documents/s"
+        ))
@@ -0,0 +1,30 @@
+from social_protection.management.bulk_index_command import BulkIndexCommand
+from social_protection.opensearch_indexing import (
+    GROUP_BENEFICIARY_INDEX,
+    group_beneficiary_queryset,
+    group_beneficiary_source,
+)
+
+
+class Command(BulkIndexCommand):
+    help = 'Imports group beneficiary data from openIMIS into OpenSearch. ' \
+           'This command should be executed within the openimis-be_py module, which ' \
+           'is part of the openIMIS module, using the manage.py command. For example, you can run: ' \
+           'python manage.py add_group_beneficiary_data_to_opensearch. ' \
+           'This command creates or updates data documents at the OpenSearch level. ' \
+           'Documents carry the group code, the head of the household and the location path. ' \
+           'Group beneficiaries are sent with the bulk API from several threads, use --since to index only ' \
+           'group beneficiaries updated after the given date and --checkpoint-file with --resume to continue an ' \
+           'interrupted run.'
+    records_name = 'group beneficiaries'
+    index_name = GROUP_BENEFICIARY_INDEX
+
+    def get_document(self):
+        from social_protection.documents import GroupBeneficiaryDocument
+        return GroupBeneficiaryDocument
+
+    def get_queryset(self, since):
+        return group_beneficiary_queryset(since)
+
+    def get_source_builder(self):
+        return group_beneficiary_source
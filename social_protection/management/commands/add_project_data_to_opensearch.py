@@ -0,0 +1,25 @@
+from social_protection.management.bulk_index_command import BulkIndexCommand
+from social_protection.opensearch_indexing import PROJECT_INDEX, project_queryset, project_source
+
+
+class Command(BulkIndexCommand):
+    help = 'Imports project data from openIMIS into OpenSearch. ' \
+           'This command should be executed within the openimis-be_py module, which ' \
+           'is part of the openIMIS module, using the manage.py command. For example, you can run: ' \
+           'python manage.py add_project_data_to_opensearch. ' \
+           'This command creates or updates data documents at the OpenSearch level. ' \
+           'Documents carry enrollment counts of the project. Projects are sent with the bulk API from several ' \
+           'threads, use --since to index only projects updated (or with enrollments updated) after the given ' \
+           'date and --checkpoint-file with --resume to continue an interrupted run.'
+    records_name = 'projects'
+    index_name = PROJECT_INDEX
+
+    def get_document(self):
+        from social_protection.documents import ProjectDocument
+        return ProjectDocument
+
+    def get_queryset(self, since):
+        return project_queryset(since)
+
+    def get_source_builder(self):
+        return project_source
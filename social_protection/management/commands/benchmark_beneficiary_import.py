@@ -0,0 +1,71 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import User
+from location.models import Location
+from social_protection.benchmarks.runner import run_import_benchmark
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+
+class Command(BaseCommand):
+    help = 'Imports synthetic beneficiary files and reports duration, throughput, peak memory and number of queries ' \
+           'of every step of the import as JSON. Requires a PostgreSQL database, data is rolled back unless ' \
+           '--keep-data is set. Example: python manage.py benchmark_beneficiary_import --rows 10000 100000 ' \
+           '--error-rate 0.01 --output benchmark.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                            help='Sizes of the generated files, one run per size.')
+        parser.add_argument('--schema-width', type=int, default=5,
+                            help='Number of benefit plan schema fields besides the unique national id.')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Share of rows duplicating the national id of the preceding row.')
+        parser.add_argument('--group-size', type=int, default=None,
+                            help='Number of members per group, a group benefit plan is benchmarked if set.')
+        parser.add_argument('--with-locations', action='store_true',
+                            help='Assign existing villages to the generated beneficiaries.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--username', default='Admin', help='User executing the import.')
+        parser.add_argument('--keep-data', action='store_true', help='Commit the imported data.')
+        parser.add_argument('--no-memory-tracing', action='store_true',
+                            help='Disable tracemalloc, which slows down the measured steps.')
+        parser.add_argument('--output', help='File to write the results to, printed to stdout by default.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Import workflows use PostgreSQL specific procedures, benchmark requires PostgreSQL')
+        user = User.objects.filter(username=options['username']).first()
+        if not user:
+            raise CommandError(f"User {options['username']} not found")
+
+        locations = None
+        if options['with_locations']:
+            locations = list(
+                Location.objects.filter(type='V', validity_to__isnull=True).values_list('name', 'code')[:1000]
+            )
+
+        results = []
+        for rows in options['rows']:
+            self.stderr.write(f'Benchmarking import of {rows} rows')
+            results.append(run_import_benchmark(
+                user,
+                rows,
+                schema_width=options['schema_width'],
+                error_rate=options['error_rate'],
+                group_size=options['group_size'],
+                locations=locations,
+                seed=options['seed'],
+                keep_data=options['keep_data'],
+                trace_memory=not options['no_memory_tracing'],
+            ))
+
+        output = json.dumps({'benchmark': 'beneficiary_import', 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
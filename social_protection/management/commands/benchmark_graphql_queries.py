@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import User
+from location.models import Location
+from social_protection.benchmarks.graphql_queries import run_graphql_benchmark, seed_graphql_dataset
+
+
+class Command(BaseCommand):
+    help = 'Seeds benefit plans with beneficiaries and groups, runs the catalogue of GraphQL queries of the module ' \
+           'and reports their number of database queries, budgets and latency percentiles as JSON. Seeded data is ' \
+           'rolled back unless --keep-data is set. ' \
+           'Example: python manage.py benchmark_graphql_queries --individuals 20000 --output graphql.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--individuals', type=int, default=5000, help='Number of seeded beneficiaries.')
+        parser.add_argument('--group-size', type=int, default=4, help='Number of members of seeded groups.')
+        parser.add_argument('--page-size', type=int, default=50, help='Number of records requested per page.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed executions of every query.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--username', default='Admin', help='User executing the queries.')
+        parser.add_argument('--keep-data', action='store_true', help='Commit the seeded data.')
+        parser.add_argument('--fail-over-budget', action='store_true',
+                            help='Exit with an error if a query exceeds its query-count budget or fails.')
+        parser.add_argument('--output', help='File to write the results to, printed to stdout by default.')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if not user:
+            raise CommandError(f"User {options['username']} not found")
+        villages = list(
+            Location.objects.filter(type='V', validity_to__isnull=True).select_related('parent__parent')[:20]
+        )
+        if not villages:
+            raise CommandError('At least one village is required to seed beneficiaries')
+
+        with transaction.atomic():
+            variables = seed_graphql_dataset(
+                user, villages, individuals=options['individuals'], group_size=options['group_size'],
+                page_size=options['page_size'], seed=options['seed'],
+            )
+            results = run_graphql_benchmark(user, variables, iterations=options['iterations'])
+            if not options['keep_data']:
+                transaction.set_rollback(True)
+
+        output = json.dumps({
+            'benchmark': 'graphql_queries',
+            'individuals': options['individuals'],
+            'page_size': options['page_size'],
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        failed = [result['name'] for result in results if result['errors'] or not result['within_budget']]
+        if failed and options['fail_over_budget']:
+            raise CommandError(f"Queries over budget or failing: {', '.join(failed)}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from social_protection.statistics import rebuild_benefit_plan_statistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the rollup of beneficiary counts per benefit plan, status, project and region ' \
+           'from the beneficiary tables. Use it after changes made outside of the services, e.g. with raw SQL. ' \
+           'Example: python manage.py rebuild_benefit_plan_statistics --benefit-plan <uuid>'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benefit-plan',
+            action='append',
+            dest='benefit_plans',
+            help='Id of the benefit plan to rebuild, can be repeated. All plans are rebuilt by default.',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_benefit_plan_statistics(options['benefit_plans'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt benefit plan statistics, {rows} rows'))
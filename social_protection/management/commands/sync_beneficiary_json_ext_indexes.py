@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from social_protection.json_ext_indexes import sync_json_ext_indexes
+
+
+class Command(BaseCommand):
+    help = 'Creates btree expression indexes on social_protection_beneficiary."Json_ext" for the fields declared ' \
+           'in beneficiary_data_schema.properties of active individual benefit plans, together with a GIN index ' \
+           'for containment queries. Indexes of fields no longer present in any schema are dropped. ' \
+           'Example: python manage.py sync_beneficiary_json_ext_indexes --dry-run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list indexes that would be created or dropped.',
+        )
+        parser.add_argument(
+            '--no-concurrently',
+            action='store_true',
+            help='Build indexes without CONCURRENTLY (locks the beneficiary table for writes during the build).',
+        )
+
+    def handle(self, *args, **options):
+        result = sync_json_ext_indexes(
+            concurrently=not options['no_concurrently'],
+            dry_run=options['dry_run'],
+        )
+        prefix = 'Would' if options['dry_run'] else 'Did'
+        for name in result['dropped']:
+            self.stdout.write(f'{prefix} drop index {name}')
+        for name in result['created']:
+            self.stdout.write(self.style.SUCCESS(f'{prefix} create index {name}'))
+        if not result['created'] and not result['dropped']:
+            self.stdout.write(self.style.SUCCESS('Beneficiary json_ext indexes are up to date'))
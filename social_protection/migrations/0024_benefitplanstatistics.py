@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Case, Count, F, IntegerField, When
+import django.db.models.deletion
+
+
+def populate_statistics(apps, schema_editor):
+    BenefitPlanStatistics = apps.get_model('social_protection', 'BenefitPlanStatistics')
+    sources = (
+        (apps.get_model('social_protection', 'Beneficiary'), 'INDIVIDUAL', 'individual__location'),
+        (apps.get_model('social_protection', 'GroupBeneficiary'), 'GROUP', 'group__location'),
+    )
+    for model, beneficiary_type, location_path in sources:
+        paths = [f"{location_path}{'__parent' * depth}" for depth in range(4)]
+        region = Case(
+            *[When(**{f'{path}__type': 'R'}, then=F(path)) for path in paths],
+            default=None,
+            output_field=IntegerField(),
+        )
+        rows = model.objects \
+            .filter(is_deleted=False) \
+            .order_by() \
+            .values('benefit_plan_id', 'status', 'project_id', region_id=region) \
+            .annotate(count=Count('id'))
+        BenefitPlanStatistics.objects.bulk_create(
+            [BenefitPlanStatistics(beneficiary_type=beneficiary_type, **row) for row in rows],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_protection', '0023_beneficiaryexportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BenefitPlanStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beneficiary_type', models.CharField(choices=[('INDIVIDUAL', 'INDIVIDUAL'), ('GROUP', 'GROUP')], max_length=20)),
+                ('status', models.CharField(choices=[('POTENTIAL', 'POTENTIAL'), ('ACTIVE', 'ACTIVE'), ('GRADUATED', 'GRADUATED'), ('SUSPENDED', 'SUSPENDED')], max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('benefit_plan', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='statistics', to='social_protection.benefitplan')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='social_protection.project')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='location.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['benefit_plan', 'beneficiary_type', 'status'], name='sp_plan_statistics_key_idx')],
+            },
+        ),
+        migrations.RunPython(populate_statistics, migrations.RunPython.noop),
+    ]
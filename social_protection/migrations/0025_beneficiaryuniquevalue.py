@@ -0,0 +1,76 @@
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _unique_fields(schema):
+    if isinstance(schema, str):
+        try:
+            schema = json.loads(schema) if schema else None
+        except ValueError:
+            return []
+    properties = schema.get('properties') if isinstance(schema, dict) else None
+    if not isinstance(properties, dict):
+        return []
+    return [field for field, field_properties in properties.items() if 'uniqueness' in (field_properties or {})]
+
+
+def populate_unique_values(apps, schema_editor):
+    # Upload workflows run on PostgreSQL only, other databases are indexed with rebuild_unique_value_index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    BenefitPlan = apps.get_model('social_protection', 'BenefitPlan')
+    BeneficiaryUniqueValue = apps.get_model('social_protection', 'BeneficiaryUniqueValue')
+    sources = (
+        (apps.get_model('social_protection', 'Beneficiary'), 'INDIVIDUAL'),
+        (apps.get_model('social_protection', 'GroupBeneficiary'), 'GROUP'),
+    )
+    quote_name = schema_editor.quote_name
+    insert_sql = """
+        INSERT INTO {unique_value_table} (benefit_plan_id, beneficiary_type, beneficiary_id, field, value_hash)
+        SELECT {benefit_plan}, %s, {id}, %s, md5(lower(trim({json_ext} ->> %s)))
+        FROM {beneficiary_table}
+        WHERE {benefit_plan} = %s AND {is_deleted} = false AND trim({json_ext} ->> %s) <> ''
+    """
+    with schema_editor.connection.cursor() as cursor:
+        for benefit_plan_id, schema in BenefitPlan.objects.values_list('id', 'beneficiary_data_schema'):
+            for field in _unique_fields(schema):
+                for model, beneficiary_type in sources:
+                    sql = insert_sql.format(
+                        unique_value_table=quote_name(BeneficiaryUniqueValue._meta.db_table),
+                        beneficiary_table=quote_name(model._meta.db_table),
+                        id=quote_name(model._meta.pk.column),
+                        benefit_plan=quote_name(model._meta.get_field('benefit_plan').column),
+                        json_ext=quote_name(model._meta.get_field('json_ext').column),
+                        is_deleted=quote_name(model._meta.get_field('is_deleted').column),
+                    )
+                    cursor.execute(sql, [beneficiary_type, field, field, benefit_plan_id, field])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_protection', '0024_benefitplanstatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BeneficiaryUniqueValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beneficiary_type', models.CharField(choices=[('INDIVIDUAL', 'INDIVIDUAL'), ('GROUP', 'GROUP')], max_length=20)),
+                ('beneficiary_id', models.UUIDField()),
+                ('field', models.CharField(max_length=255)),
+                ('value_hash', models.CharField(max_length=32)),
+                ('benefit_plan', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='social_protection.benefitplan')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['benefit_plan', 'field', 'value_hash'], name='sp_unique_value_lookup_idx'),
+                    models.Index(fields=['beneficiary_id'], name='sp_unique_value_bnf_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(populate_unique_values, migrations.RunPython.noop),
+    ]
@@ -158,6 +158,75 @@ class GroupBeneficiary(core_models.HistoryBusinessModel):
         return queryset.filter(group__in=group_queryset)
 
 
+class BenefitPlanStatistics(models.Model):
+    """
+    Number of beneficiaries of a benefit plan with the given status, project and region,
+    maintained by `social_protection.statistics`.
+    """
+    class BeneficiaryType(models.TextChoices):
+        INDIVIDUAL = "INDIVIDUAL", _("INDIVIDUAL")
+        GROUP = "GROUP", _("GROUP")
+
+    benefit_plan = models.ForeignKey(BenefitPlan, models.DO_NOTHING, null=False, related_name='statistics')
+    beneficiary_type = models.CharField(max_length=20, choices=BeneficiaryType.choices, null=False)
+    status = models.CharField(max_length=100, choices=BeneficiaryStatus.choices, null=False)
+    project = models.ForeignKey(Project, models.DO_NOTHING, null=True, blank=True, related_name='+')
+    region = models.ForeignKey(Location, models.DO_NOTHING, null=True, blank=True, related_name='+')
+    count = models.IntegerField(default=0, null=False)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['benefit_plan', 'beneficiary_type', 'status'], name='sp_plan_statistics_key_idx'),
+        ]
+
+
+class BeneficiaryUniqueValue(models.Model):
+    """
+    Hash of the normalized value of a unique schema field of a beneficiary, maintained by
+    `social_protection.unique_values`.
+    """
+    benefit_plan = models.ForeignKey(BenefitPlan, models.DO_NOTHING, null=False, related_name='+')
+    beneficiary_type = models.CharField(
+        max_length=20, choices=BenefitPlanStatistics.BeneficiaryType.choices, null=False
+    )
+    beneficiary_id = models.UUIDField(null=False)
+    field = models.CharField(max_length=255, null=False)
+    value_hash = models.CharField(max_length=32, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['benefit_plan', 'field', 'value_hash'], name='sp_unique_value_lookup_idx'),
+            models.Index(fields=['beneficiary_id'], name='sp_unique_value_bnf_idx'),
+        ]
+
+
 class JSONUpdate(Func):
     function = 'JSONB_SET'
     arity = 3
+
+
+class BeneficiaryExportJob(UUIDModel):
+    class ExportType(models.TextChoices):
+        BENEFICIARY = "BENEFICIARY", _("BENEFICIARY")
+        GROUP_BENEFICIARY = "GROUP_BENEFICIARY", _("GROUP_BENEFICIARY")
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("PENDING")
+        RUNNING = "RUNNING", _("RUNNING")
+        COMPLETED = "COMPLETED", _("COMPLETED")
+        FAILED = "FAILED", _("FAILED")
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.DO_NOTHING, null=False)
+    export_type = models.CharField(max_length=50, choices=ExportType.choices, null=False)
+    status = models.CharField(max_length=50, choices=Status.choices, default=Status.PENDING, null=False)
+    file_format = models.CharField(max_length=20, default="csv", null=False)
+    file_name = models.CharField(max_length=255, null=True, blank=True)
+    total_rows = models.IntegerField(null=True, blank=True)
+    processed_rows = models.IntegerField(default=0, null=False)
+    error = models.TextField(null=True, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.export_type} export {self.id} {self.status}"
@@ -0,0 +1,299 @@
+"""
+Bulk indexing of social protection records into OpenSearch.
+
+Records are streamed from the database in chunks with their relations joined, converted to bulk actions and sent
+with the bulk API from a pool of worker threads, while the main thread reads the next chunks. Sources are ordered by
+id, so an interrupted run can be resumed from the last id of the last fully indexed chunk (checkpoint file).
+
+Beneficiaries, group beneficiaries (with group code, head of the household and location path) and projects
+(with enrollment counts) are indexed. The module doesn't depend on `opensearch_reports`, the client is provided
+by the caller.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.query import QuerySet
+
+from individual.models import GroupIndividual
+from social_protection.dataloaders import LOCATION_CHAIN
+from social_protection.models import Beneficiary, BeneficiaryStatus, GroupBeneficiary, Project
+
+logger = logging.getLogger(__name__)
+
+BENEFICIARY_INDEX = 'beneficiary'
+GROUP_BENEFICIARY_INDEX = 'group_beneficiary'
+PROJECT_INDEX = 'project'
+
+
+def flatten_json_ext(data, parent_key='', sep='__') -> dict:
+    items = {}
+    for key, value in (data or {}).items():
+        new_key = f"{parent_key}{sep}{key}" if parent_key else key
+        if isinstance(value, dict):
+            items.update(flatten_json_ext(value, new_key, sep=sep))
+        else:
+            items[new_key] = value
+    return items
+
+
+def beneficiary_queryset(since=None) -> QuerySet:
+    queryset = Beneficiary.objects.select_related('benefit_plan', 'individual')
+    if since:
+        queryset = queryset.filter(date_updated__gte=since)
+    return queryset
+
+
+def beneficiary_source(beneficiary: Beneficiary) -> dict:
+    return {
+        'id': str(beneficiary.id),
+        'benefit_plan': {
+            'id': str(beneficiary.benefit_plan.id),
+            'code': beneficiary.benefit_plan.code,
+            'name': beneficiary.benefit_plan.name,
+        },
+        'individual': {
+            'first_name': beneficiary.individual.first_name,
+            'last_name': beneficiary.individual.last_name,
+            'dob': beneficiary.individual.dob,
+        },
+        'status': beneficiary.status,
+        'json_ext': flatten_json_ext(beneficiary.json_ext),
+        'date_created': beneficiary.date_created,
+    }
+
+
+def location_source(location) -> Optional[dict]:
+    """
+    Code and name of the location with names of its ancestors, from the region down to the location itself.
+    """
+    if location is None:
+        return None
+    path = []
+    current = location
+    while current is not None:
+        path.append(current.name)
+        current = current.parent
+    return {'code': location.code, 'name': location.name, 'path': list(reversed(path))}
+
+
+def group_beneficiary_queryset(since=None) -> QuerySet:
+    heads = GroupIndividual.objects \
+        .filter(role=GroupIndividual.Role.HEAD, is_deleted=False) \
+        .select_related('individual')
+    queryset = GroupBeneficiary.objects \
+        .select_related('benefit_plan', 'group', *[f'group__{relation}' for relation in LOCATION_CHAIN]) \
+        .prefetch_related(Prefetch('group__groupindividuals', queryset=heads, to_attr='head_members'))
+    if since:
+        queryset = queryset.filter(date_updated__gte=since)
+    return queryset
+
+
+def group_head(group) -> Optional[dict]:
+    head_members = getattr(group, 'head_members', None)
+    if head_members is None:
+        head_members = GroupIndividual.objects.filter(
+            group=group, role=GroupIndividual.Role.HEAD, is_deleted=False
+        ).select_related('individual')
+    head = next(iter(head_members), None)
+    if head is None:
+        return None
+    return {'first_name': head.individual.first_name, 'last_name': head.individual.last_name}
+
+
+def group_beneficiary_source(group_beneficiary: GroupBeneficiary) -> dict:
+    return {
+        'id': str(group_beneficiary.id),
+        'benefit_plan': {
+            'id': str(group_beneficiary.benefit_plan.id),
+            'code': group_beneficiary.benefit_plan.code,
+            'name': group_beneficiary.benefit_plan.name,
+        },
+        'group': {
+            'id': str(group_beneficiary.group.id),
+            'code': group_beneficiary.group.code,
+        },
+        'head': group_head(group_beneficiary.group),
+        'location': location_source(group_beneficiary.group.location),
+        'status': group_beneficiary.status,
+        'json_ext': flatten_json_ext(group_beneficiary.json_ext),
+        'date_created': group_beneficiary.date_created,
+    }
+
+
+def _enrollment_count(model, **filters):
+    enrollments = model.objects \
+        .filter(project=OuterRef('pk'), is_deleted=False, **filters) \
+        .order_by() \
+        .values('project') \
+        .annotate(count=Count('id')) \
+        .values('count')
+    return Coalesce(Subquery(enrollments[:1], output_field=IntegerField()), 0)
+
+
+def project_queryset(since=None) -> QuerySet:
+    # Counted with subqueries, joining both enrollment tables would multiply the rows
+    queryset = Project.objects \
+        .select_related('benefit_plan', 'activity', *LOCATION_CHAIN) \
+        .annotate(
+            enrolled_beneficiaries=_enrollment_count(Beneficiary),
+            active_beneficiaries=_enrollment_count(Beneficiary, status=BeneficiaryStatus.ACTIVE),
+            enrolled_groups=_enrollment_count(GroupBeneficiary),
+            active_groups=_enrollment_count(GroupBeneficiary, status=BeneficiaryStatus.ACTIVE),
+        )
+    if since:
+        # Enrollment changes don't update the project itself
+        queryset = queryset.filter(
+            Q(date_updated__gte=since)
+            | Exists(Beneficiary.objects.filter(project=OuterRef('pk'), date_updated__gte=since))
+            | Exists(GroupBeneficiary.objects.filter(project=OuterRef('pk'), date_updated__gte=since))
+        )
+    return queryset
+
+
+def project_enrollment(project: Project) -> dict:
+    if not hasattr(project, 'enrolled_beneficiaries'):
+        project = project_queryset().get(id=project.id)
+    enrolled = project.enrolled_beneficiaries + project.enrolled_groups
+    return {
+        'enrolled_beneficiaries': project.enrolled_beneficiaries,
+        'active_beneficiaries': project.active_beneficiaries,
+        'enrolled_groups': project.enrolled_groups,
+        'active_groups': project.active_groups,
+        'enrolled': enrolled,
+        'active': project.active_beneficiaries + project.active_groups,
+        'target': project.target_beneficiaries,
+        'target_reached': round(enrolled / project.target_beneficiaries, 4) if project.target_beneficiaries else None,
+    }
+
+
+def project_source(project: Project) -> dict:
+    return {
+        'id': str(project.id),
+        'name': project.name,
+        'status': project.status,
+        'benefit_plan': {
+            'id': str(project.benefit_plan.id),
+            'code': project.benefit_plan.code,
+            'name': project.benefit_plan.name,
+            'type': project.benefit_plan.type,
+        },
+        'activity': project.activity.name,
+        'location': location_source(project.location),
+        'working_days': project.working_days,
+        'enrollment': project_enrollment(project),
+        'json_ext': flatten_json_ext(project.json_ext),
+        'date_created': project.date_created,
+    }
+
+
+def build_bulk_body(index_name: str, objects: Iterable, source_builder: Callable) -> List[dict]:
+    body = []
+    for obj in objects:
+        body.append({'index': {'_index': index_name, '_id': str(obj.id)}})
+        body.append(source_builder(obj))
+    return body
+
+
+def send_bulk(client, body: List[dict], refresh=False) -> dict:
+    """
+    Send the bulk request and return the number of indexed and failed documents.
+    """
+    if not body:
+        return {'indexed': 0, 'failed': 0}
+    response = client.bulk(body=body, refresh='true' if refresh else 'false')
+    items = response.get('items', [])
+    failed = 0
+    if response.get('errors'):
+        for item in items:
+            result = next(iter(item.values()), {})
+            if result.get('error'):
+                failed += 1
+                logger.warning("Failed to index document %s: %s", result.get('_id'), result.get('error'))
+    return {'indexed': len(items) - failed, 'failed': failed}
+
+
+class IndexingCheckpoint:
+    """
+    Last id of the source that was fully indexed, stored as JSON together with the `since` filter of the run.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+
+    def load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with open(self.path) as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    def save(self, last_id, since=None):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump({'last_id': str(last_id), 'since': since.isoformat() if since else None}, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BulkIndexer:
+    def __init__(self, client, index_name: str, source_builder: Callable, chunk_size=1000, workers=4,
+                 checkpoint: IndexingCheckpoint = None):
+        self.client = client
+        self.index_name = index_name
+        self.source_builder = source_builder
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.checkpoint = checkpoint or IndexingCheckpoint(None)
+
+    def _send_chunk(self, chunk):
+        return send_bulk(self.client, build_bulk_body(self.index_name, chunk, self.source_builder))
+
+    def run(self, queryset: QuerySet, since=None, resume=False) -> Dict[str, float]:
+        queryset = queryset.order_by('id')
+        if resume:
+            last_id = self.checkpoint.load().get('last_id')
+            if last_id:
+                queryset = queryset.filter(id__gt=last_id)
+
+        stats = {'indexed': 0, 'failed': 0}
+        started = time.monotonic()
+        records = queryset.iterator(chunk_size=self.chunk_size)
+        pending = deque()
+
+        def complete_oldest():
+            future, last_id = pending.popleft()
+            result = future.result()
+            stats['indexed'] += result['indexed']
+            stats['failed'] += result['failed']
+            # Chunks complete in submission order, everything up to last_id is indexed
+            self.checkpoint.save(last_id, since)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='opensearch_bulk') as executor:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                pending.append((executor.submit(self._send_chunk, chunk), chunk[-1].id))
+                # Bound the number of chunks kept in memory
+                if len(pending) >= self.workers * 2:
+                    complete_oldest()
+            while pending:
+                complete_oldest()
+
+        self.checkpoint.clear()
+        elapsed = time.monotonic() - started
+        stats['seconds'] = round(elapsed, 2)
+        stats['per_second'] = round(stats['indexed'] / elapsed, 2) if elapsed else float(stats['indexed'])
+        return stats
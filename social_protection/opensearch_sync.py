@@ -0,0 +1,216 @@
+"""
+Deferred synchronization of beneficiary documents with OpenSearch.
+
+Every save of a beneficiary (or of its individual or benefit plan) triggers an index request from the registry
+signals of `django_opensearch_dsl`, and with `auto_refresh` an index refresh as well. Bulk operations saving
+records one by one (synchronization of imported data, graduation of beneficiaries) therefore send thousands of
+single document requests.
+
+Within `deferred_opensearch_sync()` these updates are only collected. Ids of changed beneficiaries and benefit plans
+are flushed once the outermost block exits, after the commit of the current transaction:
+- beneficiaries are indexed with bulk requests of `opensearch_sync_chunk_size` documents, ids no longer present in
+  the database are deleted from the index,
+- code and name of changed benefit plans are updated in documents of their beneficiaries and group beneficiaries
+  with a single `update_by_query` per plan instead of reindexing all of them. Outside of the block the same update
+  is sent after commit, without a refresh, and only when code or name of the saved plan changed,
+- the index is refreshed once per flush.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models.query import QuerySet
+
+from social_protection.apps import SocialProtectionConfig
+from social_protection.opensearch_indexing import (
+    BENEFICIARY_INDEX,
+    GROUP_BENEFICIARY_INDEX,
+    PROJECT_INDEX,
+    beneficiary_queryset,
+    beneficiary_source,
+    build_bulk_body,
+    project_queryset,
+    project_source,
+    send_bulk,
+)
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+# Indices of documents embedding code and name of their benefit plan
+BENEFIT_PLAN_INDICES = (BENEFICIARY_INDEX, GROUP_BENEFICIARY_INDEX)
+
+BENEFIT_PLAN_UPDATE_SCRIPT = (
+    "ctx._source.benefit_plan.code = params.code; "
+    "ctx._source.benefit_plan.name = params.name"
+)
+
+
+def _get_state():
+    if not hasattr(_state, 'depth'):
+        _state.depth = 0
+        _state.beneficiary_ids = set()
+        _state.benefit_plans = {}
+    return _state
+
+
+def is_sync_deferred() -> bool:
+    return _get_state().depth > 0
+
+
+def defer_beneficiaries(thing):
+    """
+    Collect ids of a beneficiary, an iterable of beneficiaries or a beneficiary queryset.
+    """
+    state = _get_state()
+    if isinstance(thing, QuerySet):
+        state.beneficiary_ids.update(str(pk) for pk in thing.values_list('id', flat=True))
+    elif isinstance(thing, Iterable):
+        state.beneficiary_ids.update(str(obj.id) for obj in thing)
+    else:
+        state.beneficiary_ids.add(str(thing.id))
+
+
+def defer_benefit_plan(benefit_plan):
+    _get_state().benefit_plans[str(benefit_plan.id)] = {'code': benefit_plan.code, 'name': benefit_plan.name}
+
+
+def remember_indexed_benefit_plan(sender, instance, **kwargs):
+    """
+    Keep code and name of a benefit plan as loaded, connected to `post_init`. Deferred fields are not loaded.
+    """
+    instance._indexed_code_name = (instance.__dict__.get('code'), instance.__dict__.get('name'))
+
+
+def sync_benefit_plan(benefit_plan):
+    """
+    Update code and name of a saved benefit plan in documents of its beneficiaries and group beneficiaries after
+    commit, only if they changed since the plan was loaded. Both indices are updated by the first call.
+    """
+    code_name = (benefit_plan.code, benefit_plan.name)
+    if getattr(benefit_plan, '_indexed_code_name', None) == code_name:
+        return
+    benefit_plan._indexed_code_name = code_name
+    if is_sync_deferred():
+        defer_benefit_plan(benefit_plan)
+        return
+    benefit_plan_id = str(benefit_plan.id)
+    transaction.on_commit(lambda: _update_benefit_plan(benefit_plan_id, *code_name))
+
+
+def _update_benefit_plan(benefit_plan_id, code, name):
+    try:
+        client = get_opensearch_client()
+        if client is not None:
+            update_benefit_plan_documents(client, benefit_plan_id, code, name, index=','.join(BENEFIT_PLAN_INDICES))
+    except Exception as exc:
+        logger.error("Failed to update benefit plan %s in OpenSearch documents", benefit_plan_id, exc_info=exc)
+
+
+def sync_projects(project_ids: Iterable):
+    """
+    Reindex projects after commit. Enrollment counts of project documents are aggregated from beneficiaries and
+    group beneficiaries, which are not related models of the document, so enrollment services call this explicitly.
+    """
+    project_ids = {str(project_id) for project_id in project_ids if project_id}
+    if project_ids:
+        transaction.on_commit(lambda: _index_projects(project_ids))
+
+
+def _index_projects(project_ids):
+    try:
+        client = get_opensearch_client()
+        if client is not None:
+            projects = project_queryset().filter(id__in=project_ids)
+            send_bulk(client, build_bulk_body(PROJECT_INDEX, projects, project_source))
+    except Exception as exc:
+        logger.error("Failed to reindex projects %s in OpenSearch", sorted(project_ids), exc_info=exc)
+
+
+def get_opensearch_client():
+    try:
+        from social_protection.documents import BeneficiaryDocument
+    except ImportError:
+        # Document not registered, opensearch_reports not installed or unit test environment
+        return None
+    return BeneficiaryDocument._get_connection()
+
+
+def update_benefit_plan_documents(client, benefit_plan_id, code, name, refresh=False, index=BENEFICIARY_INDEX):
+    client.update_by_query(
+        index=index,
+        body={
+            'query': {'term': {'benefit_plan.id': str(benefit_plan_id)}},
+            'script': {'source': BENEFIT_PLAN_UPDATE_SCRIPT, 'lang': 'painless',
+                       'params': {'code': code, 'name': name}},
+        },
+        conflicts='proceed',
+        refresh='true' if refresh else 'false',
+        ignore_unavailable=True,
+    )
+
+
+def flush_deferred_sync(beneficiary_ids, benefit_plans, client=None) -> Optional[dict]:
+    client = client or get_opensearch_client()
+    if client is None:
+        return None
+    stats = {'indexed': 0, 'deleted': 0, 'failed': 0, 'benefit_plans': 0}
+    for benefit_plan_id, values in benefit_plans.items():
+        update_benefit_plan_documents(
+            client, benefit_plan_id, values['code'], values['name'], index=','.join(BENEFIT_PLAN_INDICES)
+        )
+        stats['benefit_plans'] += 1
+
+    ids = iter(sorted(beneficiary_ids))
+    chunk_size = SocialProtectionConfig.opensearch_sync_chunk_size
+    while True:
+        chunk = list(islice(ids, chunk_size))
+        if not chunk:
+            break
+        beneficiaries = list(beneficiary_queryset().filter(id__in=chunk))
+        body = build_bulk_body(BENEFICIARY_INDEX, beneficiaries, beneficiary_source)
+        missing = set(chunk) - {str(beneficiary.id) for beneficiary in beneficiaries}
+        body.extend({'delete': {'_index': BENEFICIARY_INDEX, '_id': pk}} for pk in sorted(missing))
+        result = send_bulk(client, body)
+        stats['deleted'] += len(missing)
+        stats['indexed'] += result['indexed'] - len(missing)
+        stats['failed'] += result['failed']
+
+    if benefit_plans:
+        client.indices.refresh(index=','.join(BENEFIT_PLAN_INDICES), ignore_unavailable=True)
+    elif beneficiary_ids:
+        client.indices.refresh(index=BENEFICIARY_INDEX)
+    logger.debug("Deferred OpenSearch sync flushed: %s", stats)
+    return stats
+
+
+def _flush(beneficiary_ids, benefit_plans):
+    try:
+        flush_deferred_sync(beneficiary_ids, benefit_plans)
+    except Exception as exc:
+        # Index is eventually consistent, failed flush must not break the committed operation
+        logger.error("Failed to flush deferred OpenSearch sync", exc_info=exc)
+
+
+@contextmanager
+def deferred_opensearch_sync():
+    """
+    Collect OpenSearch updates of beneficiaries within the block and send them in bulk after commit.
+    Nested blocks are flushed together with the outermost one.
+    """
+    state = _get_state()
+    state.depth += 1
+    try:
+        yield
+    finally:
+        state.depth -= 1
+        if state.depth == 0:
+            beneficiary_ids, benefit_plans = state.beneficiary_ids, state.benefit_plans
+            state.beneficiary_ids, state.benefit_plans = set(), {}
+            if beneficiary_ids or benefit_plans:
+                # Runs immediately outside of atomic blocks, dropped on rollback
+                transaction.on_commit(lambda: _flush(beneficiary_ids, benefit_plans))
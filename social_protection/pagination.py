@@ -0,0 +1,258 @@
+"""
+Keyset (seek) pagination for beneficiary connections.
+
+Relay cursors of `DjangoFilterConnectionField` encode row offsets, so page N of a large benefit plan makes the
+database read and discard all rows of the previous pages. In keyset mode cursors encode the values of the sort
+columns and the id of the last row on the page, and the next page is selected with a row comparison
+`(sort columns, id) > (cursor values)`, which can use the index on the sort columns no matter how deep the page is.
+
+Keyset mode is enabled per query with the `keyset: true` argument. Orderings outside of
+`KEYSET_ORDERING_FIELDS` are paginated with offsets as before. In both modes `totalCount` is resolved
+with the counting strategies of `social_protection.counting`.
+"""
+import base64
+import datetime
+import json
+import logging
+import uuid
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+import graphene
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from graphene.relay import PageInfo
+from graphql_relay.connection.arrayconnection import get_offset_with_default, offset_to_cursor
+
+from core.schema import OrderedDjangoFilterConnectionField
+from social_protection.counting import (
+    COUNT_MODE_APPROXIMATE,
+    COUNT_MODE_EXACT,
+    count_queryset,
+    exact_count,
+    resolve_count_mode,
+)
+
+logger = logging.getLogger(__name__)
+
+KEYSET_CURSOR_PREFIX = 'keyset:'
+
+# Non-nullable columns commonly used to sort beneficiary listings, nullable columns would break row comparisons
+KEYSET_ORDERING_FIELDS = {
+    'id',
+    'date_created',
+    'date_updated',
+    'date_valid_from',
+    'status',
+    'version',
+    'individual__first_name',
+    'individual__last_name',
+    'individual__dob',
+    'group__code',
+    'benefit_plan__code',
+    'benefit_plan__name',
+}
+
+
+def _serialize_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def encode_keyset_cursor(values: List) -> str:
+    payload = json.dumps([_serialize_value(value) for value in values])
+    return base64.b64encode(f'{KEYSET_CURSOR_PREFIX}{payload}'.encode('utf-8')).decode('ascii')
+
+
+def decode_keyset_cursor(cursor: Optional[str]) -> Optional[List]:
+    if not cursor:
+        return None
+    try:
+        decoded = base64.b64decode(cursor).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not decoded.startswith(KEYSET_CURSOR_PREFIX):
+        return None
+    try:
+        values = json.loads(decoded[len(KEYSET_CURSOR_PREFIX):])
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def get_keyset_ordering(queryset: QuerySet) -> Optional[List[Tuple[str, bool]]]:
+    """
+    Return (field, descending) pairs of the queryset ordering completed with the id tie-breaker,
+    or None if the ordering cannot be paginated with keysets.
+    """
+    ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    keyset_ordering = []
+    for order in ordering:
+        if not isinstance(order, str):
+            return None
+        descending = order.startswith('-')
+        field = order.lstrip('-+')
+        if field == 'pk':
+            field = 'id'
+        if field not in KEYSET_ORDERING_FIELDS:
+            return None
+        keyset_ordering.append((field, descending))
+    if not any(field == 'id' for field, _ in keyset_ordering):
+        descending = keyset_ordering[-1][1] if keyset_ordering else False
+        keyset_ordering.append(('id', descending))
+    return keyset_ordering
+
+
+def build_keyset_condition(keyset_ordering: List[Tuple[str, bool]], values: List, backward=False) -> Q:
+    """
+    Expand the row comparison `(k1, ..., kn) > (v1, ..., vn)` into
+    `k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...`, the direction of each column follows the ordering.
+    """
+    condition = Q()
+    equal_prefix = Q()
+    for (field, descending), value in zip(keyset_ordering, values):
+        lookup = 'lt' if descending != backward else 'gt'
+        condition |= equal_prefix & Q(**{f'{field}__{lookup}': value})
+        equal_prefix &= Q(**{field: value})
+    return condition
+
+
+def _get_value(obj, field):
+    for part in field.split('__'):
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+class TotalCountModeEnum(graphene.Enum):
+    EXACT = COUNT_MODE_EXACT
+    APPROXIMATE = COUNT_MODE_APPROXIMATE
+
+
+class CountingDjangoFilterConnectionField(OrderedDjangoFilterConnectionField):
+    """
+    Connection field with `totalCount` resolved by `social_protection.counting.count_queryset`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('totalCountMode', TotalCountModeEnum(
+            description="EXACT counts all rows, APPROXIMATE uses the planner estimate for large results"
+        ))
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        if not isinstance(iterable, QuerySet):
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+        mode = resolve_count_mode(args.get('totalCountMode'))
+        length = count_queryset(iterable, mode)
+        pagination_length = length
+        if mode == COUNT_MODE_APPROXIMATE and (args.get('last') or args.get('before')):
+            # Pages taken from the end of the result are sliced from its real length
+            pagination_length = exact_count(iterable)
+        elif mode == COUNT_MODE_APPROXIMATE:
+            return cls.resolve_approximate_connection(connection, args, iterable, length, max_limit)
+
+        iterable = iterable.all()
+        # graphene-django counts the queryset itself, provide the already resolved count instead
+        iterable.count = lambda: pagination_length
+        resolved = super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+        resolved.length = length
+        return resolved
+
+    @classmethod
+    def resolve_approximate_connection(cls, connection, args, queryset, length, max_limit=None):
+        """
+        Offset page of a connection with an estimated `totalCount`. The estimate may be above or below the real
+        count, so the page is fetched with one extra row which tells whether a next page exists.
+        """
+        offset = get_offset_with_default(args.get('after'), -1) + 1
+        page_size = args.get('first') or max_limit
+        if max_limit and page_size:
+            page_size = min(page_size, max_limit)
+
+        nodes = list(queryset[offset:offset + page_size + 1]) if page_size else list(queryset[offset:])
+        has_next_page = bool(page_size) and len(nodes) > page_size
+        nodes = nodes[:page_size] if page_size else nodes
+
+        edges = [
+            connection.Edge(node=node, cursor=offset_to_cursor(offset + position))
+            for position, node in enumerate(nodes)
+        ]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=False,
+            has_next_page=has_next_page,
+        )
+        resolved = connection(edges=edges, page_info=page_info)
+        resolved.iterable = queryset
+        resolved.length = length
+        return resolved
+
+
+class KeysetDjangoFilterConnectionField(CountingDjangoFilterConnectionField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('keyset', graphene.Boolean(
+            description="Paginate with cursors encoding sort values instead of offsets, "
+                        "pages stay fast regardless of their depth"
+        ))
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        if not args.get('keyset') or not isinstance(iterable, QuerySet):
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+        keyset_ordering = get_keyset_ordering(iterable)
+        if keyset_ordering is None:
+            logger.debug("Ordering %s not supported by keyset pagination, using offsets", iterable.query.order_by)
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+        return cls.resolve_keyset_connection(connection, args, iterable, keyset_ordering, max_limit)
+
+    @classmethod
+    def resolve_keyset_connection(cls, connection, args, queryset, keyset_ordering, max_limit=None):
+        after = decode_keyset_cursor(args.get('after'))
+        before = decode_keyset_cursor(args.get('before'))
+        backward = before is not None or (args.get('last') and after is None)
+        page_size = args.get('last') if backward else args.get('first')
+        page_size = page_size or max_limit
+        if max_limit:
+            page_size = min(page_size, max_limit)
+
+        length = count_queryset(queryset, args.get('totalCountMode'))
+        page_query = queryset
+        if after is not None:
+            page_query = page_query.filter(build_keyset_condition(keyset_ordering, after))
+        if before is not None:
+            page_query = page_query.filter(build_keyset_condition(keyset_ordering, before, backward=True))
+        page_query = page_query.order_by(*[
+            f"{'-' if descending != bool(backward) else ''}{field}" for field, descending in keyset_ordering
+        ])
+
+        nodes = list(page_query[:page_size + 1]) if page_size else list(page_query)
+        has_more = bool(page_size) and len(nodes) > page_size
+        nodes = nodes[:page_size] if page_size else nodes
+        if backward:
+            nodes.reverse()
+
+        edges = [
+            connection.Edge(
+                node=node,
+                cursor=encode_keyset_cursor([_get_value(node, field) for field, _ in keyset_ordering]),
+            )
+            for node in nodes
+        ]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_more if backward else after is not None,
+            has_next_page=before is not None if backward else has_more,
+        )
+        resolved = connection(edges=edges, page_info=page_info)
+        resolved.iterable = queryset
+        resolved.length = length
+        return resolved
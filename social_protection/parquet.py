@@ -0,0 +1,134 @@
+"""
+Apache Parquet support for beneficiary exports and imports.
+
+Parquet is read and written in row groups, so memory use is bounded by the chunk size rather than the size of
+the file. Columns of fields declared in `beneficiary_data_schema` are typed according to the schema. Values not
+matching the declared type are written as nulls. Other columns keep the types of the exported database fields.
+
+`pyarrow` is an optional dependency, it is imported only when Parquet is used.
+"""
+import logging
+import mimetypes
+from typing import Dict, Iterator, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PARQUET_EXTENSION = '.parquet'
+PARQUET_MIME_TYPE = 'application/vnd.apache.parquet'
+
+# Browsers and the standard library don't know the extension, uploads are recognized by it
+mimetypes.add_type(PARQUET_MIME_TYPE, PARQUET_EXTENSION)
+
+SCHEMA_TYPE_TO_ARROW = {
+    'string': 'string',
+    'integer': 'int64',
+    'number': 'float64',
+    'numeric': 'float64',
+    'boolean': 'bool_',
+}
+
+TRUE_VALUES = {'true', '1', 'yes', 't', 'y'}
+FALSE_VALUES = {'false', '0', 'no', 'f', 'n'}
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet support requires the pyarrow package to be installed") from exc
+    return pyarrow, pyarrow.parquet
+
+
+def _to_boolean(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and not pd.isna(value):
+        return bool(value)
+    if isinstance(value, str):
+        if value.strip().lower() in TRUE_VALUES:
+            return True
+        if value.strip().lower() in FALSE_VALUES:
+            return False
+    return None
+
+
+def _coerce_column(series: pd.Series, schema_type: str) -> pd.Series:
+    if schema_type == 'integer':
+        return pd.to_numeric(series, errors='coerce').round().astype('Int64')
+    if schema_type in ('number', 'numeric'):
+        return pd.to_numeric(series, errors='coerce').astype('float64')
+    if schema_type == 'boolean':
+        return series.map(_to_boolean).astype('boolean')
+    return series.map(lambda value: None if value is None or (isinstance(value, float) and pd.isna(value))
+                      else str(value))
+
+
+class ParquetExportWriter:
+    """
+    Writes every chunk as a separate row group. The arrow schema is fixed by the first chunk,
+    columns of `column_types` (column name -> schema type) are typed according to the benefit plan schema.
+    """
+
+    def __init__(self, handle, column_types: Optional[Dict[str, str]] = None):
+        self.pa, self.pq = import_pyarrow()
+        self.handle = handle
+        self.column_types = column_types or {}
+        self.schema = None
+        self.writer = None
+
+    def _prepare(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        chunk = chunk.copy()
+        for column, schema_type in self.column_types.items():
+            if column in chunk.columns and schema_type in SCHEMA_TYPE_TO_ARROW:
+                chunk[column] = _coerce_column(chunk[column], schema_type)
+        return chunk
+
+    def _build_schema(self, table):
+        fields = []
+        for field in table.schema:
+            schema_type = self.column_types.get(field.name)
+            if schema_type in SCHEMA_TYPE_TO_ARROW:
+                field = field.with_type(getattr(self.pa, SCHEMA_TYPE_TO_ARROW[schema_type])())
+            elif self.pa.types.is_null(field.type):
+                # Column without values in the first chunk, types of later chunks are unknown
+                field = field.with_type(self.pa.string())
+            fields.append(field)
+        return self.pa.schema(fields)
+
+    def _conform(self, table):
+        columns = []
+        for field in self.schema:
+            column = table.column(field.name)
+            if column.type != field.type:
+                try:
+                    column = column.cast(field.type)
+                except (self.pa.ArrowInvalid, self.pa.ArrowNotImplementedError):
+                    column = self.pa.array(
+                        [None if value is None else str(value) for value in column.to_pylist()], type=field.type
+                    )
+            columns.append(column)
+        return self.pa.Table.from_arrays(columns, schema=self.schema)
+
+    def write(self, chunk: pd.DataFrame):
+        table = self.pa.Table.from_pandas(self._prepare(chunk), preserve_index=False)
+        if self.writer is None:
+            self.schema = self._build_schema(table)
+            self.writer = self.pq.ParquetWriter(self.handle, self.schema)
+        self.writer.write_table(self._conform(table))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def iter_parquet_dataframes(source, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a Parquet file in batches of at most `batch_size` rows.
+    """
+    _, pq = import_pyarrow()
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield batch.to_pandas()
@@ -1,5 +1,6 @@
 import graphene
 import pandas as pd
+from graphene.types.generic import GenericScalar
 
 from django.contrib.auth.models import AnonymousUser
 from django.db.models import Q, Case, When, BooleanField, Value
@@ -35,6 +36,10 @@ from social_protection.gql_queries import (
     BenefitPlanHistoryGQLType,
     ActivityGQLType, ProjectGQLType,
     ProjectHistoryGQLType,
+    BeneficiaryExportJobGQLType,
+    BenefitPlanStatisticsDimensionEnum,
+    BenefitPlanStatisticsGQLType,
+    annotate_has_payment_plans,
 )
 from social_protection.export_mixin import ExportableSocialProtectionQueryMixin
 from social_protection.models import (
@@ -44,7 +49,10 @@ from social_protection.models import (
     BenefitPlanDataUploadRecords,
     Activity,
     Project,
+    BeneficiaryExportJob,
 )
+from social_protection.pagination import CountingDjangoFilterConnectionField, KeysetDjangoFilterConnectionField
+from social_protection.statistics import get_benefit_plan_statistics
 from social_protection.validation import (
     validate_bf_unique_code,
     validate_bf_unique_name,
@@ -95,7 +103,7 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
         search=graphene.String(),
         sort_alphabetically=graphene.Boolean(),
     )
-    beneficiary = OrderedDjangoFilterConnectionField(
+    beneficiary = KeysetDjangoFilterConnectionField(
         BeneficiaryGQLType,
         orderBy=graphene.List(of_type=graphene.String),
         dateValidFrom__Gte=graphene.DateTime(),
@@ -107,7 +115,7 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
         client_mutation_id=graphene.String(),
         customFilters=graphene.List(of_type=graphene.String),
     )
-    group_beneficiary = OrderedDjangoFilterConnectionField(
+    group_beneficiary = KeysetDjangoFilterConnectionField(
         GroupBeneficiaryGQLType,
         orderBy=graphene.List(of_type=graphene.String),
         dateValidFrom__Gte=graphene.DateTime(),
@@ -120,7 +128,7 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
         customFilters=graphene.List(of_type=graphene.String),
     )
 
-    beneficiary_data_upload_history = OrderedDjangoFilterConnectionField(
+    beneficiary_data_upload_history = CountingDjangoFilterConnectionField(
         BenefitPlanDataUploadQGLType,
         orderBy=graphene.List(of_type=graphene.String),
         dateValidFrom__Gte=graphene.DateTime(),
@@ -194,6 +202,36 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
         sort_alphabetically=graphene.Boolean(),
     )
 
+    beneficiary_export_async = graphene.Field(
+        BeneficiaryExportJobGQLType,
+        fields=graphene.List(of_type=graphene.String, required=True),
+        fields_columns=graphene.String(required=True),
+        filters=GenericScalar(description="Arguments of the beneficiary query, e.g. {\"benefitPlan_Id\": \"...\"}"),
+        file_format=graphene.String(),
+        description="Starts a background export of beneficiaries, poll beneficiaryExportJob for its status"
+    )
+    group_beneficiary_export_async = graphene.Field(
+        BeneficiaryExportJobGQLType,
+        fields=graphene.List(of_type=graphene.String, required=True),
+        fields_columns=graphene.String(required=True),
+        filters=GenericScalar(description="Arguments of the groupBeneficiary query"),
+        file_format=graphene.String(),
+        description="Starts a background export of group beneficiaries, poll beneficiaryExportJob for its status"
+    )
+    beneficiary_export_job = graphene.Field(
+        BeneficiaryExportJobGQLType,
+        id=graphene.UUID(required=True),
+        description="Status of a background beneficiary export started by the current user"
+    )
+
+    benefit_plan_statistics = graphene.List(
+        BenefitPlanStatisticsGQLType,
+        benefit_plan_id=graphene.List(graphene.UUID),
+        group_by=graphene.List(BenefitPlanStatisticsDimensionEnum),
+        description="Beneficiary counts of benefit plans from the precomputed rollup, "
+                    "grouped by all dimensions unless groupBy is given"
+    )
+
     def resolve_bf_code_validity(self, info, **kwargs):
         if not info.context.user.has_perms(SocialProtectionConfig.gql_benefit_plan_search_perms):
             raise PermissionDenied(_("unauthorized"))
@@ -257,7 +295,7 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
             SocialProtectionConfig.gql_benefit_plan_search_perms
         )
 
-        query = BenefitPlan.objects.filter(*filters)
+        query = annotate_has_payment_plans(BenefitPlan.objects.filter(*filters))
 
         sort_alphabetically = kwargs.get("sort_alphabetically", None)
         if sort_alphabetically:
@@ -442,6 +480,41 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
         query = GroupBeneficiary.objects.filter(*filters)
         return gql_optimizer.query(query, info)
 
+    def resolve_beneficiary_export_async(self, info, **kwargs):
+        return Query.start_background_export(
+            'beneficiary', BeneficiaryExportJob.ExportType.BENEFICIARY, info, kwargs['fields'],
+            kwargs['fields_columns'], kwargs.get('filters'), kwargs.get('file_format') or 'csv',
+        )
+
+    def resolve_group_beneficiary_export_async(self, info, **kwargs):
+        return Query.start_background_export(
+            'group_beneficiary', BeneficiaryExportJob.ExportType.GROUP_BENEFICIARY, info, kwargs['fields'],
+            kwargs['fields_columns'], kwargs.get('filters'), kwargs.get('file_format') or 'csv',
+        )
+
+    def resolve_beneficiary_export_job(self, info, **kwargs):
+        Query._check_permissions(
+            info.context.user,
+            SocialProtectionConfig.gql_beneficiary_search_perms
+        )
+        return BeneficiaryExportJob.objects.filter(id=kwargs['id'], user=info.context.user).first()
+
+    def resolve_benefit_plan_statistics(self, info, **kwargs):
+        Query._check_permissions(
+            info.context.user,
+            SocialProtectionConfig.gql_benefit_plan_search_perms
+        )
+        rows = get_benefit_plan_statistics(kwargs.get('benefit_plan_id'), kwargs.get('group_by'))
+        return [
+            {
+                **row,
+                'region_code': row.get('region__code'),
+                'region_name': row.get('region__name'),
+                'count': row['total'],
+            }
+            for row in rows
+        ]
+
     def resolve_beneficiary_data_upload_history(self, info, **kwargs):
         filters = append_validity_filter(**kwargs)
 
@@ -510,7 +583,7 @@ class Query(ExportableSocialProtectionQueryMixin, graphene.ObjectType):
             SocialProtectionConfig.gql_benefit_plan_search_perms
         )
 
-        query = BenefitPlan.history.filter(*filters)
+        query = annotate_has_payment_plans(BenefitPlan.history.filter(*filters))
 
         sort_alphabetically = kwargs.get("sort_alphabetically", None)
         if sort_alphabetically:
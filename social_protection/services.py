@@ -1,6 +1,7 @@
 import copy
 import json
 import logging
+import mimetypes
 import uuid
 
 import math
@@ -9,7 +10,8 @@ from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.db import transaction
 from django.db import models
 from django.db.models import Q, Value, Func, F
-from django.db.models.functions import Concat
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Coalesce, Concat
 from pandas import DataFrame
 
 from calculation.services import get_calculation_object
@@ -17,6 +19,19 @@ from core.services import BaseService
 from core.signals import register_service_signal
 from individual.models import IndividualDataSourceUpload, IndividualDataSource, Individual
 from social_protection.apps import SocialProtectionConfig
+from social_protection.background import run_in_background
+from social_protection.benefit_plan_schema import CompiledSchema, get_compiled_schema
+from social_protection.fuzzy_duplicates import find_fuzzy_duplicates, fuzzy_duplicate_validation
+from social_protection.import_progress import (
+    STAGE_FAILED,
+    STAGE_FINISHED,
+    STAGE_QUEUED,
+    STAGE_RUNNING,
+    STAGE_SAVED,
+    UPDATE_STATUS_UNCHANGED,
+    set_upload_stage,
+    track_import_stage,
+)
 from social_protection.models import (
     BenefitPlan,
     Beneficiary,
@@ -26,6 +41,9 @@ from social_protection.models import (
     Project,
 )
 
+from social_protection.opensearch_sync import deferred_opensearch_sync, sync_projects
+from social_protection.statistics import deferred_statistics_refresh
+from social_protection.parquet import PARQUET_MIME_TYPE, iter_parquet_dataframes
 from social_protection.utils import load_dataframe, fetch_summary_of_valid_items, fetch_summary_of_broken_items
 from social_protection.validation import (
     BeneficiaryValidation,
@@ -33,6 +51,12 @@ from social_protection.validation import (
     GroupBeneficiaryValidation,
     ProjectValidation,
 )
+from social_protection.unique_values import (
+    deferred_unique_value_index,
+    find_existing_unique_values,
+    index_created_beneficiaries,
+)
+from social_protection.validation_rules import ValidationMemo, calculate_column
 from tasks_management.services import UpdateCheckerLogicServiceMixin, CheckerLogicServiceMixin, \
     crud_business_data_builder
 from workflow.systems.base import WorkflowHandler
@@ -93,9 +117,10 @@ class BeneficiaryService(BaseService, CheckerLogicServiceMixin):
         benefit_plan = BenefitPlan.objects.get(id=benefit_plan_id)
         if benefit_plan and status == "ACTIVE":
             max_active_beneficiaries = benefit_plan.max_beneficiaries
-            active_beneficiaries = Beneficiary.objects.filter(is_deleted=False, benefit_plan_id=benefit_plan_id, status="ACTIVE").distinct()
-            beneficiary_already_active = active_beneficiaries.filter(id=id).exists() if id else False
-            return active_beneficiaries.count() == max_active_beneficiaries and not beneficiary_already_active
+            active_filters = {'is_deleted': False, 'benefit_plan_id': benefit_plan_id, 'status': "ACTIVE"}
+            if id and Beneficiary.objects.filter(id=id, **active_filters).exists():
+                return False
+            return Beneficiary.objects.filter(**active_filters).count() == max_active_beneficiaries
         return False
 
     @register_service_signal('beneficiary_service.create')
@@ -139,6 +164,7 @@ class BeneficiaryService(BaseService, CheckerLogicServiceMixin):
                     super().update({ 'id': id, 'project_id': None })
                 for id in enroll_ids:
                     super().update({ 'id': id, 'project_id': project_id })
+                sync_projects([project_id])
             except Exception as exc:
                 return output_exception(model_name=self.OBJECT_TYPE.__name__, method="update", exception=exc)
 
@@ -171,9 +197,10 @@ class GroupBeneficiaryService(BaseService, CheckerLogicServiceMixin):
         benefit_plan = BenefitPlan.objects.get(id=benefit_plan_id)
         if benefit_plan and status == "ACTIVE":
             max_active_beneficiaries = benefit_plan.max_beneficiaries
-            active_beneficiaries = GroupBeneficiary.objects.filter(is_deleted=False, benefit_plan_id=benefit_plan_id, status="ACTIVE").distinct()
-            beneficiary_already_active = active_beneficiaries.filter(id=id).exists() if id else False
-            return active_beneficiaries.count() == max_active_beneficiaries and not beneficiary_already_active
+            active_filters = {'is_deleted': False, 'benefit_plan_id': benefit_plan_id, 'status': "ACTIVE"}
+            if id and GroupBeneficiary.objects.filter(id=id, **active_filters).exists():
+                return False
+            return GroupBeneficiary.objects.filter(**active_filters).count() == max_active_beneficiaries
         return False
 
     @register_service_signal('group_beneficiary_service.create')
@@ -217,6 +244,7 @@ class GroupBeneficiaryService(BaseService, CheckerLogicServiceMixin):
                     super().update({ 'id': id, 'project_id': None })
                 for id in enroll_ids:
                     super().update({ 'id': id, 'project_id': project_id })
+                sync_projects([project_id])
             except Exception as exc:
                 return output_exception(model_name=self.OBJECT_TYPE.__name__, method="update", exception=exc)
 
@@ -232,6 +260,11 @@ class BeneficiaryImportService:
         # .ods
         'application/vnd.oasis.opendocument.spreadsheet': lambda f: pd.read_excel(f),
     }
+    # Loaders reading the file in chunks, each chunk is saved separately
+    import_chunk_loaders = {
+        # .parquet
+        PARQUET_MIME_TYPE: lambda f: iter_parquet_dataframes(f, SocialProtectionConfig.import_chunk_size),
+    }
 
     def __init__(self, user):
         super().__init__()
@@ -242,19 +275,57 @@ class BeneficiaryImportService:
                              import_file: InMemoryUploadedFile,
                              benefit_plan: BenefitPlan,
                              workflow: WorkflowHandler,
-                             group_aggregation_column: str):
+                             group_aggregation_column: str,
+                             run_async: bool = False):
         upload = self._save_sources(import_file)
         self._create_benefit_plan_data_upload_records(benefit_plan, workflow, upload, group_aggregation_column)
-        self._trigger_workflow(workflow, upload, benefit_plan)
+        set_upload_stage(upload, STAGE_SAVED)
+        if run_async:
+            # Returns right after the file is persisted, the workflow runs in the background pool
+            set_upload_stage(upload, STAGE_QUEUED)
+            run_in_background(self._run_workflow, workflow, upload, benefit_plan)
+        else:
+            self._run_workflow(workflow, upload, benefit_plan)
         return {'success': True, 'data': {'upload_uuid': upload.uuid}}
 
+    def _run_workflow(self, workflow: WorkflowHandler, upload: IndividualDataSourceUpload, benefit_plan: BenefitPlan):
+        set_upload_stage(upload, STAGE_RUNNING)
+        try:
+            with track_import_stage(upload.id, 'workflow'):
+                self._trigger_workflow(workflow, upload, benefit_plan)
+        except Exception as exc:
+            logger.error("Unexpected error while running import workflow", exc_info=exc)
+            self._save_upload_status(upload, IndividualDataSourceUpload.Status.FAIL, {'workflow': str(exc)})
+            set_upload_stage(upload, STAGE_FAILED)
+            raise
+        upload.refresh_from_db()
+        failed = upload.status == IndividualDataSourceUpload.Status.FAIL
+        set_upload_stage(upload, STAGE_FAILED if failed else STAGE_FINISHED)
+
     @transaction.atomic
     def _save_sources(self, import_file):
         # Method separated as workflow execution must be independent of the atomic transaction.
         upload = self._create_upload_entry(import_file.name)
-        dataframe = self._load_import_file(import_file)
-        self._validate_dataframe(dataframe)
-        self._save_data_source(dataframe, upload)
+        content_type = self._get_content_type(import_file)
+        if content_type in self.import_chunk_loaders:
+            # Chunks are read while saving, parsing is included in the stage
+            with track_import_stage(upload.id, 'parse_and_save_data_sources') as stage:
+                saved_rows = 0
+                for dataframe in self.import_chunk_loaders[content_type](import_file):
+                    if not saved_rows:
+                        self._validate_dataframe(dataframe)
+                    self._save_data_source(dataframe, upload)
+                    saved_rows += len(dataframe)
+                stage['rows'] = saved_rows
+            if not saved_rows:
+                raise ValueError("Import file is empty")
+            return upload
+        with track_import_stage(upload.id, 'parse_file') as stage:
+            dataframe = self._load_import_file(import_file)
+            self._validate_dataframe(dataframe)
+            stage['rows'] = len(dataframe)
+        with track_import_stage(upload.id, 'save_data_sources', rows=len(dataframe)):
+            self._save_data_source(dataframe, upload)
         return upload
 
     @transaction.atomic
@@ -268,12 +339,14 @@ class BeneficiaryImportService:
         record.save(user=self.user)
 
     def validate_import_beneficiaries(self, upload_id: uuid, individual_sources, benefit_plan: BenefitPlan):
-        dataframe = self._load_dataframe(individual_sources)
-        validated_dataframe, invalid_items = self._validate_possible_beneficiaries(
-            dataframe,
-            benefit_plan,
-            upload_id
-        )
+        with track_import_stage(upload_id, 'validation') as stage:
+            dataframe = self._load_dataframe(individual_sources)
+            stage['rows'] = len(dataframe)
+            validated_dataframe, invalid_items = self._validate_possible_beneficiaries(
+                dataframe,
+                benefit_plan,
+                upload_id
+            )
         return {'success': True, 'data': validated_dataframe, 'summary_invalid_items': invalid_items}
 
     def create_task_with_importing_valid_items(self, upload_id: uuid, benefit_plan: BenefitPlan):
@@ -316,27 +389,38 @@ class BeneficiaryImportService:
             ).run_workflow()
 
     def synchronize_data_for_reporting(self, upload_id: uuid, benefit_plan: BenefitPlan):
-        self._synchronize_individual(upload_id)
-        self._synchronize_beneficiary(benefit_plan, upload_id)
+        # Workflows insert beneficiaries with SQL, rollup of the plan and unique values are rebuilt at the end
+        with track_import_stage(upload_id, 'synchronize_data_for_reporting') as stage, \
+                deferred_statistics_refresh(getattr(benefit_plan, 'id', benefit_plan)), deferred_opensearch_sync(), \
+                deferred_unique_value_index():
+            individuals = self._synchronize_individual(upload_id)
+            beneficiaries = self._synchronize_beneficiary(benefit_plan, upload_id)
+            stage['rows'] = individuals + beneficiaries
+        index_created_beneficiaries(Beneficiary, Beneficiary.objects.filter(
+            benefit_plan=benefit_plan, individual__individualdatasource__upload_id=upload_id
+        ))
 
     def _validate_possible_beneficiaries(self, dataframe: DataFrame, benefit_plan: BenefitPlan, upload_id: uuid):
 
-        if isinstance(benefit_plan.beneficiary_data_schema, str):
-            schema_dict = json.loads(benefit_plan.beneficiary_data_schema)
-        else:
-            schema_dict = benefit_plan.beneficiary_data_schema
-        properties = schema_dict.get("properties", {})
+        compiled_schema = get_compiled_schema(benefit_plan)
+        properties = compiled_schema.properties
 
         calculation_uuid = SocialProtectionConfig.validation_calculation_uuid
         calculation = get_calculation_object(calculation_uuid)
 
-        unique_fields = [field for field, props in properties.items() if "uniqueness" in props]
-        unique_validations = {}
-        if unique_fields:
-            unique_validations = {
-                field: dataframe[field].duplicated(keep=False)
-                for field in unique_fields
-            }
+        # Values duplicated within the upload or already used by beneficiaries of the plan
+        existing_values = find_existing_unique_values(benefit_plan, upload_id, compiled_schema.unique_fields) \
+            if SocialProtectionConfig.enable_unique_value_index else {}
+        unique_validations = {
+            field: dataframe[field].duplicated(keep=False)
+            | dataframe['id'].astype(str).isin(existing_values.get(field, ()))
+            for field in compiled_schema.unique_fields
+        }
+
+        memo = ValidationMemo(
+            SocialProtectionConfig.validation_memo_size,
+            SocialProtectionConfig.validation_memo_excluded_rules,
+        )
 
         # TODO: Use ProcessPoolExecutor after resolving django dependency loading issue
         validated_dataframe = BeneficiaryImportService.process_chunk(
@@ -345,35 +429,57 @@ class BeneficiaryImportService:
             unique_validations,
             calculation,
             calculation_uuid,
+            memo,
+            compiled_schema.validation_rules,
         )
+        logger.debug("Validation of upload %s: %s memoized results, %s validated values",
+                     upload_id, memo.hits, memo.misses)
+
+        if SocialProtectionConfig.enable_fuzzy_duplicate_check:
+            duplicates = find_fuzzy_duplicates(dataframe, benefit_plan)
+            for field_validation in validated_dataframe:
+                duplicate = duplicates.get(str(field_validation['row'].get('id')))
+                if duplicate:
+                    field_validation['validations']['fuzzy_duplicate'] = fuzzy_duplicate_validation(duplicate)
 
         self.save_validation_error_in_data_source_bulk(validated_dataframe)
         invalid_items = fetch_summary_of_broken_items(upload_id)
         return validated_dataframe, invalid_items
 
     @staticmethod
-    def process_chunk(chunk, properties, unique_validations, calculation, calculation_uuid):
+    def process_chunk(chunk, properties, unique_validations, calculation, calculation_uuid, memo=None,
+                      validation_rules=None):
+        # Validation calculations are evaluated per column, rules may validate the whole column at once.
+        # Distinct values are validated once with the memo.
+        if validation_rules is None:
+            validation_rules = CompiledSchema({'properties': properties}).validation_rules
+        column_validations = {
+            field: calculate_column(
+                calculation,
+                calculation_uuid,
+                rule,
+                field,
+                chunk[field].tolist(),
+                memo,
+            )
+            for field, rule in validation_rules.items()
+            if rule and field in chunk.columns
+        }
+
         validated_dataframe = []
-        for _, row in chunk.iterrows():
+        for position, (_, row) in enumerate(chunk.iterrows()):
             field_validation = {'row': row.to_dict(), 'validations': {}}
             for field, field_properties in properties.items():
 
                 # Validation Calculation
-                if "validationCalculation" in field_properties and field in row:
-                    validation_name = field_properties["validationCalculation"]["name"]
-                    field_validation['validations'][field] = calculation.calculate_if_active_for_object(
-                        validation_name,
-                        calculation_uuid,
-                        field_name=field,
-                        field_value=row[field]
-                    )
+                if field in column_validations:
+                    field_validation['validations'][field] = column_validations[field][position]
 
                 # Uniqueness Check
                 if "uniqueness" in field_properties and field in row:
                     field_validation['validations'][f'{field}_uniqueness'] = {
-                        'success': not unique_validations[field].loc[row.name] 
+                        'success': not unique_validations[field].loc[row.name]
                     }
-                    
 
             validated_dataframe.append(field_validation)
 
@@ -399,12 +505,7 @@ class BeneficiaryImportService:
             raise ValueError("Missing validation name")
         calculation_uuid = SocialProtectionConfig.validation_calculation_uuid
         calculation = get_calculation_object(calculation_uuid)
-        result_row = calculation.calculate_if_active_for_object(
-            validation_calculation,
-            calculation_uuid,
-            field_name=field,
-            field_value=row[field]
-        )
+        result_row, = calculate_column(calculation, calculation_uuid, validation_calculation, field, [row[field]])
         return result_row
 
     def _create_upload_entry(self, filename):
@@ -418,11 +519,20 @@ class BeneficiaryImportService:
         if dataframe.empty:
             raise ValueError("Import file is empty")
 
+    def _get_content_type(self, import_file):
+        content_type = import_file.content_type
+        if content_type in self.import_loaders or content_type in self.import_chunk_loaders:
+            return content_type
+        # Browsers don't have a registered content type for some formats (e.g. parquet)
+        guessed_type, _ = mimetypes.guess_type(import_file.name)
+        return guessed_type or content_type
+
     def _load_import_file(self, import_file) -> pd.DataFrame:
-        if import_file.content_type not in self.import_loaders:
+        content_type = self._get_content_type(import_file)
+        if content_type not in self.import_loaders:
             raise ValueError("Unsupported content type: {}".format(import_file.content_type))
 
-        return self.import_loaders[import_file.content_type](import_file)
+        return self.import_loaders[content_type](import_file)
 
     def _save_data_source(self, dataframe: pd.DataFrame, upload: IndividualDataSourceUpload):
         data_source_objects = []
@@ -453,8 +563,7 @@ class BeneficiaryImportService:
                           benefit_plan: BenefitPlan):
         try:
             # Before the run in order to avoid racing conditions
-            upload.status = IndividualDataSourceUpload.Status.TRIGGERED
-            upload.save(username=self.user.login_name)
+            self._save_upload_status(upload, IndividualDataSourceUpload.Status.TRIGGERED)
 
             result = workflow.run({
                 # Core user UUID required
@@ -468,13 +577,25 @@ class BeneficiaryImportService:
             if result and isinstance(result, dict) and result.get('success') is False:
                 raise ValueError(result.get('message', 'Unexpected error during the workflow execution'))
         except ValueError as e:
-            upload.status = IndividualDataSourceUpload.Status.FAIL
-            upload.error = {'workflow': str(e)}
-            upload.save(username=self.user.login_name)
+            self._save_upload_status(upload, IndividualDataSourceUpload.Status.FAIL, {'workflow': str(e)})
             return upload
 
+    def _save_upload_status(self, upload: IndividualDataSourceUpload, status, error=None):
+        # Stage timings are merged into json_ext with queryset updates, the instance may hold a stale copy
+        upload.refresh_from_db(fields=['json_ext'])
+        upload.status = status
+        if error is not None:
+            upload.error = error
+        upload.save(username=self.user.login_name)
+
     def save_validation_error_in_data_source_bulk(self, validated_dataframe):
         data_sources_to_update = []
+        # Keep other keys of the validations (import_errors of the SQL validation, update_status)
+        existing_validations = {
+            str(data_source_id): validations for data_source_id, validations in IndividualDataSource.objects
+            .filter(id__in=[field_validation['row']['id'] for field_validation in validated_dataframe])
+            .values_list('id', 'validations')
+        }
 
         for field_validation in validated_dataframe:
             row = field_validation['row']
@@ -490,16 +611,25 @@ class BeneficiaryImportService:
             data_sources_to_update.append(
                 IndividualDataSource(
                     id=row['id'],
-                    validations={'validation_errors': error_fields}
+                    validations={**(existing_validations.get(str(row['id'])) or {}), 'validation_errors': error_fields}
                 )
             )
 
         if data_sources_to_update:
             IndividualDataSource.objects.bulk_update(data_sources_to_update, ['validations'])
 
+    @staticmethod
+    def _synchronized_individual_ids(upload_id):
+        # Unchanged rows of update uploads are linked to individuals which were not rewritten, no new versions
+        return IndividualDataSource.objects \
+            .filter(upload_id=upload_id, individual__isnull=False) \
+            .annotate(update_status=Coalesce(KeyTextTransform('update_status', 'validations'), Value(''))) \
+            .exclude(update_status=UPDATE_STATUS_UNCHANGED) \
+            .values('individual_id')
+
     def _synchronize_individual(self, upload_id):
         individuals_to_update = Individual.objects.filter(
-            individualdatasource__upload=upload_id
+            id__in=self._synchronized_individual_ids(upload_id)
         )
         for individual in individuals_to_update:
             synch_status = {
@@ -511,11 +641,12 @@ class BeneficiaryImportService:
             else:
                 individual.json_ext = synch_status
             individual.save(user=self.user)
+        return len(individuals_to_update)
 
     def _synchronize_beneficiary(self, benefit_plan, upload_id):
         unique_uuids = list((
             Beneficiary.objects
-                .filter(benefit_plan=benefit_plan, individual__individualdatasource__upload_id=upload_id)
+                .filter(benefit_plan=benefit_plan, individual_id__in=self._synchronized_individual_ids(upload_id))
                 .values_list('id', flat=True)
                 .distinct()
         ))
@@ -532,6 +663,7 @@ class BeneficiaryImportService:
             else:
                 beneficiary.json_ext = synch_status
             beneficiary.save(user=self.user)
+        return len(beneficiaries)
 
 
 class BeneficiaryTaskCreatorService:
@@ -540,10 +672,12 @@ class BeneficiaryTaskCreatorService:
         self.user = user
 
     def create_task_with_importing_valid_items(self, upload_id: uuid, benefit_plan: BenefitPlan):
-        self._create_task(benefit_plan, upload_id, SocialProtectionConfig.validation_import_valid_items)
+        with track_import_stage(upload_id, 'create_task'):
+            self._create_task(benefit_plan, upload_id, SocialProtectionConfig.validation_import_valid_items)
 
     def create_task_with_update_valid_items(self, upload_id: uuid, benefit_plan: BenefitPlan):
-        self._create_task(benefit_plan, upload_id, SocialProtectionConfig.validation_upload_valid_items)
+        with track_import_stage(upload_id, 'create_task'):
+            self._create_task(benefit_plan, upload_id, SocialProtectionConfig.validation_upload_valid_items)
 
     @register_service_signal('socialProtection.update_task')
     @transaction.atomic()
@@ -4,8 +4,12 @@ from core.service_signals import ServiceSignalBindType
 from core.signals import bind_service_signal
 from core.models import User
 from social_protection.apps import SocialProtectionConfig
+from social_protection.benefit_plan_schema import on_benefit_plan_schema_change
 from social_protection.services import BenefitPlanService, BeneficiaryService, GroupBeneficiaryService, GroupBeneficiary
 from social_protection.models import BenefitPlan, Beneficiary, BeneficiaryStatus
+from social_protection.opensearch_sync import deferred_opensearch_sync
+from social_protection.statistics import deferred_statistics_refresh
+from social_protection.unique_values import on_benefit_plan_unique_fields_change
 from social_protection.signals.on_validation_import_valid_items import on_task_complete_import_validated, \
     on_task_resolve
 
@@ -38,16 +42,18 @@ def bind_service_signals():
                     benefit_plan.save(username=user.username)
                     if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
                         beneficiaries = Beneficiary.objects.filter(benefit_plan=benefit_plan, is_deleted=False)
-                        for beneficiary in beneficiaries:
-                            if beneficiary.status != BeneficiaryStatus.GRADUATED:
-                                beneficiary.status = BeneficiaryStatus.GRADUATED
-                                beneficiary.save(username=user.username)
+                        with deferred_statistics_refresh(), deferred_opensearch_sync():
+                            for beneficiary in beneficiaries:
+                                if beneficiary.status != BeneficiaryStatus.GRADUATED:
+                                    beneficiary.status = BeneficiaryStatus.GRADUATED
+                                    beneficiary.save(username=user.username)
                     if benefit_plan.type == BenefitPlan.BenefitPlanType.GROUP_TYPE:
                         group_beneficiaries = GroupBeneficiary.objects.filter(benefit_plan=benefit_plan, is_deleted=False)
-                        for group_beneficiary in group_beneficiaries:
-                            if group_beneficiary.status != BeneficiaryStatus.GRADUATED:
-                                group_beneficiary.status = BeneficiaryStatus.GRADUATED
-                                group_beneficiary.save(username=user.username)
+                        with deferred_statistics_refresh():
+                            for group_beneficiary in group_beneficiaries:
+                                if group_beneficiary.status != BeneficiaryStatus.GRADUATED:
+                                    group_beneficiary.status = BeneficiaryStatus.GRADUATED
+                                    group_beneficiary.save(username=user.username)
         except Exception as exc:
             logger.error("Error while executing on_task_close_benefit_plan", exc_info=exc)
 
@@ -91,3 +97,14 @@ def bind_service_signals():
         on_task_close_benefit_plan,
         bind_type=ServiceSignalBindType.AFTER
     )
+    for signal in ('benefit_plan_service.create', 'benefit_plan_service.update', 'benefit_plan_service.delete'):
+        bind_service_signal(
+            signal,
+            on_benefit_plan_schema_change,
+            bind_type=ServiceSignalBindType.AFTER
+        )
+    bind_service_signal(
+        'benefit_plan_service.update',
+        on_benefit_plan_unique_fields_change,
+        bind_type=ServiceSignalBindType.AFTER
+    )
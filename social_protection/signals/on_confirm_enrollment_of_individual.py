@@ -12,6 +12,8 @@ from social_protection.models import (
     BenefitPlanDataUploadRecords,
     BenefitPlan
 )
+from social_protection.statistics import deferred_statistics_refresh
+from social_protection.unique_values import index_created_beneficiaries
 from social_protection.utils import calculate_percentage_of_invalid_items
 from tasks_management.models import Task
 from tasks_management.apps import TasksManagementConfig
@@ -90,6 +92,10 @@ def on_confirm_enrollment_of_individual(**kwargs):
             )
             new_beneficiaries.append(beneficiary)
         try:
-            Beneficiary.objects.bulk_create(new_beneficiaries)
+            with deferred_statistics_refresh(benefit_plan_id):
+                Beneficiary.objects.bulk_create(new_beneficiaries)
+            index_created_beneficiaries(
+                Beneficiary, Beneficiary.objects.filter(id__in=[beneficiary.id for beneficiary in new_beneficiaries])
+            )
         except ValidationError as e:
             logger.error(f"Validation error occurred: {e}")
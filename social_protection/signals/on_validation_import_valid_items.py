@@ -24,6 +24,8 @@ from social_protection.models import (
     BenefitPlan,
     GroupBeneficiary
 )
+from social_protection.statistics import deferred_statistics_refresh
+from social_protection.unique_values import index_created_beneficiaries
 from tasks_management.apps import TasksManagementConfig
 from tasks_management.models import Task
 from tasks_management.services import TaskService
@@ -384,7 +386,11 @@ def on_task_complete_action(business_event, **kwargs):
                 )
                 new_group_beneficiaries.append(group_beneficiary)
             try:
-                GroupBeneficiary.objects.bulk_create(new_group_beneficiaries)
+                with deferred_statistics_refresh(data['task']['json_ext']['benefit_plan_id']):
+                    GroupBeneficiary.objects.bulk_create(new_group_beneficiaries)
+                index_created_beneficiaries(GroupBeneficiary, GroupBeneficiary.objects.filter(
+                    id__in=[group_beneficiary.id for group_beneficiary in new_group_beneficiaries]
+                ))
             except ValidationError as e:
                 logger.error(f"Validation error occurred: {e}")
             return
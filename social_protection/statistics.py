@@ -0,0 +1,199 @@
+"""
+Rollup of beneficiary counts per benefit plan, beneficiary type, status, project and region.
+
+Dashboards and benefit plan lists read counts from `BenefitPlanStatistics` instead of counting beneficiary
+tables. Rows are kept up to date:
+- on every save or delete of a `Beneficiary` or `GroupBeneficiary`, by moving one unit from the rollup key
+  of the previous state of the record to the key of its new state,
+- after bulk operations (imports, graduation of a suspended plan), by rebuilding the rollup of the touched plans
+  with a single aggregate query. Per record updates are suspended within `deferred_statistics_refresh()`.
+
+The rollup is approximate: the region of a record is not moved when its individual or group changes location,
+and changes made with raw SQL are not tracked. `rebuild_benefit_plan_statistics` rebuilds the rollup from scratch
+and should be run periodically. Limits such as the maximum number of active beneficiaries are checked against the
+beneficiary tables, not against the rollup.
+Several rows may exist for the same key, counts are always read as sums.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, When
+from django.db.models.query import QuerySet
+
+from social_protection.models import Beneficiary, BeneficiaryStatus, BenefitPlanStatistics, GroupBeneficiary
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+LOCATION_PARENT_DEPTH = 3
+REGION_LOCATION_TYPE = 'R'
+
+# model -> (beneficiary type, location of the beneficiary)
+ROLLUP_SOURCES = {
+    Beneficiary: (BenefitPlanStatistics.BeneficiaryType.INDIVIDUAL, 'individual__location'),
+    GroupBeneficiary: (BenefitPlanStatistics.BeneficiaryType.GROUP, 'group__location'),
+}
+
+STATISTICS_DIMENSIONS = ('benefit_plan_id', 'beneficiary_type', 'status', 'project_id', 'region_id')
+
+
+def region_expression(location_path: str):
+    """
+    Id of the region among the location and its ancestors.
+    """
+    paths = [f"{location_path}{'__parent' * depth}" for depth in range(LOCATION_PARENT_DEPTH + 1)]
+    return Case(
+        *[When(**{f'{path}__type': REGION_LOCATION_TYPE}, then=F(path)) for path in paths],
+        default=None,
+        output_field=IntegerField(),
+    )
+
+
+def _rollup_rows(model, queryset: QuerySet) -> QuerySet:
+    _, location_path = ROLLUP_SOURCES[model]
+    return queryset \
+        .filter(is_deleted=False) \
+        .order_by() \
+        .values('benefit_plan_id', 'status', 'project_id', region_id=region_expression(location_path)) \
+        .annotate(count=Count('id'))
+
+
+def _get_state():
+    if not hasattr(_state, 'depth'):
+        _state.depth = 0
+        _state.benefit_plan_ids = set()
+    return _state
+
+
+def is_statistics_refresh_deferred() -> bool:
+    return _get_state().depth > 0
+
+
+def defer_statistics_refresh(benefit_plan_id):
+    _get_state().benefit_plan_ids.add(str(benefit_plan_id))
+
+
+@contextmanager
+def deferred_statistics_refresh(*benefit_plan_ids):
+    """
+    Suspend per record updates of the rollup, plans changed within the block (and `benefit_plan_ids`)
+    are rebuilt when the outermost block exits.
+    """
+    state = _get_state()
+    state.depth += 1
+    for benefit_plan_id in benefit_plan_ids:
+        defer_statistics_refresh(benefit_plan_id)
+    try:
+        yield
+    except BaseException:
+        state.depth -= 1
+        if state.depth == 0:
+            state.benefit_plan_ids = set()
+        raise
+    state.depth -= 1
+    if state.depth == 0:
+        changed_plan_ids, state.benefit_plan_ids = state.benefit_plan_ids, set()
+        if changed_plan_ids:
+            rebuild_benefit_plan_statistics(changed_plan_ids)
+
+
+def rebuild_benefit_plan_statistics(benefit_plan_ids: Optional[Iterable] = None) -> int:
+    """
+    Replace rollup rows of the plans (all plans if None) with counts aggregated from beneficiary tables.
+    """
+    rows = []
+    for model, (beneficiary_type, _) in ROLLUP_SOURCES.items():
+        queryset = model.objects.all()
+        if benefit_plan_ids is not None:
+            queryset = queryset.filter(benefit_plan_id__in=list(benefit_plan_ids))
+        rows.extend(
+            BenefitPlanStatistics(beneficiary_type=beneficiary_type, **row)
+            for row in _rollup_rows(model, queryset)
+        )
+    with transaction.atomic():
+        existing = BenefitPlanStatistics.objects.all()
+        if benefit_plan_ids is not None:
+            existing = existing.filter(benefit_plan_id__in=list(benefit_plan_ids))
+        existing.delete()
+        BenefitPlanStatistics.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _record_key(model, pk) -> Optional[tuple]:
+    row = _rollup_rows(model, model.objects.filter(pk=pk)).first()
+    if row is None:
+        return None
+    beneficiary_type, _ = ROLLUP_SOURCES[model]
+    return row['benefit_plan_id'], beneficiary_type, row['status'], row['project_id'], row['region_id']
+
+
+def _apply_delta(key: tuple, delta: int):
+    filters = dict(zip(STATISTICS_DIMENSIONS, key))
+    row_id = BenefitPlanStatistics.objects.filter(**filters).values_list('id', flat=True).first()
+    if row_id is None:
+        BenefitPlanStatistics.objects.create(count=delta, **filters)
+    else:
+        BenefitPlanStatistics.objects.filter(id=row_id).update(count=F('count') + delta)
+
+
+def on_beneficiary_pre_save(sender, instance, **kwargs):
+    """
+    Remember the rollup key of the stored state of the record, connected to `pre_save` and `pre_delete`.
+    """
+    if is_statistics_refresh_deferred() or instance.pk is None:
+        return
+    instance._statistics_key = _record_key(sender, instance.pk)
+
+
+def on_beneficiary_post_save(sender, instance, **kwargs):
+    if is_statistics_refresh_deferred():
+        defer_statistics_refresh(instance.benefit_plan_id)
+        return
+    previous_key = getattr(instance, '_statistics_key', None)
+    current_key = _record_key(sender, instance.pk)
+    if previous_key != current_key:
+        if previous_key:
+            _apply_delta(previous_key, -1)
+        if current_key:
+            _apply_delta(current_key, 1)
+    instance._statistics_key = current_key
+
+
+def on_beneficiary_post_delete(sender, instance, **kwargs):
+    if is_statistics_refresh_deferred():
+        defer_statistics_refresh(instance.benefit_plan_id)
+        return
+    previous_key = getattr(instance, '_statistics_key', None)
+    if previous_key:
+        _apply_delta(previous_key, -1)
+
+
+def get_benefit_plan_statistics(benefit_plan_ids=None, group_by: Optional[List[str]] = None) -> List[dict]:
+    """
+    Counts summed over the requested dimensions (all dimensions by default).
+    """
+    group_by = [dimension for dimension in (group_by or STATISTICS_DIMENSIONS) if dimension in STATISTICS_DIMENSIONS]
+    values = list(group_by)
+    if 'region_id' in group_by:
+        values += ['region__code', 'region__name']
+    queryset = BenefitPlanStatistics.objects.all()
+    if benefit_plan_ids is not None:
+        queryset = queryset.filter(benefit_plan_id__in=list(benefit_plan_ids))
+    return list(
+        queryset
+        .values(*values)
+        .annotate(total=Sum('count'))
+        .filter(total__gt=0)
+        .order_by(*group_by)
+    )
+
+
+def count_active_beneficiaries(benefit_plan_id, beneficiary_type) -> int:
+    return BenefitPlanStatistics.objects \
+        .filter(benefit_plan_id=benefit_plan_id, beneficiary_type=beneficiary_type) \
+        .filter(status=BeneficiaryStatus.ACTIVE) \
+        .aggregate(total=Sum('count'))['total'] or 0
@@ -46,6 +46,21 @@ class BeneficiaryImportServiceTest(TestCase):
         self.assertIsInstance(validated_dataframe, list)
         self.assertIsInstance(invalid_items, list)
 
+    def test_validation_errors_keep_import_errors(self):
+        data_source = self.individual_sources.first()
+        IndividualDataSource.objects.filter(id=data_source.id).update(validations={'import_errors': ['dob']})
+
+        self.service.save_validation_error_in_data_source_bulk([{
+            'row': {'id': str(data_source.id)},
+            'validations': {'email': {'success': False, 'field_name': 'email', 'note': 'Invalid email'}},
+        }])
+
+        data_source.refresh_from_db()
+        self.assertEqual(data_source.validations, {
+            'import_errors': ['dob'],
+            'validation_errors': [{'field_name': 'email', 'note': 'Invalid email'}],
+        })
+
     def test_load_dataframe(self):
         result = self.service._load_dataframe(self.individual_sources)
         self.assertIsInstance(result, pd.DataFrame)
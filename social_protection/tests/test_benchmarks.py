@@ -0,0 +1,61 @@
+from unittest import skipIf
+
+from django.db import connection
+from django.test import TestCase
+
+from core.test_helpers import LogInHelper
+from social_protection.benchmarks.data_generator import (
+    count_invalid_rows,
+    generate_beneficiary_dataframe,
+    generate_beneficiary_schema,
+)
+from social_protection.benchmarks.runner import run_import_benchmark
+from social_protection.models import BenefitPlan
+
+
+class BenchmarkDataGeneratorTest(TestCase):
+
+    def test_columns_match_schema(self):
+        schema = generate_beneficiary_schema(schema_width=6)
+        dataframe = generate_beneficiary_dataframe(100, schema_width=6)
+
+        self.assertEqual(len(dataframe), 100)
+        self.assertTrue(set(schema['properties']).issubset(dataframe.columns))
+        base_fields = {'first_name', 'last_name', 'dob', 'location_name', 'location_code'}
+        self.assertTrue(base_fields.issubset(dataframe.columns))
+        self.assertEqual(count_invalid_rows(dataframe), 0)
+
+    def test_error_rate_and_groups(self):
+        dataframe = generate_beneficiary_dataframe(1000, error_rate=0.1, group_size=4, seed=1)
+
+        invalid_rows = count_invalid_rows(dataframe)
+        self.assertGreater(invalid_rows, 100)
+        self.assertLess(invalid_rows, 400)
+        self.assertEqual(dataframe['group_code'].nunique(), 250)
+        self.assertEqual((dataframe['individual_role'] == 'HEAD').sum(), 250)
+
+    def test_generation_is_deterministic(self):
+        first = generate_beneficiary_dataframe(50, error_rate=0.2, seed=3)
+        second = generate_beneficiary_dataframe(50, error_rate=0.2, seed=3)
+        self.assertTrue(first.equals(second))
+
+
+@skipIf(
+    connection.vendor != "postgresql",
+    "Skipping tests due to implementation usage of validate_json_schema, which is a postgres specific extension."
+)
+class ImportBenchmarkTest(TestCase):
+
+    def test_benchmark_reports_stages(self):
+        user = LogInHelper().get_or_create_user_api()
+        result = run_import_benchmark(user, 20, schema_width=2, error_rate=0.1)
+
+        self.assertEqual(result['rows'], 20)
+        self.assertEqual(
+            set(result['stages']), {'generate_file', 'import_beneficiaries', 'validation', 'sql_procedure'}
+        )
+        self.assertEqual(result['imported_individuals'], 20 - result['invalid_rows'])
+        for stage in result['stages'].values():
+            self.assertIsNotNone(stage['peak_memory_mb'])
+        # Data is rolled back after the run
+        self.assertFalse(BenefitPlan.objects.filter(name__startswith='Import benchmark').exists())
@@ -0,0 +1,78 @@
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.benefit_plan_schema import (
+    get_compiled_schema,
+    get_schema_definitions,
+    invalidate_schema_definitions,
+    on_benefit_plan_schema_change,
+)
+from social_protection.models import BenefitPlan
+from social_protection.tests.test_helpers import create_benefit_plan
+
+
+class BenefitPlanSchemaDefinitionsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'SCHEMACACHE'})
+
+    def setUp(self):
+        invalidate_schema_definitions()
+
+    def _query(self):
+        return BenefitPlan.objects.filter(id=self.benefit_plan.id)
+
+    def test_definitions_are_parsed_from_schema(self):
+        definitions = get_schema_definitions(self._query())
+        self.assertEqual(definitions, [(
+            ('email', 'string'), ('able_bodied', 'boolean'), ('number_of_children', 'integer'),
+        )])
+
+    def test_warm_cache_fetches_only_versions(self):
+        get_schema_definitions(self._query())
+        with self.assertNumQueries(1):
+            get_schema_definitions(self._query())
+
+    def test_signal_invalidates_updated_plan(self):
+        get_schema_definitions(self._query())
+        BenefitPlan.objects.filter(id=self.benefit_plan.id).update(
+            beneficiary_data_schema={'properties': {'household_size': {'type': 'integer'}}}
+        )
+        on_benefit_plan_schema_change(result={'success': True, 'data': {'id': str(self.benefit_plan.id)}})
+        self.assertEqual(get_schema_definitions(self._query()), [(('household_size', 'integer'),)])
+
+    def test_compiled_schema_artifacts(self):
+        self.benefit_plan.beneficiary_data_schema = {'properties': {
+            'national_id': {'type': 'string', 'uniqueness': True},
+            'email': {'type': 'string', 'validationCalculation': {'name': 'EmailValidationStrategy'}},
+            'household_size': {'type': 'integer'},
+        }}
+        self.benefit_plan.save(username=self.user.username)
+        compiled = get_compiled_schema(self.benefit_plan)
+
+        self.assertEqual(compiled.property_names, {'national_id', 'email', 'household_size'})
+        self.assertEqual(compiled.unique_fields, ('national_id',))
+        self.assertEqual(compiled.validation_rules, {'email': 'EmailValidationStrategy'})
+        self.assertEqual(compiled.export_columns, ('national_id', 'email', 'household_size'))
+        self.assertIs(get_compiled_schema(self.benefit_plan), compiled)
+
+    def test_unsaved_changes_are_not_cached(self):
+        stored = get_compiled_schema(self.benefit_plan)
+        edited = BenefitPlan.objects.get(id=self.benefit_plan.id)
+        edited.beneficiary_data_schema = {'properties': {'household_size': {'type': 'integer'}}}
+
+        self.assertIs(get_compiled_schema(edited), stored)
+        invalidate_schema_definitions()
+        self.assertEqual(get_compiled_schema(edited).definition, stored.definition)
+        self.assertEqual(get_schema_definitions(self._query()), [stored.definition])
+
+    def test_new_version_is_compiled_again(self):
+        compiled = get_compiled_schema(self.benefit_plan)
+        self.benefit_plan.beneficiary_data_schema = {'properties': {'household_size': {'type': 'integer'}}}
+        self.benefit_plan.save(username=self.user.username)
+
+        recompiled = get_compiled_schema(self.benefit_plan)
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(recompiled.definition, (('household_size', 'integer'),))
@@ -0,0 +1,87 @@
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.models import Beneficiary, BeneficiaryStatus, BenefitPlanStatistics
+from social_protection.services import BeneficiaryService
+from social_protection.statistics import (
+    count_active_beneficiaries,
+    deferred_statistics_refresh,
+    get_benefit_plan_statistics,
+    is_statistics_refresh_deferred,
+    rebuild_benefit_plan_statistics,
+)
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+)
+
+
+class BenefitPlanStatisticsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'STATS', 'max_beneficiaries': 3})
+        cls.service = BeneficiaryService(cls.user)
+        for _ in range(2):
+            add_individual_to_benefit_plan(
+                cls.service, create_individual(cls.user.username), cls.benefit_plan, {'status': 'ACTIVE'}
+            )
+        add_individual_to_benefit_plan(
+            cls.service, create_individual(cls.user.username), cls.benefit_plan, {'status': 'POTENTIAL'}
+        )
+
+    def _counts_by_status(self):
+        return {
+            row['status']: row['total']
+            for row in get_benefit_plan_statistics([self.benefit_plan.id], group_by=['status'])
+        }
+
+    def test_rollup_maintained_on_save(self):
+        self.assertEqual(self._counts_by_status(), {'ACTIVE': 2, 'POTENTIAL': 1})
+
+        beneficiary = Beneficiary.objects.filter(benefit_plan=self.benefit_plan, status='POTENTIAL').first()
+        beneficiary.status = BeneficiaryStatus.ACTIVE
+        beneficiary.save(username=self.user.username)
+        self.assertEqual(self._counts_by_status(), {'ACTIVE': 3})
+
+        beneficiary.delete(username=self.user.username)
+        self.assertEqual(self._counts_by_status(), {'ACTIVE': 2})
+
+    def test_rebuild_matches_incremental_updates(self):
+        incremental = self._counts_by_status()
+        BenefitPlanStatistics.objects.filter(benefit_plan=self.benefit_plan).update(count=0)
+        rebuild_benefit_plan_statistics([self.benefit_plan.id])
+        self.assertEqual(self._counts_by_status(), incremental)
+
+    def test_bulk_update_rebuilds_once(self):
+        with deferred_statistics_refresh(self.benefit_plan.id):
+            Beneficiary.objects.filter(benefit_plan=self.benefit_plan).update(status=BeneficiaryStatus.GRADUATED)
+            self.assertEqual(self._counts_by_status(), {'ACTIVE': 2, 'POTENTIAL': 1})
+        self.assertEqual(self._counts_by_status(), {'GRADUATED': 3})
+
+    def test_failed_bulk_update_skips_rebuild(self):
+        with self.assertRaises(ValueError):
+            with deferred_statistics_refresh(self.benefit_plan.id):
+                raise ValueError('import failed')
+        self.assertFalse(is_statistics_refresh_deferred())
+        with self.assertNumQueries(0):
+            with deferred_statistics_refresh():
+                pass
+
+    def test_active_count_read_from_rollup(self):
+        with self.assertNumQueries(1):
+            active = count_active_beneficiaries(self.benefit_plan.id, BenefitPlanStatistics.BeneficiaryType.INDIVIDUAL)
+        self.assertEqual(active, 2)
+
+    def test_max_active_beneficiaries_checked_with_exact_count(self):
+        add_individual_to_benefit_plan(
+            self.service, create_individual(self.user.username), self.benefit_plan, {'status': 'ACTIVE'}
+        )
+        BenefitPlanStatistics.objects.filter(benefit_plan=self.benefit_plan).delete()
+        self.assertTrue(self.service.would_exceed_max_active_beneficiaries(self.benefit_plan.id, 'ACTIVE'))
+        active = Beneficiary.objects.filter(benefit_plan=self.benefit_plan, status='ACTIVE').first()
+        self.assertFalse(
+            self.service.would_exceed_max_active_beneficiaries(self.benefit_plan.id, 'ACTIVE', active.id)
+        )
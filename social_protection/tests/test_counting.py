@@ -0,0 +1,65 @@
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.apps import SocialProtectionConfig
+from social_protection.counting import (
+    COUNT_MODE_APPROXIMATE,
+    count_queryset,
+    estimate_count,
+)
+from social_protection.models import Beneficiary
+from social_protection.services import BeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+)
+
+
+@mock.patch.object(SocialProtectionConfig, 'gql_total_count_cache_ttl', 30)
+class CountQuerysetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'COUNTS'})
+        cls.service = BeneficiaryService(cls.user)
+        for _ in range(3):
+            add_individual_to_benefit_plan(cls.service, create_individual(cls.user.username), cls.benefit_plan)
+
+    def setUp(self):
+        cache.clear()
+
+    def _query(self):
+        return Beneficiary.objects.filter(benefit_plan=self.benefit_plan, is_deleted=False)
+
+    def test_exact_count_is_cached(self):
+        self.assertEqual(count_queryset(self._query()), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(count_queryset(self._query()), 3)
+
+    def test_save_invalidates_cached_count(self):
+        self.assertEqual(count_queryset(self._query()), 3)
+        add_individual_to_benefit_plan(self.service, create_individual(self.user.username), self.benefit_plan)
+        self.assertEqual(count_queryset(self._query()), 4)
+
+    def test_cache_disabled(self):
+        with mock.patch.object(SocialProtectionConfig, 'gql_total_count_cache_ttl', 0):
+            count_queryset(self._query())
+            with self.assertNumQueries(1):
+                count_queryset(self._query())
+
+    def test_small_results_are_counted_exactly_in_approximate_mode(self):
+        self.assertEqual(count_queryset(self._query(), COUNT_MODE_APPROXIMATE), 3)
+
+    @skipIf(connection.vendor != "postgresql", "Planner estimates are postgres specific.")
+    def test_planner_estimate_above_threshold(self):
+        with mock.patch.object(SocialProtectionConfig, 'gql_total_count_estimate_threshold', 0):
+            self.assertEqual(
+                count_queryset(self._query(), COUNT_MODE_APPROXIMATE),
+                estimate_count(self._query()),
+            )
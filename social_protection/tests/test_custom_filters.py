@@ -0,0 +1,81 @@
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.custom_filters import BenefitPlanCustomFilterWizard
+from social_protection.models import Beneficiary, GroupBeneficiary
+from social_protection.services import BeneficiaryService, GroupBeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_group_to_benefit_plan,
+    add_individual_to_benefit_plan,
+    add_individual_to_group,
+    create_benefit_plan,
+    create_group_with_individual,
+    create_individual,
+)
+
+GROUP_RELATION = 'group__groupindividuals__individual'
+
+
+class CustomFilterQueryCompilerTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.wizard = BenefitPlanCustomFilterWizard()
+
+        cls.individual_plan = create_benefit_plan(cls.user.username, {'code': 'CFIND', 'type': 'INDIVIDUAL'})
+        cls.group_plan = create_benefit_plan(cls.user.username, {'code': 'CFGRP', 'type': 'GROUP'})
+
+        beneficiary_service = BeneficiaryService(cls.user)
+        for number_of_children in (0, 1, 3):
+            individual = create_individual(cls.user.username, {
+                'json_ext': {'number_of_children': number_of_children, 'able_bodied': number_of_children < 3}
+            })
+            add_individual_to_benefit_plan(beneficiary_service, individual, cls.individual_plan)
+
+        # Members satisfy different filters: one is able bodied, the other one has children
+        _, cls.mixed_group, _ = create_group_with_individual(cls.user.username, individual_override={
+            'json_ext': {'number_of_children': 0, 'able_bodied': True}
+        })
+        add_individual_to_group(cls.user.username, create_individual(cls.user.username, {
+            'json_ext': {'number_of_children': 4, 'able_bodied': False}
+        }), cls.mixed_group, is_head=False)
+        _, cls.childless_group, _ = create_group_with_individual(cls.user.username, individual_override={
+            'json_ext': {'number_of_children': 0, 'able_bodied': True}
+        })
+        group_service = GroupBeneficiaryService(cls.user)
+        add_group_to_benefit_plan(group_service, cls.mixed_group, cls.group_plan)
+        add_group_to_benefit_plan(group_service, cls.childless_group, cls.group_plan)
+
+    def test_filters_without_relation(self):
+        query = Beneficiary.objects.filter(benefit_plan=self.individual_plan)
+        result = self.wizard.apply_filter_to_queryset(
+            ['number_of_children__gte__integer=1', 'able_bodied__exact__boolean=True'], query
+        )
+        self.assertEqual(result.count(), 1)
+        self.assertNotIn('DISTINCT', str(result.query))
+
+    def test_dict_filters(self):
+        query = Beneficiary.objects.filter(benefit_plan=self.individual_plan)
+        result = self.wizard.apply_filter_to_queryset(
+            [{'field': 'number_of_children', 'filter': 'lt', 'value': '3', 'type': 'integer'}], query
+        )
+        self.assertEqual(result.count(), 2)
+
+    def test_filters_through_group_members_match_any_member(self):
+        query = GroupBeneficiary.objects.filter(benefit_plan=self.group_plan)
+        result = self.wizard.apply_filter_to_queryset(
+            ['number_of_children__gt__integer=2', 'able_bodied__exact__boolean=True'], query, GROUP_RELATION
+        )
+        self.assertEqual(list(result.values_list('group_id', flat=True)), [self.mixed_group.id])
+        self.assertNotIn('DISTINCT', str(result.query))
+
+    def test_single_filter_through_group_members_returns_each_group_once(self):
+        query = GroupBeneficiary.objects.filter(benefit_plan=self.group_plan)
+        result = self.wizard.apply_filter_to_queryset(
+            ['number_of_children__lt__integer=1'], query, GROUP_RELATION
+        )
+        self.assertEqual(
+            set(result.values_list('group_id', flat=True)), {self.mixed_group.id, self.childless_group.id}
+        )
+        self.assertEqual(result.count(), 2)
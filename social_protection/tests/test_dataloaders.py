@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from django.test import TestCase
+from promise import Promise
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.dataloaders import load_related
+from social_protection.models import Beneficiary
+from social_protection.services import BeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+)
+
+
+class BeneficiaryDataLoadersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'LOADERS'})
+        service = BeneficiaryService(cls.user)
+        cls.individuals = [create_individual(cls.user.username) for _ in range(3)]
+        for individual in cls.individuals:
+            add_individual_to_benefit_plan(service, individual, cls.benefit_plan)
+
+    def _info(self):
+        return SimpleNamespace(context=SimpleNamespace())
+
+    def test_relations_of_page_are_loaded_with_one_query_per_relation(self):
+        beneficiaries = list(Beneficiary.objects.filter(benefit_plan=self.benefit_plan))
+        info = self._info()
+        with self.assertNumQueries(2):
+            individuals = Promise.all([load_related(b, 'individual', info) for b in beneficiaries]).get()
+            benefit_plans = Promise.all([load_related(b, 'benefit_plan', info) for b in beneficiaries]).get()
+        self.assertEqual({i.id for i in individuals}, {i.id for i in self.individuals})
+        self.assertEqual({plan.id for plan in benefit_plans}, {self.benefit_plan.id})
+
+    def test_joined_relation_is_returned_without_query(self):
+        beneficiary = Beneficiary.objects.select_related('individual').filter(benefit_plan=self.benefit_plan).first()
+        with self.assertNumQueries(0):
+            self.assertEqual(load_related(beneficiary, 'individual', self._info()), beneficiary.individual)
+
+    def test_empty_relation_resolves_to_none(self):
+        beneficiary = Beneficiary.objects.filter(benefit_plan=self.benefit_plan).first()
+        with self.assertNumQueries(0):
+            self.assertIsNone(load_related(beneficiary, 'project', self._info()))
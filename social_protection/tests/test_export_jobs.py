@@ -0,0 +1,92 @@
+import io
+from unittest import mock
+
+import pandas as pd
+from django.core.files.storage import default_storage
+from django.test import TestCase
+
+from core.models import ExportableQueryModel
+from core.test_helpers import create_test_interactive_user
+from social_protection.apps import SocialProtectionConfig
+from social_protection.export_jobs import get_json_ext_keys, iterate_export_chunks, run_export_job
+from social_protection.models import Beneficiary, BeneficiaryExportJob
+from social_protection.schema import Query
+from social_protection.services import BeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+)
+
+
+class BeneficiaryExportJobTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'EXPORTS'})
+        service = BeneficiaryService(cls.user)
+        for index in range(5):
+            individual = create_individual(cls.user.username, {
+                'first_name': f'Export{index}',
+                'json_ext': {'number_of_children': index, 'address': {'village': 'V1'}},
+            })
+            add_individual_to_benefit_plan(service, individual, cls.benefit_plan)
+
+    def _query(self):
+        return Beneficiary.objects.filter(benefit_plan=self.benefit_plan).order_by('individual__first_name')
+
+    def test_json_ext_keys(self):
+        keys = get_json_ext_keys(self._query())
+        self.assertIn('number_of_children', keys)
+        self.assertIn('address', keys)
+        self.assertEqual(get_json_ext_keys(self._query(), nested=True), ['address.village', 'number_of_children'])
+
+    def test_chunks_share_columns(self):
+        chunks = list(iterate_export_chunks(
+            self._query(), ['individual__first_name', 'json_ext'], {'individual__first_name': 'first_name'}, 2
+        ))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertTrue(all(list(chunk.columns) == list(chunks[0].columns) for chunk in chunks))
+        self.assertIn('first_name', chunks[0].columns)
+        self.assertNotIn('json_ext', chunks[0].columns)
+        self.assertEqual(chunks[0]['address'][0], '{"village": "V1"}')
+
+    def test_run_export_job(self):
+        job = BeneficiaryExportJob(user=self.user, export_type=BeneficiaryExportJob.ExportType.BENEFICIARY)
+        job.save()
+        run_export_job(job.id, self._query(), ['individual__first_name', 'json_ext'], {})
+        job.refresh_from_db()
+        self.assertEqual(job.status, BeneficiaryExportJob.Status.COMPLETED, job.error)
+        self.assertEqual((job.processed_rows, job.total_rows), (5, 5))
+        with default_storage.open(job.file_name, 'rb') as export_file:
+            content = pd.read_csv(io.BytesIO(export_file.read()))
+        default_storage.delete(job.file_name)
+        self.assertEqual(list(content['individual__first_name']), [f'Export{index}' for index in range(5)])
+        self.assertEqual(list(content['number_of_children']), list(range(5)))
+
+    @mock.patch.object(SocialProtectionConfig, 'export_chunk_size', 2)
+    def test_run_export_job_matches_sync_export(self):
+        fields = ['individual__first_name', 'status', 'json_ext']
+        column_names = {'individual__first_name': 'first_name', 'number_of_children': 'children'}
+        patches = Query.get_patches_for_field('beneficiary')
+
+        sync_export = ExportableQueryModel.create_csv_export(
+            self._query(), fields, self.user, column_names=column_names, patches=patches
+        )
+        with sync_export.content.open('rb') as export_file:
+            sync_content = pd.read_csv(export_file)
+        # Index of the DataFrame written by the synchronous export
+        sync_content = sync_content.loc[:, ~sync_content.columns.str.startswith('Unnamed')]
+
+        job = BeneficiaryExportJob(user=self.user, export_type=BeneficiaryExportJob.ExportType.BENEFICIARY)
+        job.save()
+        run_export_job(job.id, self._query(), fields, column_names, patches)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BeneficiaryExportJob.Status.COMPLETED, job.error)
+        with default_storage.open(job.file_name, 'rb') as export_file:
+            content = pd.read_csv(io.BytesIO(export_file.read()))
+        default_storage.delete(job.file_name)
+
+        self.assertIn('address.village', content.columns)
+        pd.testing.assert_frame_equal(content, sync_content)
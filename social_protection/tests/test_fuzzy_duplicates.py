@@ -0,0 +1,95 @@
+import uuid
+
+import pandas as pd
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.fuzzy_duplicates import blocking_keys, find_fuzzy_duplicates, normalize_name, soundex
+from social_protection.models import Beneficiary, GroupBeneficiary
+from social_protection.services import BeneficiaryService, GroupBeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_group_to_benefit_plan,
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_group_with_individual,
+    create_individual,
+)
+
+
+class FuzzyDuplicatesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'FUZZY'})
+        individual = create_individual(cls.user.username, {
+            'first_name': 'Jeanne', 'last_name': 'Niyonzima', 'dob': '1990-05-01',
+        })
+        add_individual_to_benefit_plan(BeneficiaryService(cls.user), individual, cls.benefit_plan)
+        cls.beneficiary = Beneficiary.objects.get(benefit_plan=cls.benefit_plan)
+
+    def _upload(self, rows):
+        return pd.DataFrame([
+            {'id': str(index), 'first_name': first_name, 'last_name': last_name, 'dob': dob}
+            for index, (first_name, last_name, dob) in enumerate(rows)
+        ])
+
+    def test_soundex(self):
+        self.assertEqual(soundex('robert'), soundex('rupert'))
+        self.assertEqual(soundex('ashcraft'), 'A261')
+        self.assertEqual(soundex(normalize_name('Niyonsima')), soundex(normalize_name('NIYONZIMA')))
+        self.assertEqual(blocking_keys('', '', '', ''), [])
+
+    def test_existing_beneficiary_flagged(self):
+        duplicates = find_fuzzy_duplicates(self._upload([
+            ('Jeane', 'Niyonsima', '1990-05-01'),
+            ('Jeanne', 'Niyonzima', '1991-05-01'),
+            ('Pierre', 'Ndayishimiye', '1990-05-01'),
+        ]), self.benefit_plan)
+
+        self.assertEqual(set(duplicates), {'0'})
+        self.assertEqual(duplicates['0']['duplicate_of'], str(self.beneficiary.id))
+        self.assertTrue(duplicates['0']['existing'])
+
+    def test_group_member_flagged_as_group_beneficiary(self):
+        benefit_plan = create_benefit_plan(self.user.username, {'code': 'FUZZYGRP', 'type': 'GROUP'})
+        _, group, _ = create_group_with_individual(self.user.username, individual_override={
+            'first_name': 'Claudine', 'last_name': 'Uwimana', 'dob': '1985-03-12',
+        })
+        add_group_to_benefit_plan(GroupBeneficiaryService(self.user), group, benefit_plan)
+        group_beneficiary = GroupBeneficiary.objects.get(benefit_plan=benefit_plan)
+
+        duplicates = find_fuzzy_duplicates(self._upload([
+            ('Claudine', 'Uwimanna', '1985-03-12'),
+            ('Jeanne', 'Niyonzima', '1990-05-01'),
+        ]), benefit_plan)
+
+        self.assertEqual(set(duplicates), {'0'})
+        self.assertEqual(duplicates['0']['duplicate_of'], str(group_beneficiary.id))
+        self.assertTrue(duplicates['0']['existing'])
+
+    def test_updated_beneficiary_not_flagged(self):
+        upload = self._upload([
+            ('Jeanne', 'Niyonzima', '1990-05-01'),
+            ('Jeane', 'Niyonsima', '1990-05-01'),
+        ])
+        upload['ID'] = [str(self.beneficiary.id), str(uuid.uuid4())]
+        duplicates = find_fuzzy_duplicates(upload, self.benefit_plan)
+
+        self.assertEqual(set(duplicates), {'1'})
+        self.assertEqual(duplicates['1']['duplicate_of'], str(self.beneficiary.id))
+
+    def test_duplicates_within_upload_flagged_once(self):
+        duplicates = find_fuzzy_duplicates(self._upload([
+            ('Eric', 'Hakizimana', '1985-01-01'),
+            ('Erik', 'Hakizimana', '1985-01-01'),
+            ('Eric', 'Hakizimana', '1985-01-02'),
+        ]), self.benefit_plan)
+
+        self.assertEqual(duplicates, {'1': {'duplicate_of': '0', 'existing': False, 'similarity': 0.933}})
+
+    def test_block_size_bounded(self):
+        rows = [('Eric', 'Hakizimana', '1985-01-01')] * 5
+        duplicates = find_fuzzy_duplicates(self._upload(rows), self.benefit_plan, max_block_size=2)
+        self.assertEqual(set(duplicates), {'1', '2', '3', '4'})
+        self.assertEqual({duplicate['duplicate_of'] for duplicate in duplicates.values()}, {'0'})
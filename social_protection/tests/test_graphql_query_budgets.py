@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.test_helpers import create_test_interactive_user
+from location.test_helpers import create_test_village
+from social_protection.benchmarks.graphql_queries import (
+    QUERY_CATALOGUE,
+    execute_catalogue_query,
+    get_schema,
+    run_graphql_benchmark,
+    seed_graphql_dataset,
+)
+
+
+class GraphQLQueryBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        villages = [
+            create_test_village({'code': 'GQBV1', 'name': 'Budget Village 1'}),
+            create_test_village({'code': 'GQBV2', 'name': 'Budget Village 2'}),
+        ]
+        cls.variables = seed_graphql_dataset(cls.user, villages, individuals=40, group_size=4, projects=2)
+        cls.schema = get_schema()
+
+    def _count_queries(self, benchmark_query, page_size):
+        variables = {**self.variables, 'first': page_size}
+        # Warm-up, e.g. rights of the user are cached by the first execution
+        execute_catalogue_query(self.schema, self.user, benchmark_query, variables)
+        with CaptureQueriesContext(connection) as captured:
+            response = execute_catalogue_query(self.schema, self.user, benchmark_query, variables)
+        self.assertFalse(response.errors, response.errors)
+        return len(captured)
+
+    def test_queries_within_budget(self):
+        for benchmark_query in QUERY_CATALOGUE:
+            with self.subTest(query=benchmark_query.name):
+                self.assertLessEqual(self._count_queries(benchmark_query, 20), benchmark_query.max_queries)
+
+    def test_query_count_independent_of_page_size(self):
+        for benchmark_query in QUERY_CATALOGUE:
+            with self.subTest(query=benchmark_query.name):
+                self.assertEqual(
+                    self._count_queries(benchmark_query, 2),
+                    self._count_queries(benchmark_query, 20),
+                )
+
+    def test_benchmark_reports_latency_percentiles(self):
+        results = run_graphql_benchmark(self.user, self.variables, iterations=3, catalogue=QUERY_CATALOGUE[:2])
+
+        self.assertEqual([result['name'] for result in results], [query.name for query in QUERY_CATALOGUE[:2]])
+        for result in results:
+            self.assertEqual(result['errors'], [])
+            self.assertTrue(result['within_budget'])
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
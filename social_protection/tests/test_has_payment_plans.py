@@ -0,0 +1,42 @@
+import uuid
+
+from django.test import TestCase
+
+from contribution_plan.models import PaymentPlan
+from core.test_helpers import create_test_interactive_user
+from social_protection.gql_queries import BenefitPlanGQLType, annotate_has_payment_plans
+from social_protection.models import BenefitPlan
+from social_protection.tests.test_helpers import create_benefit_plan
+
+
+class HasPaymentPlansAnnotationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        benefit_plans = [
+            create_benefit_plan(cls.user.username, {'code': f'HPP{index}', 'name': f'Payment plans {index}'})
+            for index in range(3)
+        ]
+        PaymentPlan(
+            code='HPP-PAYMENT',
+            name='Payment plan of HPP0',
+            benefit_plan=benefit_plans[0],
+            calculation=uuid.uuid4(),
+            periodicity=1,
+            json_ext={},
+        ).save(username=cls.user.username)
+
+    def test_page_resolves_with_single_query(self):
+        with self.assertNumQueries(1):
+            benefit_plans = list(annotate_has_payment_plans(
+                BenefitPlan.objects.filter(code__startswith='HPP').order_by('code')
+            ))
+            resolved = [BenefitPlanGQLType.resolve_has_payment_plans(plan, None) for plan in benefit_plans]
+        self.assertEqual(resolved, [True, False, False])
+
+    def test_history_records_are_annotated(self):
+        history = list(annotate_has_payment_plans(BenefitPlan.history.filter(code__startswith='HPP')))
+        self.assertTrue(history)
+        resolved = dict(sorted((record.code, record.payment_plans_exist) for record in history))
+        self.assertEqual(list(resolved.values()), [True, False, False])
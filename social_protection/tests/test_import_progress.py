@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from core.test_helpers import LogInHelper
+from individual.models import IndividualDataSourceUpload
+from social_protection.apps import SocialProtectionConfig
+from social_protection.import_progress import (
+    STAGE_FAILED,
+    STAGE_FINISHED,
+    STAGE_QUEUED,
+    get_stage_timings,
+    get_upload_stage,
+    get_upload_status,
+    track_import_stage,
+)
+from social_protection.services import BeneficiaryImportService
+from social_protection.tests.test_helpers import create_benefit_plan
+
+
+class FakeWorkflow:
+    name = 'Fake Beneficiaries Upload'
+
+    def __init__(self, result=None):
+        self.result = result or {'success': True}
+        self.payloads = []
+
+    def run(self, payload):
+        self.payloads.append(payload)
+        return self.result
+
+
+class ImportProgressTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = LogInHelper().get_or_create_user_api()
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'ASYNC'})
+
+    def _import_file(self):
+        return SimpleUploadedFile(
+            'beneficiaries.csv', b'first_name,last_name,dob\nJohn,Doe,1990-01-01\nJane,Doe,1991-01-01\n',
+            content_type='text/csv',
+        )
+
+    def _import(self, workflow, run_async):
+        return BeneficiaryImportService(self.user).import_beneficiaries(
+            self._import_file(), self.benefit_plan, workflow, None, run_async=run_async
+        )
+
+    @mock.patch.object(SocialProtectionConfig, 'enable_background_jobs', False)
+    def test_async_import_returns_before_workflow(self):
+        workflow = FakeWorkflow()
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = self._import(workflow, run_async=True)
+            upload = IndividualDataSourceUpload.objects.get(uuid=result['data']['upload_uuid'])
+            self.assertEqual(workflow.payloads, [])
+            self.assertEqual(get_upload_stage(upload), STAGE_QUEUED)
+
+        for callback in callbacks:
+            callback()
+        upload.refresh_from_db()
+        self.assertEqual(len(workflow.payloads), 1)
+        self.assertEqual(get_upload_stage(upload), STAGE_FINISHED)
+        self.assertEqual(upload.status, IndividualDataSourceUpload.Status.TRIGGERED)
+
+    def test_failed_workflow_sets_failed_stage(self):
+        result = self._import(FakeWorkflow({'success': False, 'message': 'Invalid schema'}), run_async=False)
+        upload = IndividualDataSourceUpload.objects.get(uuid=result['data']['upload_uuid'])
+        self.assertEqual(upload.status, IndividualDataSourceUpload.Status.FAIL)
+        self.assertEqual(get_upload_stage(upload), STAGE_FAILED)
+        # Timings recorded before the failure are kept
+        self.assertIn('save_data_sources', get_stage_timings(upload))
+        self.assertIn('workflow', get_stage_timings(upload))
+
+    def test_upload_status_progress(self):
+        result = self._import(FakeWorkflow(), run_async=False)
+        upload = IndividualDataSourceUpload.objects.get(uuid=result['data']['upload_uuid'])
+        IndividualDataSourceUpload.objects.filter(id=upload.id).update(json_ext={})
+        upload.refresh_from_db()
+
+        status = get_upload_status(upload)
+        self.assertEqual(status['total_rows'], 2)
+        self.assertEqual(status['imported_rows'], 0)
+        self.assertEqual(status['progress'], 0.0)
+
+    def test_stage_timings_recorded(self):
+        result = self._import(FakeWorkflow(), run_async=False)
+        upload = IndividualDataSourceUpload.objects.get(uuid=result['data']['upload_uuid'])
+        self.assertIn('workflow', get_stage_timings(upload))
+
+        for rows in (2, 3):
+            with track_import_stage(upload.id, 'custom_stage') as stage:
+                IndividualDataSourceUpload.objects.filter(id=upload.id).exists()
+                stage['rows'] = rows
+        with self.assertRaises(ValueError):
+            with track_import_stage(upload.id, 'failing_stage'):
+                raise ValueError('Invalid row')
+        upload.refresh_from_db()
+
+        timings = get_stage_timings(upload)
+        self.assertEqual(timings['custom_stage']['rows'], 5)
+        self.assertEqual(timings['custom_stage']['calls'], 2)
+        self.assertGreaterEqual(timings['custom_stage']['queries'], 2)
+        self.assertFalse(timings['custom_stage']['failed'])
+        self.assertTrue(timings['failing_stage']['failed'])
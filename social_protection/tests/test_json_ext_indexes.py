@@ -0,0 +1,71 @@
+from unittest import skipIf
+
+from django.db import connection
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.json_ext_indexes import (
+    GIN_INDEX_NAME,
+    build_index_definitions,
+    sync_json_ext_indexes,
+)
+from social_protection.tests.test_helpers import create_benefit_plan
+
+
+class BuildIndexDefinitionsTest(TestCase):
+
+    def test_definitions_follow_declared_types(self):
+        definitions = build_index_definitions([
+            {"properties": {"email": {"type": "string"}, "number_of_children": {"type": "integer"}}},
+            {"properties": {"number_of_children": {"type": "integer"}, "able_bodied": {"type": "boolean"}}},
+        ])
+        kinds = {(definition.field, definition.kind) for definition in definitions}
+        self.assertEqual(kinds, {
+            (None, 'gin'),
+            ('able_bodied', 'jsonb'),
+            ('email', 'jsonb'),
+            ('email', 'text'),
+            ('number_of_children', 'jsonb'),
+        })
+
+    def test_definitions_skip_empty_and_string_schemas(self):
+        definitions = build_index_definitions([None, {}, '{"properties": {"email": {"type": "string"}}}'])
+        self.assertEqual({definition.field for definition in definitions}, {None, 'email'})
+
+    def test_index_names_fit_postgres_limit(self):
+        definitions = build_index_definitions([{"properties": {"x" * 100: {"type": "string"}}}])
+        for definition in definitions:
+            self.assertLessEqual(len(definition.name), 63)
+
+
+@skipIf(connection.vendor != "postgresql", "Expression indexes are postgres specific.")
+class SyncJsonExtIndexesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="admin")
+
+    def _existing_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'social_protection_beneficiary'"
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_sync_creates_and_drops_indexes(self):
+        benefit_plan = create_benefit_plan(self.user.username, {
+            "code": "IDXPLAN",
+            "name": "Indexed plan",
+            "beneficiary_data_schema": {"properties": {"idx_test_field": {"type": "string"}}},
+        })
+        result = sync_json_ext_indexes(concurrently=False)
+        created = set(result['created'])
+        self.assertIn(GIN_INDEX_NAME, self._existing_indexes())
+        self.assertTrue(created <= self._existing_indexes())
+        self.assertTrue(any('idx_test_field' in name for name in created))
+
+        benefit_plan.beneficiary_data_schema = {"properties": {}}
+        benefit_plan.save(username=self.user.username)
+        result = sync_json_ext_indexes(concurrently=False)
+        self.assertTrue(any('idx_test_field' in name for name in result['dropped']))
+        self.assertFalse(any('idx_test_field' in name for name in self._existing_indexes()))
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.models import Beneficiary, BeneficiaryStatus, BenefitPlan, GroupBeneficiary
+from social_protection.opensearch_indexing import (
+    BENEFICIARY_INDEX,
+    GROUP_BENEFICIARY_INDEX,
+    BulkIndexer,
+    IndexingCheckpoint,
+    beneficiary_queryset,
+    beneficiary_source,
+    flatten_json_ext,
+    group_beneficiary_queryset,
+    group_beneficiary_source,
+    project_queryset,
+    project_source,
+)
+from social_protection.services import BeneficiaryService, GroupBeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_group_to_benefit_plan,
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_group_with_individual,
+    create_individual,
+    create_project,
+)
+
+
+class FakeOpenSearchClient:
+    """
+    Local stand-in for the bulk API, keeps indexed documents in memory.
+    """
+
+    def __init__(self, fail_ids=()):
+        self.documents = {}
+        self.requests = 0
+        self.fail_ids = set(fail_ids)
+        self.lock = threading.Lock()
+
+    def bulk(self, body, refresh='false'):
+        items = []
+        with self.lock:
+            self.requests += 1
+            for action, source in zip(body[::2], body[1::2]):
+                operation, meta = next(iter(action.items()))
+                if meta['_id'] in self.fail_ids:
+                    items.append({operation: {'_id': meta['_id'], 'status': 400, 'error': {'type': 'mapper'}}})
+                    continue
+                self.documents[(meta['_index'], meta['_id'])] = source
+                items.append({operation: {'_id': meta['_id'], 'status': 201}})
+        return {'errors': any('error' in next(iter(item.values())) for item in items), 'items': items}
+
+
+class BulkIndexerTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'OSINDEX'})
+        service = BeneficiaryService(cls.user)
+        for _ in range(5):
+            add_individual_to_benefit_plan(service, create_individual(cls.user.username), cls.benefit_plan)
+
+    def _queryset(self, since=None):
+        return beneficiary_queryset(since).filter(benefit_plan=self.benefit_plan)
+
+    def test_flatten_json_ext(self):
+        self.assertEqual(flatten_json_ext({'a': {'b': 1}, 'c': 2}), {'a__b': 1, 'c': 2})
+
+    def test_source_is_built_without_queries(self):
+        beneficiary = self._queryset().first()
+        with self.assertNumQueries(0):
+            source = beneficiary_source(beneficiary)
+        self.assertEqual(source['benefit_plan']['code'], 'OSINDEX')
+
+    def test_bulk_indexing_in_chunks(self):
+        client = FakeOpenSearchClient()
+        stats = BulkIndexer(client, BENEFICIARY_INDEX, beneficiary_source, chunk_size=2, workers=2) \
+            .run(self._queryset())
+        self.assertEqual(stats['indexed'], 5)
+        self.assertEqual(client.requests, 3)
+        self.assertEqual(len(client.documents), 5)
+
+    def test_failed_documents_are_counted(self):
+        failing_id = str(self._queryset().first().id)
+        stats = BulkIndexer(FakeOpenSearchClient(fail_ids=[failing_id]), BENEFICIARY_INDEX, beneficiary_source) \
+            .run(self._queryset())
+        self.assertEqual((stats['indexed'], stats['failed']), (4, 1))
+
+    def test_resume_from_checkpoint(self):
+        ids = list(self._queryset().order_by('id').values_list('id', flat=True))
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = IndexingCheckpoint(os.path.join(directory, 'checkpoint.json'))
+            checkpoint.save(ids[2])
+            client = FakeOpenSearchClient()
+            stats = BulkIndexer(client, BENEFICIARY_INDEX, beneficiary_source, checkpoint=checkpoint) \
+                .run(self._queryset(), resume=True)
+            self.assertEqual(stats['indexed'], 2)
+            self.assertEqual({key[1] for key in client.documents}, {str(i) for i in ids[3:]})
+            self.assertEqual(checkpoint.load(), {})
+
+    def test_since_filters_updated_beneficiaries(self):
+        newest = Beneficiary.objects.filter(benefit_plan=self.benefit_plan).order_by('-date_updated').first()
+        self.assertTrue(self._queryset(newest.date_updated).filter(id=newest.id).exists())
+
+
+class GroupAndProjectSourcesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {
+            'code': 'OSGROUP', 'type': BenefitPlan.BenefitPlanType.GROUP_TYPE,
+        })
+        cls.project = create_project('Indexed project', cls.benefit_plan, cls.user.username)
+        cls.village = cls.project.location
+        service = GroupBeneficiaryService(cls.user)
+        for first_name in ('Head1', 'Head2', 'Head3'):
+            _, group, _ = create_group_with_individual(
+                cls.user.username, {'location': cls.village}, {'first_name': first_name}
+            )
+            add_group_to_benefit_plan(service, group, cls.benefit_plan)
+        GroupBeneficiary.objects.filter(benefit_plan=cls.benefit_plan).update(project=cls.project)
+        GroupBeneficiary.objects \
+            .filter(benefit_plan=cls.benefit_plan, group__groupindividuals__individual__first_name='Head1') \
+            .update(status=BeneficiaryStatus.ACTIVE)
+
+    def test_group_beneficiary_source(self):
+        group_beneficiaries = list(group_beneficiary_queryset().filter(benefit_plan=self.benefit_plan))
+        with self.assertNumQueries(0):
+            sources = [group_beneficiary_source(group_beneficiary) for group_beneficiary in group_beneficiaries]
+
+        self.assertEqual(len(sources), 3)
+        source = next(source for source in sources if source['head']['first_name'] == 'Head1')
+        group = GroupBeneficiary.objects.get(id=source['id']).group
+        self.assertEqual(source['group']['code'], group.code)
+        self.assertEqual(source['location']['name'], self.village.name)
+        self.assertEqual(source['location']['path'][-1], self.village.name)
+        self.assertEqual(source['location']['path'][0], self.village.parent.parent.parent.name)
+
+    def test_project_source_enrollment_counts(self):
+        project = project_queryset().get(id=self.project.id)
+        with self.assertNumQueries(0):
+            source = project_source(project)
+
+        self.assertEqual(source['enrollment']['enrolled_groups'], 3)
+        self.assertEqual(source['enrollment']['active_groups'], 1)
+        self.assertEqual(source['enrollment']['enrolled_beneficiaries'], 0)
+        self.assertEqual(source['enrollment']['enrolled'], 3)
+        self.assertEqual(source['enrollment']['target'], 100)
+        self.assertEqual(source['location']['name'], self.village.name)
+
+    def test_bulk_indexing_of_groups(self):
+        client = FakeOpenSearchClient()
+        stats = BulkIndexer(client, GROUP_BENEFICIARY_INDEX, group_beneficiary_source, chunk_size=2) \
+            .run(group_beneficiary_queryset().filter(benefit_plan=self.benefit_plan))
+        self.assertEqual(stats['indexed'], 3)
+        self.assertEqual({key[0] for key in client.documents}, {GROUP_BENEFICIARY_INDEX})
@@ -0,0 +1,163 @@
+import uuid
+from unittest import mock
+
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.models import Beneficiary, BenefitPlan
+from social_protection.opensearch_indexing import BENEFICIARY_INDEX, GROUP_BENEFICIARY_INDEX, PROJECT_INDEX
+from social_protection.opensearch_sync import (
+    defer_beneficiaries,
+    defer_benefit_plan,
+    deferred_opensearch_sync,
+    flush_deferred_sync,
+    is_sync_deferred,
+    remember_indexed_benefit_plan,
+    sync_benefit_plan,
+)
+from social_protection.services import BeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+    create_project,
+)
+
+
+class FakeIndices:
+    def __init__(self):
+        self.refreshes = []
+
+    def refresh(self, index, **kwargs):
+        self.refreshes.append(index)
+
+
+class FakeOpenSearchClient:
+    """
+    Local stand-in for the bulk and update by query APIs.
+    """
+
+    def __init__(self):
+        self.bulk_requests = []
+        self.updates_by_query = []
+        self.indices = FakeIndices()
+
+    def bulk(self, body, refresh='false'):
+        self.bulk_requests.append(body)
+        items = []
+        lines = iter(body)
+        for action in lines:
+            operation, meta = next(iter(action.items()))
+            if operation == 'index':
+                # Skip the source line
+                next(lines)
+            items.append({operation: {'_id': meta['_id'], 'status': 200}})
+        return {'errors': False, 'items': items}
+
+    def update_by_query(self, index, body, **kwargs):
+        self.updates_by_query.append((index, body))
+
+
+class DeferredOpenSearchSyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'OSSYNC'})
+        service = BeneficiaryService(cls.user)
+        for _ in range(3):
+            add_individual_to_benefit_plan(service, create_individual(cls.user.username), cls.benefit_plan)
+        cls.beneficiaries = list(Beneficiary.objects.filter(benefit_plan=cls.benefit_plan))
+
+    def test_updates_flushed_once_after_outermost_block(self):
+        client = FakeOpenSearchClient()
+        with mock.patch('social_protection.opensearch_sync.get_opensearch_client', return_value=client):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with deferred_opensearch_sync():
+                    self.assertTrue(is_sync_deferred())
+                    defer_beneficiaries(self.beneficiaries[0])
+                    with deferred_opensearch_sync():
+                        defer_beneficiaries(Beneficiary.objects.filter(benefit_plan=self.benefit_plan))
+                    self.assertEqual(callbacks, [])
+                self.assertFalse(is_sync_deferred())
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(client.bulk_requests), 1)
+        indexed_ids = {action['index']['_id'] for action in client.bulk_requests[0][::2]}
+        self.assertEqual(indexed_ids, {str(beneficiary.id) for beneficiary in self.beneficiaries})
+        self.assertEqual(client.indices.refreshes, [BENEFICIARY_INDEX])
+
+    def test_nothing_scheduled_without_changes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with deferred_opensearch_sync():
+                pass
+        self.assertEqual(callbacks, [])
+
+    def test_flush_deletes_missing_beneficiaries(self):
+        client = FakeOpenSearchClient()
+        missing_id = str(uuid.uuid4())
+        stats = flush_deferred_sync({str(self.beneficiaries[0].id), missing_id}, {}, client=client)
+
+        self.assertEqual(stats['indexed'], 1)
+        self.assertEqual(stats['deleted'], 1)
+        self.assertIn({'delete': {'_index': BENEFICIARY_INDEX, '_id': missing_id}}, client.bulk_requests[0])
+        self.assertEqual(client.indices.refreshes, [BENEFICIARY_INDEX])
+
+    def test_flush_updates_benefit_plan_by_query(self):
+        client = FakeOpenSearchClient()
+        self.benefit_plan.name = 'Renamed plan'
+        with mock.patch('social_protection.opensearch_sync.get_opensearch_client', return_value=client):
+            with self.captureOnCommitCallbacks(execute=True):
+                with deferred_opensearch_sync():
+                    defer_benefit_plan(self.benefit_plan)
+
+        self.assertEqual(len(client.updates_by_query), 1)
+        self.assertEqual(client.bulk_requests, [])
+        index, body = client.updates_by_query[0]
+        # Group beneficiary documents embed the plan as well
+        self.assertEqual(index.split(','), [BENEFICIARY_INDEX, GROUP_BENEFICIARY_INDEX])
+        self.assertEqual(body['query'], {'term': {'benefit_plan.id': str(self.benefit_plan.id)}})
+        self.assertEqual(body['script']['params']['name'], 'Renamed plan')
+        self.assertEqual(client.indices.refreshes, [f'{BENEFICIARY_INDEX},{GROUP_BENEFICIARY_INDEX}'])
+
+    def test_saved_benefit_plan_updated_after_commit_only_when_changed(self):
+        client = FakeOpenSearchClient()
+        benefit_plan = BenefitPlan.objects.get(id=self.benefit_plan.id)
+        remember_indexed_benefit_plan(BenefitPlan, benefit_plan)
+        with mock.patch('social_protection.opensearch_sync.get_opensearch_client', return_value=client):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                sync_benefit_plan(benefit_plan)
+            self.assertEqual(callbacks, [])
+
+            benefit_plan.name = 'Renamed plan'
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                # Called by the beneficiary and the group beneficiary document
+                sync_benefit_plan(benefit_plan)
+                sync_benefit_plan(benefit_plan)
+                self.assertEqual(client.updates_by_query, [])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(client.updates_by_query), 1)
+        index, body = client.updates_by_query[0]
+        self.assertEqual(index.split(','), [BENEFICIARY_INDEX, GROUP_BENEFICIARY_INDEX])
+        self.assertEqual(body['script']['params']['name'], 'Renamed plan')
+        self.assertEqual(client.indices.refreshes, [])
+
+    def test_enrollment_reindexes_project_after_commit(self):
+        client = FakeOpenSearchClient()
+        project = create_project('OpenSearch enrollment', self.benefit_plan, self.user.username)
+        Beneficiary.objects.filter(benefit_plan=self.benefit_plan).update(status='ACTIVE')
+        with mock.patch('social_protection.opensearch_sync.get_opensearch_client', return_value=client):
+            with self.captureOnCommitCallbacks(execute=True):
+                BeneficiaryService(self.user).enroll_project({
+                    'project_id': str(project.id),
+                    'ids': [str(beneficiary.id) for beneficiary in self.beneficiaries],
+                })
+
+        project_requests = [
+            body for body in client.bulk_requests if body and body[0]['index']['_index'] == PROJECT_INDEX
+        ]
+        self.assertEqual(len(project_requests), 1)
+        action, source = project_requests[0]
+        self.assertEqual(action['index']['_id'], str(project.id))
+        self.assertEqual(source['enrollment']['enrolled_beneficiaries'], 3)
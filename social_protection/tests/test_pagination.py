@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from social_protection.apps import SocialProtectionConfig
+from social_protection.gql_queries import BeneficiaryGQLType
+from social_protection.models import Beneficiary
+from social_protection.pagination import (
+    CountingDjangoFilterConnectionField,
+    KeysetDjangoFilterConnectionField,
+    build_keyset_condition,
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    get_keyset_ordering,
+)
+from social_protection.services import BeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+)
+
+
+class KeysetHelpersTest(TestCase):
+
+    def test_cursor_round_trip(self):
+        cursor = encode_keyset_cursor(['Doe', '2b0b4ad2-4d7f-4a4e-9d0e-1c2b2c1f7a11'])
+        self.assertEqual(decode_keyset_cursor(cursor), ['Doe', '2b0b4ad2-4d7f-4a4e-9d0e-1c2b2c1f7a11'])
+
+    def test_offset_cursor_is_not_keyset_cursor(self):
+        self.assertIsNone(decode_keyset_cursor('YXJyYXljb25uZWN0aW9uOjk='))
+
+    def test_ordering_gets_id_tie_breaker(self):
+        query = Beneficiary.objects.order_by('-individual__last_name')
+        self.assertEqual(get_keyset_ordering(query), [('individual__last_name', True), ('id', True)])
+
+    def test_unsupported_ordering(self):
+        self.assertIsNone(get_keyset_ordering(Beneficiary.objects.order_by('json_ext')))
+
+    def test_condition_follows_directions(self):
+        condition = build_keyset_condition([('status', False), ('id', True)], ['ACTIVE', 'x'])
+        self.assertIn("('status__gt', 'ACTIVE')", str(condition))
+        self.assertIn("('id__lt', 'x')", str(condition))
+
+
+class KeysetConnectionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'KEYSET'})
+        service = BeneficiaryService(cls.user)
+        for index in range(5):
+            individual = create_individual(cls.user.username, {'last_name': f'Keyset{index % 2}'})
+            add_individual_to_benefit_plan(service, individual, cls.benefit_plan)
+
+    def _page(self, **args):
+        query = Beneficiary.objects.filter(benefit_plan=self.benefit_plan).order_by('individual__last_name')
+        return KeysetDjangoFilterConnectionField.resolve_connection(
+            BeneficiaryGQLType._meta.connection, {'keyset': True, **args}, query
+        )
+
+    def test_pages_cover_all_rows_once(self):
+        seen = []
+        after = None
+        while True:
+            page = self._page(first=2, after=after)
+            seen.extend(edge.node.id for edge in page.edges)
+            self.assertEqual(page.length, 5)
+            if not page.page_info.has_next_page:
+                break
+            after = page.page_info.end_cursor
+        expected = Beneficiary.objects.filter(benefit_plan=self.benefit_plan) \
+            .order_by('individual__last_name', 'id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_backward_page(self):
+        first_page = self._page(first=4)
+        previous = self._page(last=2, before=first_page.page_info.end_cursor)
+        self.assertEqual(
+            [edge.node.id for edge in previous.edges],
+            [edge.node.id for edge in first_page.edges][1:3],
+        )
+
+
+@mock.patch.object(SocialProtectionConfig, 'gql_total_count_mode', 'APPROXIMATE')
+@mock.patch.object(SocialProtectionConfig, 'gql_total_count_estimate_threshold', 0)
+@mock.patch('social_protection.counting.estimate_count', lambda queryset: 2)
+class ApproximateCountConnectionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {'code': 'APPROX'})
+        service = BeneficiaryService(cls.user)
+        for _ in range(5):
+            add_individual_to_benefit_plan(service, create_individual(cls.user.username), cls.benefit_plan)
+
+    def setUp(self):
+        cache.clear()
+
+    def _page(self, **args):
+        return CountingDjangoFilterConnectionField.resolve_connection(
+            BeneficiaryGQLType._meta.connection, args, self._query()
+        )
+
+    def _query(self):
+        return Beneficiary.objects.filter(benefit_plan=self.benefit_plan).order_by('id')
+
+    def _ids(self, page):
+        return [edge.node.id for edge in page.edges]
+
+    def test_estimate_from_config_default_does_not_cut_off_page(self):
+        page = self._page(first=3)
+        self.assertEqual(page.length, 2)
+        self.assertEqual(self._ids(page), list(self._query().values_list('id', flat=True)[:3]))
+
+    def test_next_page_detected_from_extra_row(self):
+        page = self._page(first=3)
+        self.assertTrue(page.page_info.has_next_page)
+        next_page = self._page(first=3, after=page.page_info.end_cursor)
+        self.assertEqual(self._ids(next_page), list(self._query().values_list('id', flat=True)[3:]))
+        self.assertFalse(next_page.page_info.has_next_page)
+        self.assertEqual(next_page.length, 2)
+
+    def test_last_page_sliced_from_real_count(self):
+        page = self._page(last=2)
+        self.assertEqual(self._ids(page), list(self._query().values_list('id', flat=True)[3:]))
@@ -0,0 +1,76 @@
+import importlib.util
+import io
+from unittest import skipIf
+
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from core.test_helpers import LogInHelper
+from individual.models import IndividualDataSource
+from social_protection.parquet import ParquetExportWriter, iter_parquet_dataframes
+from social_protection.services import BeneficiaryImportService
+
+PYARROW_MISSING = importlib.util.find_spec('pyarrow') is None
+
+
+@skipIf(PYARROW_MISSING, "pyarrow is not installed.")
+class ParquetExportWriterTest(TestCase):
+
+    def _write(self, chunks, column_types):
+        buffer = io.BytesIO()
+        writer = ParquetExportWriter(buffer, column_types)
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.close()
+        buffer.seek(0)
+        return buffer
+
+    def test_schema_fields_are_typed(self):
+        buffer = self._write([
+            pd.DataFrame({'first_name': ['A', 'B'], 'number_of_children': ['1', 'x'], 'able_bodied': ['true', None]}),
+            pd.DataFrame({'first_name': ['C'], 'number_of_children': [3], 'able_bodied': [False]}),
+        ], {'number_of_children': 'integer', 'able_bodied': 'boolean'})
+
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(buffer)
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        self.assertEqual(str(parquet_file.schema_arrow.field('number_of_children').type), 'int64')
+        self.assertEqual(str(parquet_file.schema_arrow.field('able_bodied').type), 'bool')
+
+        content = parquet_file.read().to_pydict()
+        self.assertEqual(content['number_of_children'], [1, None, 3])
+        self.assertEqual(content['able_bodied'], [True, None, False])
+
+    def test_read_in_batches(self):
+        buffer = self._write([pd.DataFrame({'value': list(range(5))})], {})
+        batches = list(iter_parquet_dataframes(buffer, 2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+
+@skipIf(PYARROW_MISSING, "pyarrow is not installed.")
+class ParquetImportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = LogInHelper().get_or_create_user_api()
+
+    def test_parquet_upload_is_saved_in_chunks(self):
+        buffer = io.BytesIO()
+        pd.DataFrame({'first_name': ['A', 'B', 'C'], 'number_of_children': [0, 1, 2]}).to_parquet(buffer)
+        import_file = SimpleUploadedFile('beneficiaries.parquet', buffer.getvalue(), 'application/octet-stream')
+
+        upload = BeneficiaryImportService(self.user)._save_sources(import_file)
+        sources = IndividualDataSource.objects.filter(upload=upload)
+        self.assertEqual(sources.count(), 3)
+        self.assertEqual(
+            sorted(source.json_ext['number_of_children'] for source in sources), [0, 1, 2]
+        )
+
+    def test_empty_parquet_upload_is_rejected(self):
+        buffer = io.BytesIO()
+        pd.DataFrame({'first_name': pd.Series([], dtype=str)}).to_parquet(buffer)
+        import_file = SimpleUploadedFile('beneficiaries.parquet', buffer.getvalue(), 'application/octet-stream')
+
+        with self.assertRaisesMessage(ValueError, "Import file is empty"):
+            BeneficiaryImportService(self.user)._save_sources(import_file)
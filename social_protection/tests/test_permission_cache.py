@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+
+from social_protection.gql_queries import BenefitPlanGQLType, JsonExtMixin
+
+
+class PermissionCacheTest(TestCase):
+
+    def _info(self, allowed=True):
+        user = mock.Mock(id=1, has_perms=mock.Mock(return_value=allowed))
+        return SimpleNamespace(context=SimpleNamespace(user=user))
+
+    def test_permissions_evaluated_once_per_request(self):
+        info = self._info()
+        rows = [SimpleNamespace(json_ext={'row': index}, beneficiary_data_schema={}) for index in range(10)]
+
+        resolved = [JsonExtMixin.resolve_json_ext(row, info) for row in rows]
+        for row in rows:
+            BenefitPlanGQLType.resolve_beneficiary_data_schema(row, info)
+
+        self.assertEqual(resolved, [{'row': index} for index in range(10)])
+        info.context.user.has_perms.assert_called_once()
+
+    def test_denied_permissions_cached_per_request(self):
+        info = self._info(allowed=False)
+        self.assertIsNone(JsonExtMixin.resolve_json_ext(SimpleNamespace(json_ext={'row': 1}), info))
+        self.assertIsNone(JsonExtMixin.resolve_json_ext(SimpleNamespace(json_ext={'row': 2}), info))
+        info.context.user.has_perms.assert_called_once()
+
+        # A new request evaluates the permissions again
+        next_request = SimpleNamespace(context=SimpleNamespace(user=info.context.user))
+        JsonExtMixin.resolve_json_ext(SimpleNamespace(json_ext={}), next_request)
+        self.assertEqual(info.context.user.has_perms.call_count, 2)
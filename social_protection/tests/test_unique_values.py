@@ -0,0 +1,97 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from core.test_helpers import create_test_interactive_user
+from individual.models import IndividualDataSource, IndividualDataSourceUpload
+from social_protection.models import Beneficiary, BeneficiaryUniqueValue
+from social_protection.services import BeneficiaryService
+from social_protection.tests.test_helpers import (
+    add_individual_to_benefit_plan,
+    create_benefit_plan,
+    create_individual,
+)
+from social_protection.unique_values import (
+    deferred_unique_value_index,
+    find_existing_unique_values,
+    index_created_beneficiaries,
+    rebuild_unique_value_index,
+)
+
+
+class UniqueValueIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username='admin')
+        cls.benefit_plan = create_benefit_plan(cls.user.username, {
+            'code': 'UNIQUE',
+            'beneficiary_data_schema': {
+                'properties': {
+                    'national_id': {'type': 'string', 'uniqueness': True},
+                    'email': {'type': 'string'},
+                }
+            },
+        })
+        service = BeneficiaryService(cls.user)
+        cls.beneficiary_ids = {}
+        for national_id in ('ID-1', 'ID-2'):
+            individual = create_individual(cls.user.username, {'json_ext': {'national_id': national_id}})
+            cls.beneficiary_ids[national_id] = add_individual_to_benefit_plan(service, individual, cls.benefit_plan)
+
+        cls.upload = IndividualDataSourceUpload(source_name='csv', source_type='upload', status='PENDING')
+        cls.upload.save(user=cls.user)
+        cls.data_sources = {}
+        for national_id in (' id-1 ', 'ID-3', 'ID-3'):
+            data_source = IndividualDataSource(upload=cls.upload, json_ext={'national_id': national_id})
+            data_source.save(user=cls.user)
+            cls.data_sources.setdefault(national_id, data_source)
+        # Update of the beneficiary already using the value
+        IndividualDataSource(
+            upload=cls.upload, json_ext={'national_id': 'ID-2', 'ID': str(cls.beneficiary_ids['ID-2']).upper()}
+        ).save(user=cls.user)
+
+    def _indexed_values(self):
+        return BeneficiaryUniqueValue.objects.filter(benefit_plan_id=self.benefit_plan.id, field='national_id')
+
+    def test_index_maintained_on_save(self):
+        self.assertEqual(self._indexed_values().count(), 2)
+
+        beneficiary = Beneficiary.objects.filter(benefit_plan=self.benefit_plan).first()
+        beneficiary.json_ext = {**beneficiary.json_ext, 'national_id': 'ID-3'}
+        beneficiary.save(username=self.user.username)
+        self.assertIn(str(self.data_sources['ID-3'].id), self._existing()['national_id'])
+
+        beneficiary.delete(username=self.user.username)
+        self.assertEqual(self._indexed_values().count(), 1)
+
+    def test_plan_without_unique_fields_not_indexed_on_save(self):
+        benefit_plan = create_benefit_plan(self.user.username, {'code': 'NOUNIQUE'})
+        individual = create_individual(self.user.username, {'json_ext': {'national_id': 'ID-5'}})
+        with patch('social_protection.unique_values._unique_value_rows') as unique_value_rows:
+            add_individual_to_benefit_plan(BeneficiaryService(self.user), individual, benefit_plan)
+        unique_value_rows.assert_not_called()
+
+    def test_upload_checked_against_existing_beneficiaries(self):
+        existing = self._existing()
+        self.assertEqual(existing, {'national_id': {str(self.data_sources[' id-1 '].id)}})
+
+    def test_index_deferred_in_bulk(self):
+        beneficiary = Beneficiary.objects.get(id=self.beneficiary_ids['ID-1'])
+        beneficiary.json_ext = {**beneficiary.json_ext, 'national_id': 'ID-4'}
+        with deferred_unique_value_index():
+            beneficiary.save(username=self.user.username)
+        self.assertIn(str(self.data_sources[' id-1 '].id), self._existing()['national_id'])
+
+        index_created_beneficiaries(Beneficiary, Beneficiary.objects.filter(id=beneficiary.id))
+        self.assertEqual(self._existing(), {'national_id': set()})
+
+    def test_rebuild_matches_incremental_updates(self):
+        incremental = set(self._indexed_values().values_list('beneficiary_id', 'value_hash'))
+        self._indexed_values().delete()
+        rebuild_unique_value_index([self.benefit_plan.id])
+        self.assertEqual(set(self._indexed_values().values_list('beneficiary_id', 'value_hash')), incremental)
+
+    def _existing(self):
+        with self.assertNumQueries(1):
+            return find_existing_unique_values(self.benefit_plan, self.upload.id, ['national_id'])
@@ -0,0 +1,115 @@
+import pandas as pd
+from django.test import SimpleTestCase
+
+from social_protection.services import BeneficiaryImportService
+from social_protection.validation_rules import ValidationMemo, calculate_column
+
+
+class LegacyCalculation:
+
+    def __init__(self):
+        self.calls = []
+
+    def calculate_if_active_for_object(self, class_name, calculation_uuid, field_name=None, field_value=None):
+        self.calls.append(field_value)
+        return {'success': '@' in str(field_value), 'field_name': field_name}
+
+
+class BatchCalculation(LegacyCalculation):
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def calculate_batch_if_active_for_object(self, class_name, calculation_uuid, field_name=None, field_values=None):
+        self.batches.append(field_values)
+        return [{'success': '@' in str(value), 'field_name': field_name} for value in field_values]
+
+
+class ValidationRulesTest(SimpleTestCase):
+    values = ['a@example.com', 'invalid', 'b@example.com']
+
+    def test_legacy_calculation_called_per_value(self):
+        calculation = LegacyCalculation()
+        results = calculate_column(calculation, 'uuid', 'EmailValidationStrategy', 'email', self.values)
+
+        self.assertEqual([result['success'] for result in results], [True, False, True])
+        self.assertEqual(calculation.calls, self.values)
+
+    def test_batch_calculation_called_once(self):
+        calculation = BatchCalculation()
+        results = calculate_column(calculation, 'uuid', 'EmailValidationStrategy', 'email', self.values)
+
+        self.assertEqual([result['success'] for result in results], [True, False, True])
+        self.assertEqual(calculation.batches, [self.values])
+        self.assertEqual(calculation.calls, [])
+
+    def test_batch_result_length_checked(self):
+        calculation = BatchCalculation()
+        calculation.calculate_batch_if_active_for_object = lambda *args, **kwargs: []
+        with self.assertRaises(ValueError):
+            calculate_column(calculation, 'uuid', 'EmailValidationStrategy', 'email', self.values)
+
+    def test_process_chunk_validates_columns(self):
+        chunk = pd.DataFrame({'email': self.values, 'national_id': ['1', '2', '1']})
+        properties = {
+            'email': {'type': 'string', 'validationCalculation': {'name': 'EmailValidationStrategy'}},
+            'national_id': {'type': 'string', 'uniqueness': True},
+        }
+        unique_validations = {'national_id': chunk['national_id'].duplicated(keep=False)}
+        calculation = BatchCalculation()
+
+        validated = BeneficiaryImportService.process_chunk(
+            chunk, properties, unique_validations, calculation, 'uuid'
+        )
+
+        self.assertEqual(len(calculation.batches), 1)
+        self.assertEqual([row['validations']['email']['success'] for row in validated], [True, False, True])
+        self.assertEqual(
+            [row['validations']['national_id_uniqueness']['success'] for row in validated], [False, True, False]
+        )
+        self.assertEqual(validated[1]['row'], {'email': 'invalid', 'national_id': '2'})
+
+    def test_process_chunk_uses_compiled_validation_rules(self):
+        chunk = pd.DataFrame({'email': self.values})
+        calculation = BatchCalculation()
+
+        validated = BeneficiaryImportService.process_chunk(
+            chunk, {'email': {'type': 'string'}}, {}, calculation, 'uuid',
+            validation_rules={'email': 'EmailValidationStrategy'},
+        )
+
+        self.assertEqual([row['validations']['email']['success'] for row in validated], [True, False, True])
+
+    def test_memo_validates_distinct_values_once(self):
+        calculation = LegacyCalculation()
+        memo = ValidationMemo(10)
+        values = ['a@example.com', 'invalid', 'a@example.com', float('nan'), float('nan'), 'invalid']
+
+        results = calculate_column(calculation, 'uuid', 'EmailValidationStrategy', 'email', values, memo)
+
+        self.assertEqual([result['success'] for result in results], [True, False, True, False, False, False])
+        self.assertEqual(len(calculation.calls), 3)
+
+        calculate_column(calculation, 'uuid', 'EmailValidationStrategy', 'email', ['invalid'], memo)
+        self.assertEqual(len(calculation.calls), 3)
+        self.assertEqual(memo.hits, 1)
+
+    def test_memo_is_bounded(self):
+        calculation = BatchCalculation()
+        memo = ValidationMemo(2)
+
+        results = calculate_column(calculation, 'uuid', 'EmailValidationStrategy', 'email', self.values * 2, memo)
+
+        self.assertEqual([result['success'] for result in results], [True, False, True] * 2)
+        self.assertEqual(calculation.batches, [self.values])
+        self.assertEqual(len(memo), 2)
+
+    def test_memo_skips_excluded_rules(self):
+        calculation = LegacyCalculation()
+        memo = ValidationMemo(10, excluded_rules=['RowDependentStrategy'])
+
+        calculate_column(calculation, 'uuid', 'RowDependentStrategy', 'email', self.values * 2, memo)
+
+        self.assertEqual(len(calculation.calls), 6)
+        self.assertEqual(len(memo), 0)
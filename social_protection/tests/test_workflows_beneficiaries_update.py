@@ -6,6 +6,7 @@ from individual.models import (
     IndividualDataSource,
     IndividualDataSourceUpload,
 )
+from social_protection.import_progress import get_update_summary
 from social_protection.models import BenefitPlanDataUploadRecords, Beneficiary, BeneficiaryStatus
 from social_protection.services import BeneficiaryService
 from social_protection.workflows.base_beneficiary_update import process_update_beneficiaries_workflow
@@ -240,3 +241,122 @@ class ProcessUpdateBeneficiariesWorkflowTest(TestCase):
 
         individual2_from_db = Individual.objects.get(id=self.individual2.id)
         self.assertNotEqual(individual2_from_db.first_name, self.individual2_updated_first_name)
+
+    @patch('individual.apps.IndividualConfig.enable_maker_checker_for_individual_update', False)
+    @patch('social_protection.apps.SocialProtectionConfig.enable_maker_checker_for_beneficiary_update', False)
+    def test_process_update_beneficiaries_workflow_skips_unchanged_rows(self):
+        self.invalid_data_source.json_ext = {
+            "ID": str(self.beneficiary2_uuid),
+            "first_name": self.individual2_updated_first_name,
+            "location_name": None,
+            "location_code": None,
+        }
+        self.invalid_data_source.save(user=self.user)
+        process_update_beneficiaries_workflow(self.user_uuid, self.benefit_plan.uuid, self.upload_uuid)
+        upload = IndividualDataSourceUpload.objects.get(id=self.upload_uuid)
+        self.assertEqual(get_update_summary(upload), {'changed': 2, 'unchanged': 0, 'new': 0})
+
+        # The same file uploaded again doesn't rewrite any individual
+        second_upload = self._create_update_upload(
+            [self.valid_data_source.json_ext, self.invalid_data_source.json_ext]
+        )
+        individual_version = Individual.objects.get(id=self.individual1.id).version
+
+        process_update_beneficiaries_workflow(self.user_uuid, self.benefit_plan.uuid, second_upload.id)
+
+        second_upload.refresh_from_db()
+        self.assertEqual(get_update_summary(second_upload), {'changed': 0, 'unchanged': 2, 'new': 0})
+        self.assertEqual(Individual.objects.get(id=self.individual1.id).version, individual_version)
+        # Unchanged rows are still linked to the individual they match
+        self.assertEqual(
+            {data_source.individual_id for data_source in IndividualDataSource.objects.filter(upload=second_upload)},
+            {self.individual1.id, self.individual2.id},
+        )
+
+    @patch('individual.apps.IndividualConfig.enable_maker_checker_for_individual_update', False)
+    @patch('social_protection.apps.SocialProtectionConfig.enable_maker_checker_for_beneficiary_update', False)
+    def test_process_update_beneficiaries_workflow_detects_removed_array_element(self):
+        self.valid_data_source.json_ext = {"ID": str(self.beneficiary1_uuid), "tags": ["a", "b"]}
+        self.valid_data_source.save(user=self.user)
+        self.invalid_data_source.json_ext = {"ID": str(self.beneficiary2_uuid), "tags": ["c"]}
+        self.invalid_data_source.save(user=self.user)
+        process_update_beneficiaries_workflow(self.user_uuid, self.benefit_plan.uuid, self.upload_uuid)
+
+        second_upload = self._create_update_upload([
+            {"ID": str(self.beneficiary1_uuid), "tags": ["a"]},
+            self.invalid_data_source.json_ext,
+        ])
+        process_update_beneficiaries_workflow(self.user_uuid, self.benefit_plan.uuid, second_upload.id)
+
+        second_upload.refresh_from_db()
+        self.assertEqual(get_update_summary(second_upload), {'changed': 1, 'unchanged': 1, 'new': 0})
+        self.assertEqual(Individual.objects.get(id=self.individual1.id).json_ext['tags'], ["a"])
+
+    @patch('individual.apps.IndividualConfig.enable_maker_checker_for_individual_update', False)
+    @patch('social_protection.apps.SocialProtectionConfig.enable_maker_checker_for_beneficiary_update', False)
+    def test_process_update_beneficiaries_workflow_unchanged_rows_of_imported_beneficiaries(self):
+        # Individuals and beneficiaries created by an upload keep the imported row, without the beneficiary ID
+        imported_rows = {
+            self.beneficiary1_uuid: {"first_name": "Foo 1", "last_name": "Bar", "dob": "1998-01-01", "income": 100},
+            self.beneficiary2_uuid: {"first_name": "Foo 2", "last_name": "Baz", "dob": "1980-01-01", "income": 200},
+        }
+        for beneficiary_uuid, row in imported_rows.items():
+            beneficiary = Beneficiary.objects.get(id=beneficiary_uuid)
+            Individual.objects.filter(id=beneficiary.individual_id).update(json_ext=row)
+            Beneficiary.objects.filter(id=beneficiary_uuid).update(
+                json_ext={key: value for key, value in row.items() if key not in ('first_name', 'last_name', 'dob')}
+            )
+
+        upload = self._create_update_upload([
+            {"ID": str(self.beneficiary1_uuid), **imported_rows[self.beneficiary1_uuid]},
+            {"ID": str(self.beneficiary2_uuid), **imported_rows[self.beneficiary2_uuid], "income": 250},
+        ])
+        process_update_beneficiaries_workflow(self.user_uuid, self.benefit_plan.uuid, upload.id)
+
+        upload.refresh_from_db()
+        self.assertEqual(get_update_summary(upload), {'changed': 1, 'unchanged': 1, 'new': 0})
+
+    @patch('individual.apps.IndividualConfig.enable_maker_checker_for_individual_update', False)
+    @patch('social_protection.apps.SocialProtectionConfig.enable_maker_checker_for_beneficiary_update', False)
+    @patch('social_protection.apps.SocialProtectionConfig.enable_fuzzy_duplicate_check', True)
+    def test_process_update_beneficiaries_workflow_full_rows_not_flagged_as_duplicates(self):
+        # Rows with the full, slightly corrected record of the beneficiary they update
+        self.valid_data_source.json_ext = {
+            "ID": str(self.beneficiary1_uuid),
+            "first_name": "Foo 1",
+            "last_name": "Barr",
+            "dob": "1998-01-01",
+            "location_name": None,
+            "location_code": None,
+        }
+        self.valid_data_source.save(user=self.user)
+        self.invalid_data_source.json_ext = {
+            "ID": str(self.beneficiary2_uuid),
+            "first_name": "Foo 2",
+            "last_name": "Baz",
+            "dob": "1980-01-01",
+            "location_name": None,
+            "location_code": None,
+        }
+        self.invalid_data_source.save(user=self.user)
+
+        process_update_beneficiaries_workflow(self.user_uuid, self.benefit_plan.uuid, self.upload_uuid)
+
+        upload = IndividualDataSourceUpload.objects.get(id=self.upload_uuid)
+        self.assertEqual(upload.status, "SUCCESS", upload.error)
+        for data_source in IndividualDataSource.objects.filter(upload_id=self.upload_uuid):
+            self.assertEqual(data_source.validations.get('validation_errors'), [])
+        self.assertEqual(Individual.objects.get(id=self.individual1.id).last_name, "Barr")
+
+    def _create_update_upload(self, rows):
+        upload = IndividualDataSourceUpload(source_name='csv', source_type='update', status="PENDING")
+        upload.save(user=self.user)
+        BenefitPlanDataUploadRecords(
+            data_upload=upload,
+            workflow='Python Beneficiaries Update',
+            benefit_plan=self.benefit_plan,
+            json_ext={}
+        ).save(user=self.user.user)
+        for row in rows:
+            IndividualDataSource(upload_id=upload.id, json_ext=row).save(user=self.user)
+        return upload
@@ -177,6 +177,12 @@ class ProcessImportBeneficiariesWorkflowTest(TestCase):
             self.assertIn(str(self.invalid_data_source.id), errors[key])
             self.assertNotIn(str(self.valid_data_source.id), errors[key])
 
+        # Errors of every row are stored on the row itself
+        self.invalid_data_source.refresh_from_db()
+        self.valid_data_source.refresh_from_db()
+        self.assertEqual(self.invalid_data_source.validations['import_errors'], ['last_name', 'dob'])
+        self.assertNotIn('import_errors', self.valid_data_source.validations or {})
+
         # individual_id should not be assigned for any data sources
         data_entries = IndividualDataSource.objects.filter(upload_id=self.upload_uuid)
         for entry in data_entries:
@@ -0,0 +1,196 @@
+"""
+Index of values of unique schema fields (`"uniqueness": true`) of beneficiaries, per benefit plan.
+
+`BeneficiaryUniqueValue` stores the md5 hash of the normalized value (trimmed, lower case text of the json_ext key)
+of every unique field of every beneficiary. Uploads are checked against existing beneficiaries of the plan with one
+semi-join per unique field, instead of looking up every row. Hashes are computed by the database for both sides,
+so stored and uploaded values are always normalized the same way.
+
+Rows are kept up to date:
+- on every save or delete of a `Beneficiary` or `GroupBeneficiary`,
+- for beneficiaries created in bulk (imports, enrollment), by indexing them once they are created. Per record updates
+  are suspended within `deferred_unique_value_index()`,
+- when the unique fields of a plan change, by rebuilding the index of the plan.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Set
+
+from django.db import transaction
+from django.db.models import CharField, Exists, OuterRef, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import MD5, Cast, Coalesce, Lower, Trim
+from django.db.models.query import QuerySet
+
+from individual.models import IndividualDataSource
+from social_protection.apps import SocialProtectionConfig
+from social_protection.benefit_plan_schema import get_compiled_schema
+from social_protection.models import (
+    Beneficiary,
+    BenefitPlan,
+    BenefitPlanStatistics,
+    BeneficiaryUniqueValue,
+    GroupBeneficiary,
+)
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_VALUE_SOURCES = {
+    Beneficiary: BenefitPlanStatistics.BeneficiaryType.INDIVIDUAL,
+    GroupBeneficiary: BenefitPlanStatistics.BeneficiaryType.GROUP,
+}
+
+BATCH_SIZE = 1000
+
+_state = threading.local()
+
+
+def normalized_value(field: str):
+    return Lower(Trim(KeyTextTransform(field, 'json_ext')))
+
+
+def _with_value_hash(queryset: QuerySet, field: str) -> QuerySet:
+    return queryset \
+        .annotate(unique_value=normalized_value(field)) \
+        .exclude(unique_value__isnull=True) \
+        .exclude(unique_value='') \
+        .annotate(value_hash=MD5('unique_value'))
+
+
+def _unique_value_rows(model, benefit_plan: BenefitPlan, queryset: QuerySet):
+    beneficiary_type = UNIQUE_VALUE_SOURCES[model]
+    queryset = queryset.filter(benefit_plan_id=benefit_plan.id, is_deleted=False).order_by()
+    for field in get_compiled_schema(benefit_plan).unique_fields:
+        for beneficiary_id, value_hash in _with_value_hash(queryset, field).values_list('id', 'value_hash'):
+            yield BeneficiaryUniqueValue(
+                benefit_plan_id=benefit_plan.id,
+                beneficiary_type=beneficiary_type,
+                beneficiary_id=beneficiary_id,
+                field=field,
+                value_hash=value_hash,
+            )
+
+
+def index_beneficiaries(model, queryset: QuerySet) -> int:
+    """
+    Replace index rows of the beneficiaries of the queryset, deleted beneficiaries are removed from the index.
+    """
+    beneficiary_ids = list(queryset.order_by().values_list('id', flat=True))
+    plan_ids = set(queryset.order_by().values_list('benefit_plan_id', flat=True).distinct())
+    created = 0
+    with transaction.atomic():
+        for start in range(0, len(beneficiary_ids), BATCH_SIZE):
+            batch_ids = beneficiary_ids[start:start + BATCH_SIZE]
+            BeneficiaryUniqueValue.objects.filter(beneficiary_id__in=batch_ids).delete()
+            for benefit_plan in BenefitPlan.objects.filter(id__in=plan_ids):
+                rows = list(_unique_value_rows(model, benefit_plan, model.objects.filter(id__in=batch_ids)))
+                BeneficiaryUniqueValue.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+                created += len(rows)
+    return created
+
+
+def index_created_beneficiaries(model, queryset: QuerySet):
+    """
+    Index beneficiaries created without model signals (bulk create, SQL procedures of the workflows).
+    """
+    if SocialProtectionConfig.enable_unique_value_index:
+        index_beneficiaries(model, queryset)
+
+
+def is_unique_value_index_deferred() -> bool:
+    return getattr(_state, 'depth', 0) > 0
+
+
+@contextmanager
+def deferred_unique_value_index():
+    """
+    Suspend per record updates of the index on save, beneficiaries saved within the block are indexed afterwards
+    with `index_created_beneficiaries`.
+    """
+    _state.depth = getattr(_state, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+
+
+def rebuild_unique_value_index(benefit_plan_ids: Optional[Iterable] = None) -> int:
+    """
+    Replace index rows of the plans (all plans if None) with values of their current unique fields.
+    """
+    benefit_plans = BenefitPlan.objects.all()
+    if benefit_plan_ids is not None:
+        benefit_plans = benefit_plans.filter(id__in=list(benefit_plan_ids))
+    created = 0
+    with transaction.atomic():
+        for benefit_plan in benefit_plans:
+            BeneficiaryUniqueValue.objects.filter(benefit_plan_id=benefit_plan.id).delete()
+            for model in UNIQUE_VALUE_SOURCES:
+                rows = list(_unique_value_rows(model, benefit_plan, model.objects.all()))
+                BeneficiaryUniqueValue.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+                created += len(rows)
+    return created
+
+
+def find_existing_unique_values(benefit_plan: BenefitPlan, upload_id, fields: Iterable[str]) -> Dict[str, Set[str]]:
+    """
+    Ids of data sources of the upload, not imported yet, with a value of the unique field already used by
+    a beneficiary of the plan. Rows of update uploads don't conflict with the beneficiary they update (`ID`).
+    """
+    data_sources = IndividualDataSource.objects \
+        .filter(upload_id=upload_id, is_deleted=False, individual__isnull=True) \
+        .annotate(updated_beneficiary_id=Coalesce(Lower(Trim(KeyTextTransform('ID', 'json_ext'))), Value('')))
+    existing = {}
+    for field in fields:
+        used_values = BeneficiaryUniqueValue.objects \
+            .filter(benefit_plan_id=benefit_plan.id, field=field, value_hash=OuterRef('value_hash')) \
+            .annotate(beneficiary_id_text=Cast('beneficiary_id', CharField())) \
+            .exclude(beneficiary_id_text=OuterRef('updated_beneficiary_id'))
+        existing[field] = {
+            str(data_source_id) for data_source_id in
+            _with_value_hash(data_sources, field).filter(Exists(used_values)).values_list('id', flat=True)
+        }
+    return existing
+
+
+def on_beneficiary_unique_value_save(sender, instance, **kwargs):
+    if not SocialProtectionConfig.enable_unique_value_index or is_unique_value_index_deferred():
+        return
+    benefit_plan = instance.benefit_plan
+    if not get_compiled_schema(benefit_plan).unique_fields:
+        return
+    with transaction.atomic():
+        BeneficiaryUniqueValue.objects.filter(beneficiary_id=instance.id).delete()
+        BeneficiaryUniqueValue.objects.bulk_create(
+            _unique_value_rows(sender, benefit_plan, sender.objects.filter(id=instance.id))
+        )
+
+
+def on_beneficiary_unique_value_delete(sender, instance, **kwargs):
+    if not SocialProtectionConfig.enable_unique_value_index:
+        return
+    BeneficiaryUniqueValue.objects.filter(beneficiary_id=instance.id).delete()
+
+
+def on_benefit_plan_unique_fields_change(**kwargs):
+    """
+    Rebuild the index of a plan after its unique fields changed, connected to benefit plan service signals.
+    """
+    if not SocialProtectionConfig.enable_unique_value_index:
+        return
+    try:
+        result = kwargs.get('result') or {}
+        data = result.get('data') if isinstance(result, dict) else None
+        benefit_plan_id = data.get('id') if isinstance(data, dict) else None
+        benefit_plan = BenefitPlan.objects.filter(id=benefit_plan_id).first() if benefit_plan_id else None
+        if benefit_plan is None:
+            return
+        indexed_fields = set(
+            BeneficiaryUniqueValue.objects.filter(benefit_plan_id=benefit_plan.id)
+            .order_by().values_list('field', flat=True).distinct()
+        )
+        if indexed_fields != set(get_compiled_schema(benefit_plan).unique_fields):
+            rebuild_unique_value_index([benefit_plan.id])
+    except Exception as exc:
+        logger.error("Error while rebuilding unique value index of a benefit plan", exc_info=exc)
@@ -0,0 +1,137 @@
+"""
+Batch evaluation of validation calculation rules on columns of imported files.
+
+The import validates a column (field name and its values) with one call instead of going through
+`calculate_if_active_for_object` for every cell. Calculations implementing
+`calculate_batch_if_active_for_object(class_name, calculation_uuid, field_name=..., field_values=...)` validate
+the whole column in their own, vectorized, way and return one result per value. Legacy calculations without the
+batch method are called once per value.
+
+Columns of uploads often have few distinct values (location codes, gender, roles). With a `ValidationMemo` every
+distinct (rule, field, value) is validated once per upload and its result is shared by all rows with the value.
+The memo keeps at most `validation_memo_size` results, rules listed in `validation_memo_excluded_rules` (e.g. rules
+depending on other fields of the row) are always evaluated for every value.
+"""
+import math
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+
+BATCH_METHOD = 'calculate_batch_if_active_for_object'
+
+
+def supports_batch_validation(calculation) -> bool:
+    return callable(getattr(calculation, BATCH_METHOD, None))
+
+
+class ValidationMemo:
+    """
+    Bounded cache of validation results keyed by rule, field and value, least recently used results are dropped.
+    """
+
+    def __init__(self, max_size: int, excluded_rules: Iterable[str] = ()):
+        self.max_size = max_size
+        self.excluded_rules = frozenset(excluded_rules or ())
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def is_enabled_for(self, rule_name: str) -> bool:
+        return self.max_size > 0 and rule_name not in self.excluded_rules
+
+    def get(self, key):
+        result = self._results.get(key, _MISSING)
+        if result is not _MISSING:
+            self._results.move_to_end(key)
+        return result
+
+    def set(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def __len__(self):
+        return len(self._results)
+
+
+_MISSING = object()
+_NAN = object()
+
+
+def _value_key(value):
+    """
+    Hashable key of a cell value, None for values which can't be memoized. NaN values share one key.
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return _NAN
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    # 1, 1.0 and True are equal in dicts but may be validated differently
+    return type(value), value
+
+
+def calculate_column(calculation, calculation_uuid, rule_name: str, field_name: str, values: Sequence,
+                     memo: Optional[ValidationMemo] = None) -> List:
+    """
+    Results of the validation rule for every value of the column, in the order of `values`.
+    """
+    values = list(values)
+    if not values:
+        return []
+    if memo is None or not memo.is_enabled_for(rule_name):
+        return _calculate_values(calculation, calculation_uuid, rule_name, field_name, values)
+
+    keys = [_value_key(value) for value in values]
+    results = {}
+    pending = OrderedDict()
+    for key, value in zip(keys, values):
+        if key is None or key in results or key in pending:
+            continue
+        result = memo.get((rule_name, field_name, key))
+        if result is _MISSING:
+            pending[key] = value
+        else:
+            results[key] = result
+    memo.hits += len(results)
+    memo.misses += len(pending)
+
+    unmemoized = [value for key, value in zip(keys, values) if key is None]
+    calculated = _calculate_values(
+        calculation, calculation_uuid, rule_name, field_name, [*pending.values(), *unmemoized]
+    )
+    for key, result in zip(pending, calculated):
+        results[key] = result
+        memo.set((rule_name, field_name, key), result)
+
+    unmemoized_results = iter(calculated[len(pending):])
+    return [results[key] if key is not None else next(unmemoized_results) for key in keys]
+
+
+def _calculate_values(calculation, calculation_uuid, rule_name: str, field_name: str, values: List) -> List:
+    if not values:
+        return []
+    if supports_batch_validation(calculation):
+        results = getattr(calculation, BATCH_METHOD)(
+            rule_name,
+            calculation_uuid,
+            field_name=field_name,
+            field_values=values,
+        )
+        results = list(results) if results is not None else []
+        if len(results) != len(values):
+            raise ValueError(
+                f"Validation rule {rule_name} returned {len(results)} results for {len(values)} values "
+                f"of field {field_name}"
+            )
+        return results
+    return [
+        calculation.calculate_if_active_for_object(
+            rule_name,
+            calculation_uuid,
+            field_name=field_name,
+            field_value=value,
+        )
+        for value in values
+    ]
@@ -4,8 +4,9 @@ import pandas as pd
 import mimetypes
 import os
 
+from django.core.files.storage import default_storage
 from django.db.models import Q
-from django.http import HttpResponse, StreamingHttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils.translation import gettext as _
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -14,20 +15,24 @@ from rest_framework.response import Response
 from core.utils import DefaultStorageFileHandler
 from core.views import check_user_rights
 from individual.apps import IndividualConfig
-from individual.models import IndividualDataSource
+from individual.models import IndividualDataSource, IndividualDataSourceUpload
 from social_protection.apps import SocialProtectionConfig
-from social_protection.models import BenefitPlan
+from social_protection.benefit_plan_schema import get_compiled_schema
+from social_protection.import_progress import get_upload_status
+from social_protection.models import BenefitPlan, BeneficiaryExportJob
+from social_protection.parquet import PARQUET_EXTENSION, PARQUET_MIME_TYPE
 from social_protection.services import BeneficiaryImportService
 from workflow.services import WorkflowService
 
 logger = logging.getLogger(__name__)
 
 
-ALLOWED_EXTENSIONS = {".csv", ".xls", ".xlsx"}
+ALLOWED_EXTENSIONS = {".csv", ".xls", ".xlsx", PARQUET_EXTENSION}
 ALLOWED_MIME_TYPES = {
     "text/csv",
     "application/vnd.ms-excel",
-    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    PARQUET_MIME_TYPE,
 }
 
 mimetypes.add_type("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx")
@@ -38,7 +43,7 @@ def is_valid_file(import_file):
     """ Validate file extension and MIME type """
     file_extension = os.path.splitext(import_file.name)[1].lower()
     if file_extension not in ALLOWED_EXTENSIONS:
-        return False, _("Invalid file type. Allowed: .csv, .xls, .xlsx")
+        return False, _("Invalid file type. Allowed: .csv, .xls, .xlsx, .parquet")
 
     file_mime_type, _ = mimetypes.guess_type(import_file.name)
     if not file_mime_type:
@@ -51,9 +56,11 @@ def is_valid_file(import_file):
 
 
 def get_global_schema_fields(benefit_plan):
-    schema = benefit_plan.beneficiary_data_schema if benefit_plan.beneficiary_data_schema \
-        else json.loads(IndividualConfig.individual_schema)
-    schema_properties = set(schema.get('properties', {}).keys())
+    if benefit_plan.beneficiary_data_schema:
+        schema_properties = set(get_compiled_schema(benefit_plan).export_columns)
+    else:
+        schema = json.loads(IndividualConfig.individual_schema)
+        schema_properties = set(schema.get('properties', {}).keys())
     schema_properties.update(['recipient_info', 'individual_role', 'group_code'])
     return list(schema_properties)
 
@@ -91,6 +98,7 @@ def import_beneficiaries(request):
     try:
         user = request.user
         import_file, workflow, benefit_plan, group_aggregation_column = _resolve_import_beneficiaries_args(request)
+        run_async = str(request.POST.get('async', '')).lower() in ('true', '1')
 
         is_valid, error_message = is_valid_file(import_file)
         if not is_valid:
@@ -98,11 +106,13 @@ def import_beneficiaries(request):
 
         _handle_file_upload(import_file, benefit_plan)
         result = BeneficiaryImportService(user).import_beneficiaries(
-            import_file, benefit_plan, workflow, group_aggregation_column
+            import_file, benefit_plan, workflow, group_aggregation_column, run_async=run_async
         )
         if not result.get('success'):
             raise ValueError('{}: {}'.format(result.get("message"), result.get("details")))
 
+        if run_async:
+            return Response(result, status=status.HTTP_202_ACCEPTED)
         return Response(result)
     except ValueError as e:
         if import_file and benefit_plan:
@@ -117,6 +127,31 @@ def import_beneficiaries(request):
         return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(["GET"])
+@permission_classes([check_user_rights(IndividualConfig.gql_individual_search_perms, )])
+def import_beneficiaries_status(request):
+    try:
+        upload_uuid = request.query_params.get('upload_uuid')
+        if not upload_uuid:
+            raise ValueError('Upload UUID not provided')
+        uploads = IndividualDataSourceUpload.objects.filter(uuid=upload_uuid)
+        if not request.user.has_perms(SocialProtectionConfig.gql_beneficiary_search_perms):
+            # Users without access to beneficiary uploads follow only their own imports
+            uploads = uploads.filter(user_created=request.user)
+        upload = uploads.first()
+        if not upload:
+            raise FileNotFoundError(f'Upload not found: {upload_uuid}')
+        return Response({'success': True, 'data': get_upload_status(upload)})
+    except ValueError as exc:
+        logger.error("Error while fetching import status", exc_info=exc)
+        return Response({'success': False, 'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except FileNotFoundError as exc:
+        return Response({'success': False, 'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as exc:
+        logger.error("Unexpected error while fetching import status", exc_info=exc)
+        return Response({'success': False, 'error': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(["POST"])
 @permission_classes([check_user_rights(IndividualConfig.gql_individual_create_perms, )])
 def validate_import_beneficiaries(request):
@@ -224,6 +259,36 @@ def download_beneficiary_upload(request):
         return Response({'success': False, 'error': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(["GET"])
+@permission_classes([check_user_rights(SocialProtectionConfig.gql_beneficiary_search_perms, )])
+def download_beneficiary_export(request):
+    try:
+        job_id = request.query_params.get('job_id')
+        if not job_id:
+            raise ValueError('Export job id not provided')
+        job = BeneficiaryExportJob.objects.filter(id=job_id, user=request.user).first()
+        if not job:
+            raise FileNotFoundError(f'Export job not found: {job_id}')
+        if job.status != BeneficiaryExportJob.Status.COMPLETED:
+            raise ValueError(f'Export job {job_id} is not completed, status: {job.status}')
+
+        export_file = default_storage.open(job.file_name, 'rb')
+        content_type = mimetypes.guess_type(job.file_name)[0] or 'application/octet-stream'
+        response = FileResponse(export_file, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(job.file_name)}"'
+        return response
+
+    except ValueError as exc:
+        logger.error("Error while fetching export", exc_info=exc)
+        return Response({'success': False, 'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except FileNotFoundError as exc:
+        logger.error("Error while getting export file", exc_info=exc)
+        return Response({'success': False, 'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as exc:
+        logger.error("Unexpected error", exc_info=exc)
+        return Response({'success': False, 'error': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(["POST"])
 @permission_classes([check_user_rights(IndividualConfig.gql_individual_create_perms, )])
 def synchronize_data_for_reporting(request):
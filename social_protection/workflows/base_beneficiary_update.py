@@ -1,7 +1,8 @@
 import logging
 
 from core.models import User
-from social_protection.workflows.utils import DataUpdateWorkflow
+from social_protection.workflows.utils import DataUpdateWorkflow, build_link_unchanged_sql, build_update_delta_sql
+from social_protection.import_progress import track_import_stage
 from social_protection.services import BeneficiaryImportService
 from social_protection.models import BenefitPlan
 
@@ -12,13 +13,17 @@ def process_update_beneficiaries_workflow(user_uuid, benefit_plan_uuid, upload_u
     # Call the records validation service directly with the provided arguments
     user = User.objects.get(id=user_uuid)
     benefit_plan = BenefitPlan.objects.get(id=benefit_plan_uuid)
-    service = DataUpdateWorkflow(benefit_plan_uuid, upload_uuid, user_uuid)
-    service.validate_dataframe_headers(True)
-    if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
-        service.execute(update_sql)
-    else:
-        # TO-DO - add update mode for group update upload
-        pass
+    with track_import_stage(upload_uuid, 'load_data_sources') as stage:
+        service = DataUpdateWorkflow(benefit_plan_uuid, upload_uuid, user_uuid)
+        stage['rows'] = len(service.df)
+    with track_import_stage(upload_uuid, 'validate_headers'):
+        service.validate_dataframe_headers(True)
+    with track_import_stage(upload_uuid, 'sql_procedure', rows=len(service.df)):
+        if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
+            service.execute(update_sql)
+        else:
+            # TO-DO - add update mode for group update upload
+            pass
     BeneficiaryImportService(user).synchronize_data_for_reporting(upload_uuid, benefit_plan)
 
 
@@ -63,7 +68,7 @@ BEGIN
 
     -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-
+""" + build_update_delta_sql() + """
     SELECT ARRAY_AGG("UUID") AS "UUID", ARRAY_AGG("ordinal") AS "ORDINALS" INTO failing_entries_invalid_id
     FROM (
         SELECT ("Json_ext" ->> 'ID')::UUID as beneficiary_uuid,  row_number() OVER (ORDER BY "UUID") AS ordinal, "UUID"
@@ -95,6 +100,7 @@ BEGIN
         WHERE upload_id=current_upload_id 
           and social_protection_beneficiary."UUID" = (ids."Json_ext" ->> 'ID')::UUID
           and social_protection_beneficiary."isDeleted"=false
+          and ids.validations ->> 'update_status' = 'CHANGED'
           
         RETURNING social_protection_beneficiary."UUID", ids."Json_ext", social_protection_beneficiary."individual_id", ids."UUID" as individualdatasource_id
           ),
@@ -121,8 +127,7 @@ BEGIN
         and individual_individualdatasource.individual_id is null 
         and "isDeleted"=False 
         and individual_individualdatasource."UUID" = u.individualdatasource_id;
-           
-            
+""" + build_link_unchanged_sql() + """
             update individual_individualdatasourceupload set status='PARTIAL_SUCCESS', error='{}' where "UUID" = current_upload_id;
             EXCEPTION
               WHEN OTHERS then
@@ -1,7 +1,8 @@
 import logging
 
 from core.models import User
-from social_protection.workflows.utils import DataUploadWorkflow
+from social_protection.workflows.utils import DataUploadWorkflow, build_upload_validation_sql
+from social_protection.import_progress import track_import_stage
 from social_protection.services import BeneficiaryImportService
 from social_protection.models import BenefitPlan
 
@@ -12,12 +13,16 @@ def process_import_beneficiaries_workflow(user_uuid, benefit_plan_uuid, upload_u
     # Call the records' validation service directly with the provided arguments
     user = User.objects.get(id=user_uuid)
     benefit_plan = BenefitPlan.objects.get(id=benefit_plan_uuid)
-    service = DataUploadWorkflow(benefit_plan_uuid, upload_uuid, user_uuid)
-    service.validate_dataframe_headers()
-    if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
-        service.execute(upload_sql)
-    else:
-        service.execute(upload_sql_group_version)
+    with track_import_stage(upload_uuid, 'load_data_sources') as stage:
+        service = DataUploadWorkflow(benefit_plan_uuid, upload_uuid, user_uuid)
+        stage['rows'] = len(service.df)
+    with track_import_stage(upload_uuid, 'validate_headers'):
+        service.validate_dataframe_headers()
+    with track_import_stage(upload_uuid, 'sql_procedure', rows=len(service.df)):
+        if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
+            service.execute(upload_sql)
+        else:
+            service.execute(upload_sql_group_version)
     BeneficiaryImportService(user).synchronize_data_for_reporting(upload_uuid, benefit_plan)
 
 
@@ -34,27 +39,8 @@ DO $$
             failing_entries_last_name UUID[];
             failing_entries_dob UUID[];
             BEGIN
-    -- Check if all required fields are present in the entries
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_first_name
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT "Json_ext" ? 'first_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_last_name
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT "Json_ext" ? 'last_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_dob
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT "Json_ext" ? 'dob';
-
-
-    -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_invalid_json
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT validate_json_schema(json_schema, "Json_ext");
-
-    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
+""" + build_upload_validation_sql() + """    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
     IF failing_entries_invalid_json IS NOT NULL or failing_entries_first_name IS NOT NULL OR failing_entries_last_name IS NOT NULL OR failing_entries_dob IS NOT NULL THEN
         UPDATE individual_individualdatasourceupload
         SET error = coalesce(error, '{}'::jsonb) || jsonb_build_object('errors', jsonb_build_object(
@@ -143,27 +129,8 @@ DO $$
             failing_entries_last_name UUID[];
             failing_entries_dob UUID[];
             BEGIN
-    -- Check if all required fields are present in the entries
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_first_name
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT "Json_ext" ? 'first_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_last_name
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT "Json_ext" ? 'last_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_dob
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT "Json_ext" ? 'dob';
-
-
-    -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_invalid_json
-    FROM individual_individualdatasource
-    WHERE upload_id=current_upload_id and individual_id is null and "isDeleted"=False AND NOT validate_json_schema(json_schema, "Json_ext");
-
-    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
+""" + build_upload_validation_sql() + """    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
     IF failing_entries_invalid_json IS NOT NULL or failing_entries_first_name IS NOT NULL OR failing_entries_last_name IS NOT NULL OR failing_entries_dob IS NOT NULL THEN
         UPDATE individual_individualdatasourceupload
         SET error = coalesce(error, '{}'::jsonb) || jsonb_build_object('errors', jsonb_build_object(
@@ -1,7 +1,12 @@
 import logging
 
 from core.models import User
-from social_protection.workflows.utils import SqlProcedurePythonWorkflow
+from social_protection.workflows.utils import (
+    SqlProcedurePythonWorkflow,
+    build_link_unchanged_sql,
+    build_update_delta_sql,
+)
+from social_protection.import_progress import track_import_stage
 from social_protection.services import BeneficiaryImportService
 from social_protection.models import BenefitPlan
 
@@ -11,20 +16,24 @@ logger = logging.getLogger(__name__)
 def process_update_valid_beneficiaries_workflow(user_uuid, benefit_plan_uuid, upload_uuid, accepted=None):
     user = User.objects.get(id=user_uuid)
     benefit_plan = BenefitPlan.objects.get(id=benefit_plan_uuid)
-    service = SqlProcedurePythonWorkflow(benefit_plan_uuid, upload_uuid, user_uuid, accepted)
-    service.validate_dataframe_headers(True)
-    if isinstance(accepted, list):
-        if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
-            service.execute(upload_sql_partial, [upload_uuid, user_uuid, benefit_plan_uuid, accepted])
+    with track_import_stage(upload_uuid, 'load_data_sources') as stage:
+        service = SqlProcedurePythonWorkflow(benefit_plan_uuid, upload_uuid, user_uuid, accepted)
+        stage['rows'] = len(service.df)
+    with track_import_stage(upload_uuid, 'validate_headers'):
+        service.validate_dataframe_headers(True)
+    with track_import_stage(upload_uuid, 'sql_procedure', rows=len(service.df)):
+        if isinstance(accepted, list):
+            if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
+                service.execute(upload_sql_partial, [upload_uuid, user_uuid, benefit_plan_uuid, accepted])
+            else:
+                # TO-DO - add update mode for group update upload
+                pass
         else:
-            # TO-DO - add update mode for group update upload
-            pass
-    else:
-        if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
-            service.execute(upload_sql, [upload_uuid, user_uuid, benefit_plan_uuid])
-        else:
-            # TO-DO - add update mode for group update upload
-            pass
+            if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE:
+                service.execute(upload_sql, [upload_uuid, user_uuid, benefit_plan_uuid])
+            else:
+                # TO-DO - add update mode for group update upload
+                pass
     BeneficiaryImportService(user).synchronize_data_for_reporting(upload_uuid, benefit_plan)
 
 
@@ -71,7 +80,7 @@ BEGIN
 
     -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-
+""" + build_update_delta_sql(valid_only=True) + """
     SELECT ARRAY_AGG("UUID") AS "UUID", ARRAY_AGG("ordinal") AS "ORDINALS" INTO failing_entries_invalid_id
     FROM (
         SELECT ("Json_ext" ->> 'ID')::UUID as beneficiary_uuid,  row_number() OVER (ORDER BY "UUID") AS ordinal, "UUID"
@@ -103,6 +112,7 @@ BEGIN
         WHERE upload_id=current_upload_id 
           and social_protection_beneficiary."UUID" = (ids."Json_ext" ->> 'ID')::UUID
           and social_protection_beneficiary."isDeleted"=false
+          and ids.validations ->> 'update_status' = 'CHANGED'
           and validations ->> 'validation_errors' = '[]'
           
         RETURNING social_protection_beneficiary."UUID", ids."Json_ext", social_protection_beneficiary."individual_id", ids."UUID" as individualdatasource_id
@@ -131,6 +141,7 @@ BEGIN
         and "isDeleted"=False 
         and individual_individualdatasource."UUID" = u.individualdatasource_id
         and validations ->> 'validation_errors' = '[]';
+""" + build_link_unchanged_sql(valid_only=True) + """
             
             -- Change status to SUCCESS if no invalid items, change to PARTIAL_SUCCESS otherwise 
             UPDATE individual_individualdatasourceupload
@@ -210,7 +221,7 @@ BEGIN
 
     -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-
+""" + build_update_delta_sql(with_accepted_filter=True, valid_only=True) + """
     SELECT ARRAY_AGG("UUID") AS "UUID", ARRAY_AGG("ordinal") AS "ORDINALS" INTO failing_entries_invalid_id
     FROM (
         SELECT ("Json_ext" ->> 'ID')::UUID as beneficiary_uuid,  row_number() OVER (ORDER BY "UUID") AS ordinal, "UUID"
@@ -242,6 +253,7 @@ BEGIN
             WHERE upload_id = current_upload_id 
               AND social_protection_beneficiary."UUID" = (ids."Json_ext" ->> 'ID')::UUID
               AND social_protection_beneficiary."isDeleted" = false
+              AND ids.validations ->> 'update_status' = 'CHANGED'
               AND (ids."UUID" = ANY(accepted)) /* Filter based on accepted if not NULL */
               AND validations ->> 'validation_errors' = '[]'
           RETURNING social_protection_beneficiary."UUID", ids."Json_ext", social_protection_beneficiary."individual_id", ids."UUID" as individualdatasource_id
@@ -272,6 +284,7 @@ BEGIN
             AND individual_individualdatasource."UUID" = u.individualdatasource_id
             AND (individual_individualdatasource."UUID" = ANY(accepted)) /* Filter based on accepted if not NULL */
             AND validations ->> 'validation_errors' = '[]';
+""" + build_link_unchanged_sql(with_accepted_filter=True, valid_only=True) + """
             
           EXCEPTION
             WHEN OTHERS THEN
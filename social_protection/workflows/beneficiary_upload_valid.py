@@ -1,7 +1,8 @@
 import logging
 
 from core.models import User
-from social_protection.workflows.utils import SqlProcedurePythonWorkflow
+from social_protection.workflows.utils import SqlProcedurePythonWorkflow, build_upload_validation_sql
+from social_protection.import_progress import track_import_stage
 from social_protection.services import BeneficiaryImportService
 from social_protection.models import BenefitPlan
 
@@ -11,16 +12,20 @@ logger = logging.getLogger(__name__)
 def process_import_valid_beneficiaries_workflow(user_uuid, benefit_plan_uuid, upload_uuid, accepted=None):
     user = User.objects.get(id=user_uuid)
     benefit_plan = BenefitPlan.objects.get(id=benefit_plan_uuid)
-    service = SqlProcedurePythonWorkflow(benefit_plan_uuid, upload_uuid, user_uuid, accepted)
-    service.validate_dataframe_headers()
-    if isinstance(accepted, list):
-        service.execute(upload_sql_partial, [upload_uuid, user_uuid, benefit_plan_uuid, accepted]) \
-            if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE \
-            else service.execute(upload_sql_partial_group_type, [upload_uuid, user_uuid, benefit_plan_uuid, accepted])
-    else:
-        service.execute(upload_sql, [upload_uuid, user_uuid, benefit_plan_uuid]) \
-            if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE \
-            else service.execute(upload_sql_group_type, [upload_uuid, user_uuid, benefit_plan_uuid])
+    with track_import_stage(upload_uuid, 'load_data_sources') as stage:
+        service = SqlProcedurePythonWorkflow(benefit_plan_uuid, upload_uuid, user_uuid, accepted)
+        stage['rows'] = len(service.df)
+    with track_import_stage(upload_uuid, 'validate_headers'):
+        service.validate_dataframe_headers()
+    with track_import_stage(upload_uuid, 'sql_procedure', rows=len(service.df)):
+        if isinstance(accepted, list):
+            service.execute(upload_sql_partial, [upload_uuid, user_uuid, benefit_plan_uuid, accepted]) \
+                if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE \
+                else service.execute(upload_sql_partial_group_type, [upload_uuid, user_uuid, benefit_plan_uuid, accepted])
+        else:
+            service.execute(upload_sql, [upload_uuid, user_uuid, benefit_plan_uuid]) \
+                if benefit_plan.type == BenefitPlan.BenefitPlanType.INDIVIDUAL_TYPE \
+                else service.execute(upload_sql_group_type, [upload_uuid, user_uuid, benefit_plan_uuid])
     BeneficiaryImportService(user).synchronize_data_for_reporting(upload_uuid, benefit_plan)
 
 
@@ -39,26 +44,8 @@ DECLARE
     total_entries INT;
     total_valid_entries INT;
 BEGIN
-    -- Check if all required fields are present in the entries
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_first_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'first_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_last_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'last_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_dob
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'dob';
-
-    -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_invalid_json
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT validate_json_schema(json_schema, "Json_ext");
-
-    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
+""" + build_upload_validation_sql() + """    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
     IF failing_entries_invalid_json IS NOT NULL OR failing_entries_first_name IS NOT NULL OR failing_entries_last_name IS NOT NULL OR failing_entries_dob IS NOT NULL THEN
         UPDATE individual_individualdatasourceupload
         SET error = coalesce(error, '{}'::jsonb) || jsonb_build_object('errors', jsonb_build_object(
@@ -170,29 +157,7 @@ DECLARE
     failing_entries_last_name UUID[];
     failing_entries_dob UUID[];
 BEGIN
-    -- Check if all required fields are present in the entries, with accepted filter applied if not NULL
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_first_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'first_name'
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_last_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'last_name'
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_dob
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'dob'
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    -- Check if any entries have invalid Json_ext according to the schema, with accepted filter applied if not NULL
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_invalid_json
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT validate_json_schema(json_schema, "Json_ext")
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
+""" + build_upload_validation_sql(with_accepted_filter=True) + """    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
     IF failing_entries_invalid_json IS NOT NULL OR failing_entries_first_name IS NOT NULL OR failing_entries_last_name IS NOT NULL OR failing_entries_dob IS NOT NULL THEN
         UPDATE individual_individualdatasourceupload
         SET error = coalesce(error, '{}'::jsonb) || jsonb_build_object('errors', jsonb_build_object(
@@ -278,26 +243,8 @@ DECLARE
     total_entries INT;
     total_valid_entries INT;
 BEGIN
-    -- Check if all required fields are present in the entries
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_first_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'first_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_last_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'last_name';
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_dob
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'dob';
-
-    -- Check if any entries have invalid Json_ext according to the schema
     SELECT beneficiary_data_schema INTO json_schema FROM social_protection_benefitplan WHERE "UUID" = benefitPlan;
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_invalid_json
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT validate_json_schema(json_schema, "Json_ext");
-
-    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
+""" + build_upload_validation_sql() + """    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
     IF failing_entries_invalid_json IS NOT NULL OR failing_entries_first_name IS NOT NULL OR failing_entries_last_name IS NOT NULL OR failing_entries_dob IS NOT NULL THEN
         UPDATE individual_individualdatasourceupload
         SET error = coalesce(error, '{}'::jsonb) || jsonb_build_object('errors', jsonb_build_object(
@@ -402,29 +349,7 @@ DECLARE
     failing_entries_last_name UUID[];
     failing_entries_dob UUID[];
 BEGIN
-    -- Check if all required fields are present in the entries, with accepted filter applied if not NULL
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_first_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'first_name'
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_last_name
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'last_name'
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_dob
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT "Json_ext" ? 'dob'
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    -- Check if any entries have invalid Json_ext according to the schema, with accepted filter applied if not NULL
-    SELECT ARRAY_AGG("UUID") INTO failing_entries_invalid_json
-    FROM individual_individualdatasource
-    WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False AND NOT validate_json_schema(json_schema, "Json_ext")
-    AND (accepted IS NULL OR "UUID" = ANY(accepted));
-
-    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
+""" + build_upload_validation_sql(with_accepted_filter=True) + """    -- If any entries do not meet the criteria or missing required fields, set the error message in the upload table and do not proceed further
     IF failing_entries_invalid_json IS NOT NULL OR failing_entries_first_name IS NOT NULL OR failing_entries_last_name IS NOT NULL OR failing_entries_dob IS NOT NULL THEN
         UPDATE individual_individualdatasourceupload
         SET error = coalesce(error, '{}'::jsonb) || jsonb_build_object('errors', jsonb_build_object(
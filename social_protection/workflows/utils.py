@@ -2,7 +2,6 @@
 Functionalities shared between different python workflows.
 
 """
-import json
 import logging
 from abc import ABCMeta, abstractmethod
 from typing import Iterable
@@ -12,6 +11,7 @@ from django.db import ProgrammingError, connection
 from core.models import User
 from individual.models import IndividualDataSource
 from social_protection.apps import SocialProtectionConfig
+from social_protection.benefit_plan_schema import get_compiled_schema
 from social_protection.models import BenefitPlan
 from social_protection.services import BeneficiaryImportService
 from social_protection.utils import load_dataframe
@@ -56,8 +56,7 @@ class BasePythonWorkflowExecutor(metaclass=ABCMeta):
         """
         
         df_headers = set(self.df.columns)
-        schema = json.loads(self.schema) if isinstance(self.schema, str) else self.schema
-        schema_properties = set(schema.get('properties', {}).keys())
+        schema_properties = set(get_compiled_schema(self.benefit_plan).property_names)
         schema_properties.update(['recipient_info', 'group_code', 'individual_role'])
         required_headers = set(SocialProtectionConfig.beneficiary_base_fields)
         
@@ -85,6 +84,131 @@ class BasePythonWorkflowExecutor(metaclass=ABCMeta):
         pass
 
 
+def build_upload_validation_sql(with_accepted_filter: bool = False) -> str:
+    """
+    PL/pgSQL statement validating the pending data sources of an upload in a single scan. Required keys and
+    the benefit plan schema (`json_schema` variable, skipped if NULL) are checked together for every row.
+    Errors of a row are stored in `validations.import_errors` in the same statement, and ids of failing rows
+    are collected into the `failing_entries_first_name`, `failing_entries_last_name`, `failing_entries_dob`
+    and `failing_entries_invalid_json` variables of the procedure. With `with_accepted_filter` only rows in the
+    `accepted` variable are validated when it is not NULL.
+    """
+    accepted_filter = ' AND (accepted IS NULL OR "UUID" = ANY(accepted))' if with_accepted_filter else ''
+    return """
+    -- Single scan of the upload, errors of every row are written to its validations in the same statement
+    WITH checked AS (
+        SELECT "UUID" AS id,
+               ARRAY_REMOVE(ARRAY[
+                   CASE WHEN NOT "Json_ext" ? 'first_name' THEN 'first_name' END,
+                   CASE WHEN NOT "Json_ext" ? 'last_name' THEN 'last_name' END,
+                   CASE WHEN NOT "Json_ext" ? 'dob' THEN 'dob' END,
+                   CASE WHEN json_schema IS NOT NULL AND NOT validate_json_schema(json_schema, "Json_ext")
+                       THEN 'invalid_json' END
+               ], NULL) AS errors,
+               COALESCE(validations ? 'import_errors', False) AS had_errors
+        FROM individual_individualdatasource
+        WHERE upload_id = current_upload_id AND individual_id IS NULL AND "isDeleted" = False""" + accepted_filter + """
+    ),
+    flagged AS (
+        UPDATE individual_individualdatasource AS ds
+        SET validations = CASE
+            WHEN cardinality(checked.errors) > 0
+                THEN COALESCE(ds.validations, '{}'::jsonb)
+                    || jsonb_build_object('import_errors', to_jsonb(checked.errors))
+            ELSE ds.validations - 'import_errors'
+        END
+        FROM checked
+        WHERE ds."UUID" = checked.id AND (cardinality(checked.errors) > 0 OR checked.had_errors)
+        RETURNING checked.id, checked.errors
+    )
+    SELECT ARRAY_AGG(id) FILTER (WHERE 'first_name' = ANY(errors)),
+           ARRAY_AGG(id) FILTER (WHERE 'last_name' = ANY(errors)),
+           ARRAY_AGG(id) FILTER (WHERE 'dob' = ANY(errors)),
+           ARRAY_AGG(id) FILTER (WHERE 'invalid_json' = ANY(errors))
+    INTO failing_entries_first_name, failing_entries_last_name, failing_entries_dob, failing_entries_invalid_json
+    FROM flagged;
+
+"""
+
+
+def _update_row_filters(with_accepted_filter: bool = False, valid_only: bool = False) -> str:
+    filters = ''
+    if with_accepted_filter:
+        filters += ' AND (accepted IS NULL OR ds."UUID" = ANY(accepted))'
+    if valid_only:
+        filters += " AND ds.validations ->> 'validation_errors' = '[]'"
+    return filters
+
+
+def build_update_delta_sql(with_accepted_filter: bool = False, valid_only: bool = False) -> str:
+    """
+    PL/pgSQL statements classifying rows of an update upload before beneficiaries are rewritten. Every value of the
+    schema filtered payload of a pending row is compared as text with the current `Json_ext` of the beneficiary, and
+    the full payload without `ID` is compared for equality with the `Json_ext` of its individual, which keeps the last
+    applied or imported row next to the `report_synch` and `version` keys of synchronization. The outcome is stored in
+    `validations.update_status` of the row: NEW (no beneficiary of the plan), UNCHANGED or CHANGED. Only CHANGED rows
+    are meant to be rewritten. Counts are stored in `update_summary` of the upload `Json_ext`. Requires the
+    `json_schema` variable of the procedure. With `with_accepted_filter` only rows in `accepted` are classified,
+    with `valid_only` only rows without validation errors.
+    """
+    filters = _update_row_filters(with_accepted_filter, valid_only)
+    return """
+    -- Rows already matching the beneficiary are skipped, only changed rows are rewritten and create history
+    UPDATE individual_individualdatasource AS ds
+    SET validations = COALESCE(ds.validations, '{}'::jsonb) || jsonb_build_object('update_status', CASE
+        WHEN spb."UUID" IS NULL THEN 'NEW'
+        WHEN NOT EXISTS (
+                SELECT 1
+                FROM jsonb_each_text(
+                    filter_jsonb(src."Json_ext", json_schema -> 'properties') - 'first_name' - 'last_name' - 'dob'
+                ) AS payload
+                WHERE spb."Json_ext" ->> payload.key IS DISTINCT FROM payload.value
+            )
+            AND ii."Json_ext" - 'ID' - 'report_synch' - 'version' = src."Json_ext" - 'ID' THEN 'UNCHANGED'
+        ELSE 'CHANGED'
+    END)
+    FROM individual_individualdatasource AS src
+    LEFT JOIN social_protection_beneficiary AS spb
+        ON spb."UUID" = (src."Json_ext" ->> 'ID')::UUID
+        AND spb.benefit_plan_id = benefitPlan
+        AND spb."isDeleted" = false
+    LEFT JOIN individual_individual AS ii ON ii."UUID" = spb.individual_id
+    WHERE ds."UUID" = src."UUID" AND ds.upload_id = current_upload_id AND ds."isDeleted" = false
+        AND ds.individual_id IS NULL""" + filters + """;
+
+    UPDATE individual_individualdatasourceupload
+    SET "Json_ext" = COALESCE("Json_ext", '{}'::jsonb) || jsonb_build_object('update_summary', (
+        SELECT jsonb_build_object(
+            'changed', count(*) FILTER (WHERE validations ->> 'update_status' = 'CHANGED'),
+            'unchanged', count(*) FILTER (WHERE validations ->> 'update_status' = 'UNCHANGED'),
+            'new', count(*) FILTER (WHERE validations ->> 'update_status' = 'NEW')
+        )
+        FROM individual_individualdatasource
+        WHERE upload_id = current_upload_id AND "isDeleted" = false
+    ))
+    WHERE "UUID" = current_upload_id;
+
+"""
+
+
+def build_link_unchanged_sql(with_accepted_filter: bool = False, valid_only: bool = False) -> str:
+    """
+    PL/pgSQL statement linking UNCHANGED rows classified by `build_update_delta_sql` to the individual of their
+    beneficiary, as the update statements do for applied rows. The individual is not rewritten.
+    """
+    filters = _update_row_filters(with_accepted_filter, valid_only)
+    return """
+    UPDATE individual_individualdatasource AS ds
+    SET individual_id = spb.individual_id
+    FROM social_protection_beneficiary AS spb
+    WHERE ds.upload_id = current_upload_id AND ds."isDeleted" = false AND ds.individual_id IS NULL
+        AND ds.validations ->> 'update_status' = 'UNCHANGED'
+        AND spb."UUID" = (ds."Json_ext" ->> 'ID')::UUID
+        AND spb.benefit_plan_id = benefitPlan
+        AND spb."isDeleted" = false""" + filters + """;
+"""
+
+
 class SqlProcedurePythonWorkflow(BasePythonWorkflowExecutor):
     """
         Implementation of the PythonWorkflowExecutor that executes provided sql with